@@ -3,14 +3,19 @@ Manual Actions API endpoints
 Execute immediate actions on VMs/containers without scheduling
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from datetime import datetime
+import asyncio
+import json
 
 from app.database import get_db
-from app.schemas import ActionRequest, ActionResponse
+from app.schemas import ActionRequest, ActionResponse, BatchActionRequest, ActionJobResponse
 from app.models import VM, Group, GroupMember, ExecutionLog, User
 from app.dependencies import get_current_user
 from app.services.proxmox import get_proxmox_service
+from app.services.action_jobs import get_action_job_service
 
 router = APIRouter(prefix="/actions", tags=["Actions"])
 
@@ -206,3 +211,155 @@ def execute_group_action(
         "results": results,
         "errors": errors
     }
+
+
+@router.post("/batch", response_model=ActionJobResponse, status_code=202)
+def execute_batch_action(
+    batch_request: BatchActionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Start a background job executing an action on a list of VMs
+    
+    The job runs concurrently and returns immediately. Progress can be
+    polled via /actions/jobs/{job_id} or streamed via /actions/jobs/{job_id}/events.
+    
+    Args:
+        batch_request: Action plus VM IDs and/or a group ID
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Created job
+    """
+    vmids = set(batch_request.vmids)
+    
+    if batch_request.group_id is not None:
+        group = db.query(Group).filter(Group.id == batch_request.group_id).first()
+        if not group:
+            raise HTTPException(status_code=404, detail="Group not found")
+        
+        group_vmids = db.query(VM.vmid).join(
+            GroupMember, GroupMember.vm_id == VM.id
+        ).filter(GroupMember.group_id == batch_request.group_id).all()
+        vmids.update(vmid for (vmid,) in group_vmids)
+    
+    if not vmids:
+        raise HTTPException(status_code=400, detail="No VMs given")
+    
+    vms = db.query(VM).filter(VM.vmid.in_(vmids)).all()
+    
+    missing = vmids - {vm.vmid for vm in vms}
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"VMs not found: {', '.join(str(v) for v in sorted(missing))}"
+        )
+    
+    targets = [
+        {'id': vm.id, 'vmid': vm.vmid, 'name': vm.name, 'node': vm.node, 'type': vm.type}
+        for vm in vms
+    ]
+    
+    job = get_action_job_service().submit(batch_request.action, targets)
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}", response_model=ActionJobResponse)
+def get_action_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get status and per-VM results of a batch action job
+    
+    Args:
+        job_id: Job ID
+        current_user: Authenticated user
+        
+    Returns:
+        Job status
+    """
+    job = get_action_job_service().get_job(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_action_job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream per-VM progress of a batch action job as Server-Sent Events
+    
+    Emits one 'progress' event per VM state change and a final 'done' event.
+    
+    Args:
+        job_id: Job ID
+        current_user: Authenticated user
+        
+    Returns:
+        text/event-stream response
+    """
+    job = get_action_job_service().get_job(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        sent = 0
+        idle = 0
+        while True:
+            events = job.events[sent:]
+            for event in events:
+                payload = json.dumps(jsonable_encoder(event['data']))
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+            sent += len(events)
+            
+            if job.finished and sent >= len(job.events):
+                break
+            
+            # Keep-alive comment roughly every 15 seconds
+            idle = 0 if events else idle + 1
+            if idle >= 30:
+                idle = 0
+                yield ": keep-alive\n\n"
+            
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ActionJobResponse)
+def cancel_action_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancel a running batch action job
+    
+    VMs whose action has not started yet are marked as cancelled;
+    actions already sent to Proxmox are not rolled back.
+    
+    Args:
+        job_id: Job ID
+        current_user: Authenticated user
+        
+    Returns:
+        Job status
+    """
+    job = get_action_job_service().cancel_job(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
@@ -1,7 +1,7 @@
 """
 Blackout Windows Management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -9,12 +9,15 @@ from app.database import get_db
 from app.schemas import BlackoutWindowCreate, BlackoutWindowUpdate, BlackoutWindowResponse
 from app.models import BlackoutWindow, User
 from app.dependencies import get_current_user
+from app.api.etag import check_not_modified
 
 router = APIRouter(prefix="/blackouts", tags=["Blackout Windows"])
 
 
 @router.get("", response_model=List[BlackoutWindowResponse])
 def get_blackout_windows(
+    request: Request,
+    response: Response,
     enabled: bool = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -30,6 +33,10 @@ def get_blackout_windows(
     Returns:
         List of blackout windows
     """
+    not_modified = check_not_modified(request, response, db, ['blackout_windows'])
+    if not_modified is not None:
+        return not_modified
+    
     query = db.query(BlackoutWindow)
     
     if enabled is not None:
@@ -0,0 +1,53 @@
+"""
+Conditional GET support
+ETag headers and 304 responses based on the table version counters
+"""
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from app.services.table_versions import compute_etag
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag (weak comparison)"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    candidates = (candidate.strip() for candidate in header.split(','))
+    return any((candidate[2:] if candidate.startswith('W/') else candidate) == opaque for candidate in candidates)
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    db: Session,
+    tables: Iterable[str],
+    *extra
+) -> Optional[Response]:
+    """
+    Handle a conditional GET before the representation is loaded
+
+    Sets the ETag on the response. If the client already holds the
+    current representation, returns a 304 response to send instead.
+
+    Args:
+        request: Incoming request
+        response: Response of the endpoint
+        db: Database session
+        tables: Tables the representation is built from
+        extra: Further values the representation depends on
+
+    Returns:
+        304 response, or None if the representation must be built
+    """
+    etag = compute_etag(db, tables, *extra)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,20 +1,29 @@
 """
 Groups Management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.database import get_db
-from app.schemas import GroupCreate, GroupUpdate, GroupResponse, GroupWithMembers, GroupMemberAdd
-from app.models import Group, GroupMember, VM, User
+from app.schemas import (
+    GroupCreate, GroupUpdate, GroupResponse, GroupWithMembers, GroupMemberAdd,
+    GroupMemberUpdate, GroupDependencyCreate, GroupDependencyResponse, ExecutionPlanResponse
+)
+from app.models import Group, GroupMember, GroupDependency, VM, User
 from app.dependencies import get_current_user
+from app.api.etag import check_not_modified
+from app.utils.fast_json import model_columns, rows_response
+from app.utils.dependency_graph import load_group_graph, topological_levels
 
 router = APIRouter(prefix="/groups", tags=["Groups"])
 
 
 @router.get("", response_model=List[GroupResponse])
 def get_groups(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -28,16 +37,18 @@ def get_groups(
     Returns:
         List of groups
     """
-    groups = db.query(Group).all()
+    not_modified = check_not_modified(request, response, db, ['groups', 'group_members'])
+    if not_modified is not None:
+        return not_modified
     
-    # Add member count to each group
-    result = []
-    for group in groups:
-        group_dict = GroupResponse.from_orm(group).dict()
-        group_dict['member_count'] = len(group.members)
-        result.append(group_dict)
+    # Member counts come from one grouped join instead of loading members per group
+    fields = [field for field in GroupResponse.model_fields if field != 'member_count']
+    groups = db.query(
+        *model_columns(GroupResponse, Group, fields),
+        func.count(GroupMember.id)
+    ).outerjoin(GroupMember, GroupMember.group_id == Group.id).group_by(Group.id).order_by(Group.id).all()
     
-    return result
+    return rows_response(groups, GroupResponse, fields + ['member_count'], headers=dict(response.headers))
 
 
 @router.get("/{group_id}", response_model=GroupWithMembers)
@@ -215,8 +226,10 @@ def add_member(
         raise HTTPException(status_code=400, detail="VM is already a member of this group")
     
     # Add member
-    group_member = GroupMember(group_id=group_id, vm_id=member.vm_id)
+    group_member = GroupMember(group_id=group_id, vm_id=member.vm_id, start_order=member.start_order)
     db.add(group_member)
+    db.flush()
+    _validate_graph(db, group_id)
     db.commit()
     
     return {"message": "Member added successfully"}
@@ -249,7 +262,228 @@ def remove_member(
     if not member:
         raise HTTPException(status_code=404, detail="Member not found in group")
     
+    # Start dependencies of the VM within this group go with it, so they do
+    # not come back if the VM is added again
+    db.query(GroupDependency).filter(
+        GroupDependency.group_id == group_id,
+        or_(GroupDependency.vm_id == vm_id, GroupDependency.depends_on_vm_id == vm_id)
+    ).delete(synchronize_session=False)
+    
     db.delete(member)
     db.commit()
     
     return {"message": "Member removed successfully"}
+
+
+@router.put("/{group_id}/members/{vm_id}")
+def update_member(
+    group_id: int,
+    vm_id: int,
+    member_update: GroupMemberUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Update start order of a group member
+    
+    Args:
+        group_id: Group ID
+        vm_id: VM ID
+        member_update: New start order
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Success message
+    """
+    member = db.query(GroupMember).filter(
+        GroupMember.group_id == group_id,
+        GroupMember.vm_id == vm_id
+    ).first()
+    
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found in group")
+    
+    member.start_order = member_update.start_order
+    db.flush()
+    _validate_graph(db, group_id)
+    db.commit()
+    
+    return {"message": "Member updated successfully"}
+
+
+@router.get("/{group_id}/dependencies", response_model=List[GroupDependencyResponse])
+def get_dependencies(
+    group_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get start dependencies between group members
+    
+    Args:
+        group_id: Group ID
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        List of dependencies
+    """
+    group = db.query(Group).filter(Group.id == group_id).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    return group.dependencies
+
+
+@router.post("/{group_id}/dependencies", response_model=GroupDependencyResponse, status_code=201)
+def add_dependency(
+    group_id: int,
+    dependency: GroupDependencyCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Add a start dependency (vm_id needs depends_on_vm_id running first)
+    
+    Shutdown and stop use the reverse order.
+    
+    Args:
+        group_id: Group ID
+        dependency: Dependency data
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Created dependency
+    """
+    group = db.query(Group).filter(Group.id == group_id).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    if dependency.vm_id == dependency.depends_on_vm_id:
+        raise HTTPException(status_code=400, detail="A VM cannot depend on itself")
+    
+    member_count = db.query(GroupMember).filter(
+        GroupMember.group_id == group_id,
+        GroupMember.vm_id.in_([dependency.vm_id, dependency.depends_on_vm_id])
+    ).count()
+    if member_count != 2:
+        raise HTTPException(status_code=400, detail="Both VMs must be members of the group")
+    
+    existing = db.query(GroupDependency).filter(
+        GroupDependency.group_id == group_id,
+        GroupDependency.vm_id == dependency.vm_id,
+        GroupDependency.depends_on_vm_id == dependency.depends_on_vm_id
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Dependency already exists")
+    
+    db_dependency = GroupDependency(
+        group_id=group_id,
+        vm_id=dependency.vm_id,
+        depends_on_vm_id=dependency.depends_on_vm_id
+    )
+    db.add(db_dependency)
+    db.flush()
+    _validate_graph(db, group_id)
+    db.commit()
+    db.refresh(db_dependency)
+    
+    return db_dependency
+
+
+@router.delete("/{group_id}/dependencies/{dependency_id}")
+def remove_dependency(
+    group_id: int,
+    dependency_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Remove a start dependency
+    
+    Args:
+        group_id: Group ID
+        dependency_id: Dependency ID
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Success message
+    """
+    dependency = db.query(GroupDependency).filter(
+        GroupDependency.group_id == group_id,
+        GroupDependency.id == dependency_id
+    ).first()
+    
+    if not dependency:
+        raise HTTPException(status_code=404, detail="Dependency not found")
+    
+    db.delete(dependency)
+    db.commit()
+    
+    return {"message": "Dependency removed successfully"}
+
+
+@router.get("/{group_id}/plan", response_model=ExecutionPlanResponse)
+def get_execution_plan(
+    group_id: int,
+    action: str = 'start',
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the execution order of a group action
+    
+    VMs within one level run in parallel; each level waits for the
+    prerequisites of its members.
+    
+    Args:
+        group_id: Group ID
+        action: Action to plan
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Execution levels
+    """
+    group = db.query(Group).filter(Group.id == group_id).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    try:
+        levels = topological_levels(load_group_graph(db, group_id, action))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    members = {member.vm_id: member for member in group.members if member.vm}
+    
+    return {
+        "group_id": group_id,
+        "action": action,
+        "levels": [
+            [
+                {
+                    "vm_id": vm_id,
+                    "vmid": members[vm_id].vm.vmid,
+                    "name": members[vm_id].vm.name,
+                    "start_order": members[vm_id].start_order
+                }
+                for vm_id in level if vm_id in members
+            ]
+            for level in levels
+        ]
+    }
+
+
+def _validate_graph(db: Session, group_id: int):
+    """Reject changes that make start order and dependencies contradict each other"""
+    try:
+        topological_levels(load_group_graph(db, group_id, 'start'))
+    except ValueError:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Start order and dependencies of the group form a cycle"
+        )
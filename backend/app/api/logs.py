@@ -9,6 +9,7 @@ from app.database import get_db
 from app.schemas import ExecutionLogResponse
 from app.models import ExecutionLog, User
 from app.dependencies import get_current_user
+from app.utils.fast_json import model_columns, rows_response
 
 router = APIRouter(prefix="/logs", tags=["Execution Logs"])
 
@@ -38,7 +39,7 @@ def get_execution_logs(
     Returns:
         List of execution logs
     """
-    query = db.query(ExecutionLog).order_by(ExecutionLog.executed_at.desc())
+    query = db.query(*model_columns(ExecutionLogResponse, ExecutionLog)).order_by(ExecutionLog.executed_at.desc())
     
     if status:
         query = query.filter(ExecutionLog.status == status)
@@ -48,7 +49,7 @@ def get_execution_logs(
         query = query.filter(ExecutionLog.schedule_id == schedule_id)
     
     logs = query.offset(offset).limit(limit).all()
-    return logs
+    return rows_response(logs, ExecutionLogResponse)
 
 
 @router.get("/schedule/{schedule_id}", response_model=List[ExecutionLogResponse])
@@ -70,13 +71,13 @@ def get_schedule_logs(
     Returns:
         List of execution logs
     """
-    logs = db.query(ExecutionLog).filter(
+    logs = db.query(*model_columns(ExecutionLogResponse, ExecutionLog)).filter(
         ExecutionLog.schedule_id == schedule_id
     ).order_by(
         ExecutionLog.executed_at.desc()
     ).limit(limit).all()
     
-    return logs
+    return rows_response(logs, ExecutionLogResponse)
 
 
 @router.get("/vm/{vmid}", response_model=List[ExecutionLogResponse])
@@ -98,13 +99,13 @@ def get_vm_logs(
     Returns:
         List of execution logs
     """
-    logs = db.query(ExecutionLog).filter(
+    logs = db.query(*model_columns(ExecutionLogResponse, ExecutionLog)).filter(
         ExecutionLog.vmid == vmid
     ).order_by(
         ExecutionLog.executed_at.desc()
     ).limit(limit).all()
     
-    return logs
+    return rows_response(logs, ExecutionLogResponse)
 
 
 @router.get("/stats")
@@ -1,22 +1,37 @@
 """
 Schedules Management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.schemas import ScheduleCreate, ScheduleUpdate, ScheduleResponse
-from app.models import Schedule, VM, Group, User
+from app.schemas import (
+    ScheduleCreate, ScheduleUpdate, ScheduleResponse, ScheduleRunResponse, ScheduleRunStats,
+    ScheduleTimelineEntry, LoadForecastResponse
+)
+from app.models import Schedule, ScheduleRun, VM, Group, User
 from app.dependencies import get_current_user
+from app.api.etag import check_not_modified
+from app.services.load_forecast import forecast_load
 from app.services.scheduler import get_scheduler_service
+from app.utils.cron_index import CronIndex
 from app.utils.cron_validator import get_next_run_time
+from app.utils.jitter import get_schedule_offset
+from app.utils.percentiles import summarize
 
 router = APIRouter(prefix="/schedules", tags=["Schedules"])
 
+# Upper bounds of the timeline query
+TIMELINE_MAX_HOURS = 24 * 31
+TIMELINE_MAX_ENTRIES = 10000
+
 
 @router.get("", response_model=List[ScheduleResponse])
 def get_schedules(
+    request: Request,
+    response: Response,
     enabled: bool = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -32,6 +47,10 @@ def get_schedules(
     Returns:
         List of schedules
     """
+    not_modified = check_not_modified(request, response, db, ['schedules'])
+    if not_modified is not None:
+        return not_modified
+    
     query = db.query(Schedule)
     
     if enabled is not None:
@@ -41,6 +60,155 @@ def get_schedules(
     return schedules
 
 
+@router.get("/timeline", response_model=List[ScheduleTimelineEntry])
+def get_timeline(
+    hours: int = 24,
+    limit: int = 1000,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get upcoming fire times of all enabled schedules in time order
+    
+    Fire times are computed from compiled cron expressions and include
+    each schedule's jitter offset; schedules sharing an expression are
+    only evaluated once.
+    
+    Args:
+        hours: Horizon in hours
+        limit: Maximum number of entries
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        List of upcoming runs
+    """
+    hours = min(max(hours, 1), TIMELINE_MAX_HOURS)
+    limit = min(max(limit, 1), TIMELINE_MAX_ENTRIES)
+    
+    rows = db.query(
+        Schedule.id, Schedule.name, Schedule.action, Schedule.target_type,
+        Schedule.target_id, Schedule.cron_expression, Schedule.jitter_seconds
+    ).filter(Schedule.enabled == True).all()
+    schedules = {row.id: row for row in rows}
+    
+    index = CronIndex(
+        (row.id, row.cron_expression, get_schedule_offset(row.id, row.jitter_seconds)) for row in rows
+    )
+    start = datetime.now()
+    
+    return [
+        {
+            "schedule_id": schedule_id,
+            "name": schedules[schedule_id].name,
+            "action": schedules[schedule_id].action,
+            "target_type": schedules[schedule_id].target_type,
+            "target_id": schedules[schedule_id].target_id,
+            "fire_at": fire_at
+        }
+        for fire_at, schedule_id in index.upcoming(start, start + timedelta(hours=hours), limit)
+    ]
+
+
+@router.get("/forecast", response_model=LoadForecastResponse)
+def get_forecast(
+    hours: int = 24,
+    threshold: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Forecast per-minute, per-node action load of the enabled schedules
+    
+    Minutes where a node receives more actions than the threshold are
+    reported as hotspots, together with suggested offsets (in minutes)
+    for the schedules causing them.
+    
+    Args:
+        hours: Horizon in hours
+        threshold: Hotspot threshold (default: FORECAST_HOTSPOT_THRESHOLD)
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Load forecast
+    """
+    hours = min(max(hours, 1), TIMELINE_MAX_HOURS)
+    return forecast_load(db, hours=hours, threshold=threshold)
+
+
+@router.get("/runs/stats", response_model=ScheduleRunStats)
+def get_run_stats(
+    hours: int = 24,
+    schedule_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get fire lag and completion time percentiles of schedule runs
+    
+    Lag is the actual start minus the planned fire time; completion is the
+    time from planned fire until all actions of the run were sent.
+    
+    Args:
+        hours: Time window in hours
+        schedule_id: Limit to one schedule
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Run statistics
+    """
+    since = datetime.now() - timedelta(hours=hours)
+    
+    query = db.query(
+        ScheduleRun.status, ScheduleRun.lag_seconds, ScheduleRun.completion_seconds
+    ).filter(ScheduleRun.planned_at >= since)
+    
+    if schedule_id:
+        query = query.filter(ScheduleRun.schedule_id == schedule_id)
+    
+    rows = query.all()
+    
+    return {
+        "since": since,
+        "runs": len(rows),
+        "missed": sum(1 for row in rows if row.status == 'missed'),
+        "lag_seconds": summarize([row.lag_seconds for row in rows if row.lag_seconds is not None]),
+        "completion_seconds": summarize(
+            [row.completion_seconds for row in rows if row.completion_seconds is not None]
+        )
+    }
+
+
+@router.get("/{schedule_id}/runs", response_model=List[ScheduleRunResponse])
+def get_schedule_runs(
+    schedule_id: int,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get recent runs of a schedule with their timing
+    
+    Args:
+        schedule_id: Schedule ID
+        limit: Maximum number of runs to return
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        List of schedule runs
+    """
+    runs = db.query(ScheduleRun).filter(
+        ScheduleRun.schedule_id == schedule_id
+    ).order_by(
+        ScheduleRun.planned_at.desc()
+    ).limit(limit).all()
+    
+    return runs
+
+
 @router.get("/{schedule_id}", response_model=ScheduleResponse)
 def get_schedule(
     schedule_id: int,
@@ -93,9 +261,6 @@ def create_schedule(
         if not target:
             raise HTTPException(status_code=404, detail="Target group not found")
     
-    # Calculate next_run
-    next_run = get_next_run_time(schedule.cron_expression)
-    
     # Create schedule
     db_schedule = Schedule(
         name=schedule.name,
@@ -104,16 +269,28 @@ def create_schedule(
         action=schedule.action,
         cron_expression=schedule.cron_expression,
         enabled=schedule.enabled,
-        next_run=next_run
+        batch_size=schedule.batch_size,
+        batch_delay_seconds=schedule.batch_delay_seconds,
+        max_in_flight_per_node=schedule.max_in_flight_per_node,
+        wait_for_completion=schedule.wait_for_completion,
+        retry_budget=schedule.retry_budget,
+        jitter_seconds=schedule.jitter_seconds
     )
     db.add(db_schedule)
+    db.flush()
+    
+    # Calculate next_run (the jitter offset depends on the ID)
+    db_schedule.next_run = get_next_run_time(
+        schedule.cron_expression,
+        offset_seconds=get_schedule_offset(db_schedule.id, db_schedule.jitter_seconds)
+    )
     db.commit()
     db.refresh(db_schedule)
     
     # Add to scheduler if enabled
     if schedule.enabled:
         scheduler_service = get_scheduler_service()
-        scheduler_service.add_schedule(db_schedule.id, schedule.cron_expression)
+        scheduler_service.add_schedule(db_schedule.id, schedule.cron_expression, db_schedule.jitter_seconds)
     
     return db_schedule
 
@@ -166,19 +343,40 @@ def update_schedule(
     
     if schedule.cron_expression is not None:
         db_schedule.cron_expression = schedule.cron_expression
+    
+    # None resets the schedule to the global jitter default
+    if 'jitter_seconds' in schedule.model_fields_set:
+        db_schedule.jitter_seconds = schedule.jitter_seconds
+    
+    if schedule.cron_expression is not None or 'jitter_seconds' in schedule.model_fields_set:
         # Recalculate next_run
-        db_schedule.next_run = get_next_run_time(schedule.cron_expression)
+        db_schedule.next_run = get_next_run_time(
+            db_schedule.cron_expression,
+            offset_seconds=get_schedule_offset(schedule_id, db_schedule.jitter_seconds)
+        )
     
     if schedule.enabled is not None:
         db_schedule.enabled = schedule.enabled
     
+    # Execution policy
+    if schedule.batch_size is not None:
+        db_schedule.batch_size = schedule.batch_size
+    if schedule.batch_delay_seconds is not None:
+        db_schedule.batch_delay_seconds = schedule.batch_delay_seconds
+    if schedule.max_in_flight_per_node is not None:
+        db_schedule.max_in_flight_per_node = schedule.max_in_flight_per_node
+    if schedule.wait_for_completion is not None:
+        db_schedule.wait_for_completion = schedule.wait_for_completion
+    if schedule.retry_budget is not None:
+        db_schedule.retry_budget = schedule.retry_budget
+    
     db.commit()
     db.refresh(db_schedule)
     
     # Update scheduler
     scheduler_service = get_scheduler_service()
     if db_schedule.enabled:
-        scheduler_service.update_schedule(schedule_id, db_schedule.cron_expression)
+        scheduler_service.update_schedule(schedule_id, db_schedule.cron_expression, db_schedule.jitter_seconds)
     else:
         scheduler_service.remove_schedule(schedule_id)
     
@@ -248,7 +446,7 @@ def toggle_schedule(
     # Update scheduler
     scheduler_service = get_scheduler_service()
     if db_schedule.enabled:
-        scheduler_service.add_schedule(schedule_id, db_schedule.cron_expression)
+        scheduler_service.add_schedule(schedule_id, db_schedule.cron_expression, db_schedule.jitter_seconds)
     else:
         scheduler_service.remove_schedule(schedule_id)
     
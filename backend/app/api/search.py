@@ -0,0 +1,58 @@
+"""
+Search API endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.schemas import SearchResponse
+from app.models import User
+from app.dependencies import get_current_user
+from app.services.search import search, SEARCH_TYPES
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+# Bounds of the search parameters
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_LIMIT = 100
+
+
+@router.get("", response_model=SearchResponse)
+def search_all(
+    q: str,
+    types: Optional[str] = None,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Search VMs, schedules and groups by name and execution logs by error message
+    
+    Args:
+        q: Search text (substring, typos tolerated on PostgreSQL)
+        types: Comma-separated types to search ('vms', 'schedules', 'groups', 'logs'; default: all)
+        limit: Maximum number of hits (max 100)
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Hits ranked by score, best first
+    """
+    query = q.strip()
+    if len(query) < SEARCH_MIN_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Search text needs at least {SEARCH_MIN_LENGTH} characters")
+    
+    selected = None
+    if types:
+        selected = list(dict.fromkeys(t.strip() for t in types.split(',') if t.strip()))
+        unknown = [t for t in selected if t not in SEARCH_TYPES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+    
+    limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
+    
+    return {
+        "query": query,
+        "results": search(db, query, selected, limit)
+    }
@@ -1,42 +1,115 @@
 """
 VM/Container Management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import or_, literal
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime, timedelta
 
+from app.config import settings
 from app.database import get_db
-from app.schemas import VMResponse, VMStatusResponse
-from app.models import VM, User
+from app.schemas import (
+    VMResponse, VMStatusResponse, VMStatusListResponse, VMHistoryResponse, VMMetricSeriesResponse, VMUsageSummary
+)
+from app.models import VM, VMStateEvent, User
 from app.dependencies import get_current_user
+from app.api.etag import check_not_modified
 from app.services.proxmox import get_proxmox_service
+from app.services.resource_metrics import get_resource_metrics_service
+from app.services.search import like_pattern
 from app.services.vm_sync import get_vm_sync_service
+from app.utils.fast_json import model_columns, rows_response
+from app.utils.pagination import (
+    parse_sort, order_by_clauses, keyset_filter, row_sort_values, encode_cursor, decode_cursor
+)
 
 router = APIRouter(prefix="/vms", tags=["VMs"])
 
 
+# Sortable fields and the value NULLs sort as
+VM_SORT_FIELDS = {
+    'vmid': (VM.vmid, None),
+    'name': (VM.name, None),
+    'type': (VM.type, None),
+    'node': (VM.node, None),
+    'status': (VM.status, ''),
+    'maxmem': (VM.maxmem, -1),
+    'maxdisk': (VM.maxdisk, -1),
+    'uptime': (VM.uptime, -1),
+}
+
+# Largest page of a paginated request
+VMS_MAX_LIMIT = 1000
+
+# Default range and largest number of events of a history request
+HISTORY_DEFAULT_DAYS = 7
+HISTORY_MAX_EVENTS = 10000
+
+# Resolutions of resource metrics queries
+METRIC_RESOLUTIONS = {'raw': 0, '5m': 300, '1h': 3600}
+
+
 @router.get("", response_model=List[VMResponse])
 def get_vms(
+    request: Request,
+    response: Response,
     type: Optional[str] = None,
     node: Optional[str] = None,
     status: Optional[str] = None,
+    search: Optional[str] = None,
+    tag: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get list of all VMs/containers from database cache
+    Get list of VMs/containers from database cache
+    
+    Without limit all matching VMs are returned. With limit, results are
+    paginated by keyset: the X-Next-Cursor response header holds the
+    cursor of the next page and is absent on the last page.
+    Requests with a current If-None-Match get 304 Not Modified.
     
     Args:
         type: Filter by type ('qemu' or 'lxc')
         node: Filter by node
         status: Filter by status
+        search: Case-insensitive substring of name or tags
+        tag: Exact Proxmox tag
+        sort: Comma-separated sort fields, '-' prefix for descending (default: vmid)
+        limit: Page size (max 1000)
+        cursor: X-Next-Cursor of the previous page
+        fields: Comma-separated fields to return (default: all)
         db: Database session
         current_user: Authenticated user
         
     Returns:
         List of VMs
     """
-    query = db.query(VM)
+    try:
+        keys = parse_sort(sort, VM_SORT_FIELDS, 'vmid')
+        after = decode_cursor(cursor, keys) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    selected = list(VMResponse.model_fields)
+    if fields:
+        selected = list(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+        unknown = [field for field in selected if field not in VMResponse.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    not_modified = check_not_modified(request, response, db, ['vms'])
+    if not_modified is not None:
+        return not_modified
+    
+    # Rows are fetched as tuples; sort fields are loaded as well to build the next cursor
+    loaded = list(dict.fromkeys(selected + [field for field, _ in keys]))
+    query = db.query(*model_columns(VMResponse, VM, loaded))
     
     if type:
         query = query.filter(VM.type == type)
@@ -44,9 +117,127 @@ def get_vms(
         query = query.filter(VM.node == node)
     if status:
         query = query.filter(VM.status == status)
+    if search:
+        pattern = like_pattern(search)
+        query = query.filter(or_(VM.name.ilike(pattern, escape='\\'), VM.tags.ilike(pattern, escape='\\')))
+    if tag:
+        query = query.filter(
+            (literal(';') + VM.tags + literal(';')).like(like_pattern(f";{tag};"), escape='\\')
+        )
+    if after is not None:
+        query = query.filter(keyset_filter(keys, VM_SORT_FIELDS, after))
+    
+    query = query.order_by(*order_by_clauses(keys, VM_SORT_FIELDS))
+    
+    next_cursor = None
+    if limit is not None:
+        limit = min(max(limit, 1), VMS_MAX_LIMIT)
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(keys, row_sort_values(rows[-1], keys, VM_SORT_FIELDS))
+    else:
+        rows = query.all()
+    
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    
+    return rows_response(rows, VMResponse, selected, headers=dict(response.headers))
+
+
+@router.get("/status", response_model=VMStatusListResponse)
+def get_vms_status(
+    vmids: Optional[str] = None,
+    type: Optional[str] = None,
+    node: Optional[str] = None,
+    status: Optional[str] = None,
+    max_age: Optional[float] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get live status of many VMs/containers with one Proxmox request
+    
+    Answers from a single cluster/resources snapshot shared by all
+    callers, so refreshing a large table costs one upstream request.
     
-    vms = query.all()
-    return vms
+    Args:
+        vmids: Comma-separated VM IDs (default: all)
+        type: Filter by type ('qemu' or 'lxc')
+        node: Filter by node
+        status: Filter by live status
+        max_age: Maximum snapshot age in seconds (default: PROXMOX_SNAPSHOT_TTL_SECONDS, 0 = fresh)
+        current_user: Authenticated user
+        
+    Returns:
+        Compact live status per VM and the snapshot age
+    """
+    requested = None
+    if vmids:
+        try:
+            requested = [int(vmid) for vmid in vmids.split(',') if vmid.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="vmids must be a comma-separated list of integers")
+    
+    try:
+        snapshot, age = get_proxmox_service().get_vm_snapshot(max_age)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get VM status: {str(e)}")
+    
+    resources = snapshot.values() if requested is None else [
+        snapshot[vmid] for vmid in dict.fromkeys(requested) if vmid in snapshot
+    ]
+    
+    return {
+        "snapshot_age_seconds": round(age, 3),
+        "vms": [
+            {
+                "vmid": resource['vmid'],
+                "node": resource.get('node'),
+                "status": resource.get('status'),
+                "uptime": resource.get('uptime'),
+                "cpu": resource.get('cpu'),
+                "mem": resource.get('mem'),
+                "maxmem": resource.get('maxmem')
+            }
+            for resource in resources
+            if (not type or resource.get('type') == type)
+            and (not node or resource.get('node') == node)
+            and (not status or resource.get('status') == status)
+        ],
+        "missing": [vmid for vmid in requested or [] if vmid not in snapshot]
+    }
+
+
+@router.get("/metrics/summary", response_model=List[VMUsageSummary])
+def get_vms_usage_summary(
+    vmids: str,
+    minutes: int = 15,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get recent average and peak resource usage of many VMs/containers
+    
+    Args:
+        vmids: Comma-separated VM IDs
+        minutes: Length of the window ending now (max: raw retention)
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Usage per VM with samples in the window
+    """
+    try:
+        requested = [int(vmid) for vmid in vmids.split(',') if vmid.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="vmids must be a comma-separated list of integers")
+    if not requested:
+        raise HTTPException(status_code=400, detail="vmids must not be empty")
+    if not 1 <= minutes <= settings.METRICS_RAW_RETENTION_HOURS * 60:
+        raise HTTPException(status_code=400, detail="minutes is outside the raw sample retention")
+    
+    summary = get_resource_metrics_service().get_usage_summary(db, requested, minutes)
+    return [{'vmid': vmid, **summary[vmid]} for vmid in dict.fromkeys(requested) if vmid in summary]
 
 
 @router.get("/{vmid}", response_model=VMResponse)
@@ -115,6 +306,128 @@ def get_vm_status(
         raise HTTPException(status_code=500, detail=f"Failed to get VM status: {str(e)}")
 
 
+@router.get("/{vmid}/history", response_model=VMHistoryResponse)
+def get_vm_history(
+    vmid: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 1000,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get state transitions of a VM/container recorded by the sync
+    
+    Each event holds the state after the change. The state in effect at
+    since is returned as initial, so the range is fully described.
+    
+    Args:
+        vmid: VM ID
+        since: Start of the range (default: HISTORY_DEFAULT_DAYS before until)
+        until: End of the range (default: now)
+        limit: Maximum number of events (max 10000); until is moved back when reached
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Events in the range with time known and time running
+    """
+    until = until or datetime.now()
+    since = since or until - timedelta(days=HISTORY_DEFAULT_DAYS)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    limit = min(max(limit, 1), HISTORY_MAX_EVENTS)
+    
+    # Both queries are range scans of the (vmid, observed_at) index
+    initial = db.query(VMStateEvent).filter(
+        VMStateEvent.vmid == vmid,
+        VMStateEvent.observed_at < since
+    ).order_by(VMStateEvent.observed_at.desc(), VMStateEvent.id.desc()).first()
+    
+    events = db.query(VMStateEvent).filter(
+        VMStateEvent.vmid == vmid,
+        VMStateEvent.observed_at >= since,
+        VMStateEvent.observed_at < until
+    ).order_by(VMStateEvent.observed_at, VMStateEvent.id).limit(limit + 1).all()
+    
+    if len(events) > limit:
+        until = events[limit].observed_at
+        events = events[:limit]
+    
+    if initial is None and not events and not db.query(VM.id).filter(VM.vmid == vmid).first():
+        raise HTTPException(status_code=404, detail="VM not found")
+    
+    # Sum up the intervals between consecutive known states
+    known_seconds = running_seconds = 0.0
+    current, current_since = initial, since
+    for event in events + [None]:
+        end = event.observed_at if event else until
+        if current is not None:
+            duration = (end - current_since).total_seconds()
+            known_seconds += duration
+            if current.status == 'running':
+                running_seconds += duration
+        current, current_since = event, end
+    
+    return {
+        "vmid": vmid,
+        "since": since,
+        "until": until,
+        "initial": initial,
+        "events": events,
+        "known_seconds": round(known_seconds, 3),
+        "running_seconds": round(running_seconds, 3)
+    }
+
+
+@router.get("/{vmid}/metrics", response_model=VMMetricSeriesResponse)
+def get_vm_metrics(
+    vmid: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    resolution: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the resource usage series of a VM/container
+    
+    Args:
+        vmid: VM ID
+        since: Start of the range (default: 1 hour before until)
+        until: End of the range (default: now)
+        resolution: 'raw', '5m' or '1h' (default: finest one still covering since)
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        Timestamps and one value list per metric
+    """
+    until = until or datetime.now()
+    since = since or until - timedelta(hours=1)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    
+    service = get_resource_metrics_service()
+    if resolution is None:
+        resolution_seconds = service.choose_resolution(since)
+    elif resolution in METRIC_RESOLUTIONS:
+        resolution_seconds = METRIC_RESOLUTIONS[resolution]
+    else:
+        raise HTTPException(
+            status_code=400, detail=f"resolution must be one of: {', '.join(METRIC_RESOLUTIONS)}"
+        )
+    
+    result = service.get_series(db, vmid, since, until, resolution_seconds)
+    return {
+        "vmid": vmid,
+        "since": since,
+        "until": until,
+        "resolution_seconds": resolution_seconds or settings.METRICS_COLLECT_INTERVAL_SECONDS,
+        **result
+    }
+
+
 @router.post("/sync")
 def sync_vms(
     db: Session = Depends(get_db),
@@ -2,7 +2,7 @@
 Configuration management using Pydantic Settings
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal
 
 
 class Settings(BaseSettings):
@@ -10,6 +10,8 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10  # Connections kept open per process
+    DB_MAX_OVERFLOW: int = 20  # Extra connections opened under load
     
     # Security
     SECRET_KEY: str
@@ -24,11 +26,49 @@ class Settings(BaseSettings):
     PROXMOX_TOKEN_NAME: str
     PROXMOX_TOKEN_VALUE: str
     PROXMOX_VERIFY_SSL: bool = False
+    PROXMOX_BULK_ACTIONS: bool = True  # One startall/stopall call per node for scheduled start/shutdown
+    PROXMOX_SNAPSHOT_TTL_SECONDS: float = 5  # Reuse of the cluster snapshot behind /api/vms/status
     
     # Application
     CORS_ORIGINS: str = "http://localhost:5173"
-    VM_SYNC_INTERVAL_MINUTES: int = 5
+    VM_SYNC_INTERVAL_MINUTES: int = 5  # Full reconciliation (initial interval when adaptive)
+    VM_SYNC_ADAPTIVE: bool = True  # Adapt the full sync interval to churn and cluster activity
+    VM_SYNC_MIN_INTERVAL_SECONDS: int = 30
+    VM_SYNC_MAX_INTERVAL_SECONDS: int = 1800
+    SYNC_INCREMENTAL_INTERVAL_SECONDS: int = 15  # Cluster task log polling, 0 = disabled
+    SYNC_INCREMENTAL_MAX_GUESTS: int = 20  # More touched guests fall back to a full sync
     LOG_LEVEL: str = "INFO"
+    SCHEDULER_METRICS_PORT: int = 0  # Prometheus port of the scheduler daemon, 0 = disabled
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # Smaller responses are sent uncompressed
+    
+    # Scheduled execution
+    SCHEDULER_EXECUTOR: Literal["thread", "process"] = "thread"
+    SCHEDULER_POOL_SIZE: int = 10  # Concurrent runs (per worker process in 'process' mode)
+    SCHEDULER_WORKERS: int = 0  # Worker processes in 'process' mode, 0 = number of CPUs
+    SCHEDULER_ACTION_WORKERS: int = 16  # Max concurrent actions within one batch
+    TASK_TIMEOUT_SECONDS: int = 300  # Max wait for a Proxmox task to finish
+    SKIP_NOOP_ACTIONS: bool = True  # Skip actions on VMs already in the target state
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 300  # Still run fires that start this late
+    SCHEDULE_JITTER_SECONDS: int = 0  # Default spread window of schedules (max 3600), 0 = off
+    
+    # Resource metrics collector
+    METRICS_COLLECT_INTERVAL_SECONDS: int = 60  # Raw sample interval, 0 = disabled
+    METRICS_RAW_RETENTION_HOURS: int = 24
+    METRICS_5MIN_RETENTION_DAYS: int = 7
+    METRICS_1H_RETENTION_DAYS: int = 90
+    
+    # Load forecast
+    FORECAST_HOTSPOT_THRESHOLD: int = 20  # Actions per node and minute considered a hotspot
+    FORECAST_MAX_OFFSET_MINUTES: int = 30  # Largest shift suggested to spread a hotspot
+    
+    # Retries of failed actions
+    RETRY_MAX_ATTEMPTS: int = 4  # Per VM, including the first try
+    RETRY_BASE_DELAY_SECONDS: float = 5
+    RETRY_MAX_DELAY_SECONDS: float = 120
+    
+    # Manual batch actions
+    ACTION_JOB_WORKERS: int = 8
+    ACTION_JOB_RETENTION: int = 100
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -1,14 +1,20 @@
 """
 FastAPI Application Main Entry Point
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import logging
+import time
 
 from app.config import settings
-from app.api import auth, vms, groups, schedules, blackouts, logs, actions
+from app.database import engine
+from app.api import auth, vms, groups, schedules, blackouts, logs, actions, search
+from app.services import metrics
 from app.services.scheduler import get_scheduler_service
 from app.services.vm_sync import get_vm_sync_service
+from app.services.resource_metrics import get_resource_metrics_service
+from app.utils.compression import CompressionMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
 
@@ -23,7 +29,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Proxmox Cronjob Web Interface",
     description="Cluster-wide VM/Container scheduling and management",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -35,6 +42,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (brotli or gzip, by Accept-Encoding)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES)
+
+# Expose connection pool usage
+metrics.register_pool_metrics(engine)
+
+
+@app.middleware("http")
+async def observe_request_latency(request: Request, call_next):
+    """Record request latency per route template"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.labels(
+        request.method,
+        route.path if route else "unmatched",
+        response.status_code
+    ).observe(time.perf_counter() - start)
+    
+    return response
+
+
 # Include API routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(vms.router, prefix="/api")
@@ -43,6 +73,7 @@ app.include_router(schedules.router, prefix="/api")
 app.include_router(blackouts.router, prefix="/api")
 app.include_router(logs.router, prefix="/api")
 app.include_router(actions.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
 
 
 @app.on_event("startup")
@@ -60,18 +91,57 @@ async def startup_event():
     
     # Create background scheduler for VM sync
     vm_sync_scheduler = BackgroundScheduler()
-    vm_sync_scheduler.add_job(
-        func=vm_sync_service.sync_vms,
-        trigger='interval',
-        minutes=settings.VM_SYNC_INTERVAL_MINUTES,
-        id='vm_sync_job'
-    )
+    if settings.VM_SYNC_ADAPTIVE:
+        # Checked at the shortest interval, synced when the adaptive interval has passed
+        vm_sync_scheduler.add_job(
+            func=vm_sync_service.sync_if_due,
+            trigger='interval',
+            seconds=settings.VM_SYNC_MIN_INTERVAL_SECONDS,
+            id='vm_sync_job',
+            max_instances=1,
+            coalesce=True
+        )
+    else:
+        vm_sync_scheduler.add_job(
+            func=vm_sync_service.sync_vms,
+            trigger='interval',
+            minutes=settings.VM_SYNC_INTERVAL_MINUTES,
+            id='vm_sync_job'
+        )
+    
+    # Near-real-time updates from the cluster task log between full syncs
+    if settings.SYNC_INCREMENTAL_INTERVAL_SECONDS > 0:
+        vm_sync_scheduler.add_job(
+            func=vm_sync_service.sync_incremental,
+            trigger='interval',
+            seconds=settings.SYNC_INCREMENTAL_INTERVAL_SECONDS,
+            id='vm_sync_incremental_job',
+            max_instances=1,
+            coalesce=True
+        )
+    
+    # Resource usage history, sampled from cluster/resources
+    if settings.METRICS_COLLECT_INTERVAL_SECONDS > 0:
+        vm_sync_scheduler.add_job(
+            func=get_resource_metrics_service().collect,
+            trigger='interval',
+            seconds=settings.METRICS_COLLECT_INTERVAL_SECONDS,
+            id='resource_metrics_job',
+            max_instances=1,
+            coalesce=True
+        )
     vm_sync_scheduler.start()
     
     # Store scheduler in app state for shutdown
     app.state.vm_sync_scheduler = vm_sync_scheduler
     
-    logger.info(f"VM sync scheduled every {settings.VM_SYNC_INTERVAL_MINUTES} minutes")
+    if settings.VM_SYNC_ADAPTIVE:
+        logger.info(
+            f"VM sync scheduled adaptively every {settings.VM_SYNC_MIN_INTERVAL_SECONDS}-"
+            f"{settings.VM_SYNC_MAX_INTERVAL_SECONDS} seconds"
+        )
+    else:
+        logger.info(f"VM sync scheduled every {settings.VM_SYNC_INTERVAL_MINUTES} minutes")
     
     # Run initial VM sync
     try:
@@ -116,15 +186,33 @@ def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus metrics endpoint"""
+    payload, content_type = metrics.render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 @app.get("/api/stats")
-def get_dashboard_stats(db = None):
+def get_dashboard_stats(request: Request, response: Response, db = None):
     """Get dashboard statistics"""
     from app.database import SessionLocal
     from app.models import VM, Schedule, Group, ExecutionLog
+    from app.api.etag import check_not_modified
     from datetime import datetime, timedelta
     
+    # The 24 hour window moves in whole minutes, so the result only
+    # changes with the tables or the minute (which are the ETag)
+    now = datetime.now().replace(second=0, microsecond=0)
+    
     db = SessionLocal()
     try:
+        not_modified = check_not_modified(
+            request, response, db, ['vms', 'schedules', 'groups', 'execution_logs'], now.isoformat()
+        )
+        if not_modified is not None:
+            return not_modified
+        
         total_vms = db.query(VM).count()
         running_vms = db.query(VM).filter(VM.status == 'running').count()
         stopped_vms = db.query(VM).filter(VM.status == 'stopped').count()
@@ -135,7 +223,7 @@ def get_dashboard_stats(db = None):
         total_groups = db.query(Group).count()
         
         # Recent executions (last 24 hours)
-        yesterday = datetime.now() - timedelta(days=1)
+        yesterday = now - timedelta(days=1)
         recent_executions = db.query(ExecutionLog).filter(
             ExecutionLog.executed_at >= yesterday
         ).count()
@@ -1,7 +1,7 @@
 """
 SQLAlchemy ORM Models
 """
-from sqlalchemy import Column, Integer, String, Boolean, Text, BigInteger, ForeignKey, TIMESTAMP, Time
+from sqlalchemy import Column, Integer, String, Boolean, Text, BigInteger, Float, ForeignKey, TIMESTAMP, Time, UniqueConstraint, Index, REAL
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -48,6 +48,7 @@ class VM(Base):
     maxmem = Column(BigInteger, nullable=True)
     maxdisk = Column(BigInteger, nullable=True)
     uptime = Column(Integer, nullable=True)
+    tags = Column(Text, nullable=True)  # Proxmox tags, ';'-separated
     last_synced = Column(TIMESTAMP, server_default=func.now())
     
     # Relationships
@@ -55,6 +56,42 @@ class VM(Base):
     execution_logs = relationship("ExecutionLog", back_populates="vm")
 
 
+class VMStateEvent(Base):
+    """State transition of a VM seen by the sync (append-only, state after the change)"""
+    __tablename__ = "vm_state_events"
+    __table_args__ = (
+        Index("idx_vm_state_events_vmid_time", "vmid", "observed_at"),
+    )
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    vmid = Column(Integer, nullable=False)  # No foreign key, history outlives the VM
+    observed_at = Column(TIMESTAMP, nullable=False)
+    changes = Column(String(50), nullable=False)  # Comma-separated: 'added', 'status', 'node', 'resources', 'restart'
+    status = Column(String(20), nullable=True)
+    node = Column(String(100), nullable=False)
+    maxmem = Column(BigInteger, nullable=True)
+    maxdisk = Column(BigInteger, nullable=True)
+    uptime = Column(Integer, nullable=True)
+
+
+class VMMetricSample(Base):
+    """Resource usage of a VM: raw samples (resolution 0) and 5 min / 1 h rollups"""
+    __tablename__ = "vm_metric_samples"
+    
+    resolution = Column(Integer, primary_key=True)  # Bucket length in seconds, 0 = raw sample
+    vmid = Column(Integer, primary_key=True)
+    ts = Column(TIMESTAMP, primary_key=True)  # Sample time or bucket start
+    samples = Column(Integer, nullable=False, default=1)  # Raw samples in the bucket
+    cpu = Column(REAL, nullable=True)  # Average CPU usage (1.0 = one core)
+    cpu_max = Column(REAL, nullable=True)
+    mem = Column(BigInteger, nullable=True)  # Average bytes
+    maxmem = Column(BigInteger, nullable=True)
+    netin = Column(REAL, nullable=True)  # Bytes per second
+    netout = Column(REAL, nullable=True)
+    diskread = Column(REAL, nullable=True)
+    diskwrite = Column(REAL, nullable=True)
+
+
 class Group(Base):
     """VM Groups"""
     __tablename__ = "groups"
@@ -66,6 +103,7 @@ class Group(Base):
     
     # Relationships
     members = relationship("GroupMember", back_populates="group", cascade="all, delete-orphan")
+    dependencies = relationship("GroupDependency", back_populates="group", cascade="all, delete-orphan")
 
 
 class GroupMember(Base):
@@ -75,6 +113,7 @@ class GroupMember(Base):
     id = Column(Integer, primary_key=True, index=True)
     group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
     vm_id = Column(Integer, ForeignKey("vms.id", ondelete="CASCADE"), nullable=False, index=True)
+    start_order = Column(Integer, nullable=False, default=0)  # Lower orders start first, stop last
     added_at = Column(TIMESTAMP, server_default=func.now())
     
     # Relationships
@@ -82,6 +121,23 @@ class GroupMember(Base):
     vm = relationship("VM", back_populates="group_memberships")
 
 
+class GroupDependency(Base):
+    """Start dependency between two members of a group (vm_id needs depends_on_vm_id)"""
+    __tablename__ = "group_dependencies"
+    __table_args__ = (
+        UniqueConstraint("group_id", "vm_id", "depends_on_vm_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
+    vm_id = Column(Integer, ForeignKey("vms.id", ondelete="CASCADE"), nullable=False)
+    depends_on_vm_id = Column(Integer, ForeignKey("vms.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    # Relationships
+    group = relationship("Group", back_populates="dependencies")
+
+
 class Schedule(Base):
     """Scheduled tasks"""
     __tablename__ = "schedules"
@@ -93,6 +149,15 @@ class Schedule(Base):
     action = Column(String(20), nullable=False)  # 'start', 'stop', 'restart', 'shutdown', 'reset'
     cron_expression = Column(String(100), nullable=False)
     enabled = Column(Boolean, default=True, index=True)
+    
+    # Execution policy (rolling/staggered execution for group targets)
+    batch_size = Column(Integer, nullable=False, default=1)  # VMs acted on concurrently
+    batch_delay_seconds = Column(Integer, nullable=False, default=0)  # Pause between batches
+    max_in_flight_per_node = Column(Integer, nullable=False, default=0)  # 0 = unlimited
+    wait_for_completion = Column(Boolean, nullable=False, default=False)  # Wait for tasks before next batch
+    retry_budget = Column(Integer, nullable=False, default=3)  # Retries per run across all VMs
+    jitter_seconds = Column(Integer, nullable=True)  # Spread window, NULL = global default, 0 = off
+    
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     last_run = Column(TIMESTAMP, nullable=True)
@@ -100,6 +165,7 @@ class Schedule(Base):
     
     # Relationships
     execution_logs = relationship("ExecutionLog", back_populates="schedule")
+    runs = relationship("ScheduleRun", back_populates="schedule")
 
 
 class BlackoutWindow(Base):
@@ -116,12 +182,30 @@ class BlackoutWindow(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
 
 
+class ScheduleRun(Base):
+    """One fire of a schedule with planned versus actual timing"""
+    __tablename__ = "schedule_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("schedules.id", ondelete="SET NULL"), nullable=True, index=True)
+    planned_at = Column(TIMESTAMP, nullable=False, index=True)
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+    lag_seconds = Column(Float, nullable=True)  # started_at - planned_at
+    completion_seconds = Column(Float, nullable=True)  # finished_at - planned_at
+    status = Column(String(20), nullable=False)  # 'running', 'completed', 'skipped', 'failed', 'missed'
+    
+    # Relationships
+    schedule = relationship("Schedule", back_populates="runs")
+
+
 class ExecutionLog(Base):
     """Execution history logs"""
     __tablename__ = "execution_logs"
     
     id = Column(Integer, primary_key=True, index=True)
     schedule_id = Column(Integer, ForeignKey("schedules.id", ondelete="SET NULL"), nullable=True, index=True)
+    run_id = Column(Integer, ForeignKey("schedule_runs.id", ondelete="SET NULL"), nullable=True, index=True)
     vm_id = Column(Integer, ForeignKey("vms.id", ondelete="SET NULL"), nullable=True, index=True)
     vmid = Column(Integer, nullable=True)  # Store even if VM deleted
     vm_name = Column(String(255), nullable=True)
@@ -132,7 +216,17 @@ class ExecutionLog(Base):
     error_message = Column(Text, nullable=True)
     upid = Column(String(255), nullable=True)
     skipped_reason = Column(String(100), nullable=True)
+    attempts = Column(Integer, nullable=False, default=1)
     
     # Relationships
     schedule = relationship("Schedule", back_populates="execution_logs")
     vm = relationship("VM", back_populates="execution_logs")
+
+
+class TableVersion(Base):
+    """Change counter of a table, bumped by every transaction writing to it"""
+    __tablename__ = "table_versions"
+    
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.now())
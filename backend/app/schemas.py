@@ -2,7 +2,7 @@
 Pydantic schemas for API request/response validation
 """
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime, time
 from croniter import croniter
 
@@ -50,6 +50,7 @@ class VMResponse(VMBase):
     maxmem: Optional[int] = None
     maxdisk: Optional[int] = None
     uptime: Optional[int] = None
+    tags: Optional[str] = None
     last_synced: datetime
     
     class Config:
@@ -66,6 +67,76 @@ class VMStatusResponse(BaseModel):
     maxmem: Optional[int] = None
 
 
+class VMLiveStatus(BaseModel):
+    vmid: int
+    node: str
+    status: str
+    uptime: Optional[int] = None
+    cpu: Optional[float] = None
+    mem: Optional[int] = None
+    maxmem: Optional[int] = None
+
+
+class SearchHit(BaseModel):
+    type: str  # 'vms', 'schedules', 'groups' or 'logs'
+    id: int
+    title: str
+    detail: Optional[str] = None
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+
+
+class VMStatusListResponse(BaseModel):
+    snapshot_age_seconds: float
+    vms: List[VMLiveStatus]
+    missing: List[int] = []  # Requested VMIDs not found in the cluster
+
+
+class VMStateEventResponse(BaseModel):
+    observed_at: datetime
+    changes: str  # Comma-separated: 'added', 'status', 'node', 'resources', 'restart'
+    status: Optional[str] = None
+    node: str
+    maxmem: Optional[int] = None
+    maxdisk: Optional[int] = None
+    uptime: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class VMHistoryResponse(BaseModel):
+    vmid: int
+    since: datetime
+    until: datetime  # Earlier than requested if the event limit was reached
+    initial: Optional[VMStateEventResponse] = None  # State in effect at since
+    events: List[VMStateEventResponse]
+    known_seconds: float  # Part of the range with a known state
+    running_seconds: float  # Part of the range in status 'running'
+
+
+class VMMetricSeriesResponse(BaseModel):
+    vmid: int
+    since: datetime
+    until: datetime
+    resolution_seconds: int  # Raw samples report the collect interval
+    timestamps: List[datetime]
+    series: Dict[str, List[Optional[float]]]  # cpu, cpu_max, mem, maxmem, netin, netout, diskread, diskwrite
+
+
+class VMUsageSummary(BaseModel):
+    vmid: int
+    samples: int
+    cpu: Optional[float] = None
+    cpu_max: Optional[float] = None
+    mem: Optional[int] = None
+    maxmem: Optional[int] = None
+
+
 # Group Schemas
 class GroupBase(BaseModel):
     name: str
@@ -92,6 +163,38 @@ class GroupResponse(GroupBase):
 
 class GroupMemberAdd(BaseModel):
     vm_id: int
+    start_order: int = 0
+
+
+class GroupMemberUpdate(BaseModel):
+    start_order: int
+
+
+class GroupDependencyCreate(BaseModel):
+    vm_id: int
+    depends_on_vm_id: int
+
+
+class GroupDependencyResponse(GroupDependencyCreate):
+    id: int
+    group_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ExecutionPlanStep(BaseModel):
+    vm_id: int
+    vmid: int
+    name: str
+    start_order: int
+
+
+class ExecutionPlanResponse(BaseModel):
+    group_id: int
+    action: str
+    levels: List[List[ExecutionPlanStep]]
 
 
 class GroupWithMembers(GroupResponse):
@@ -106,6 +209,12 @@ class ScheduleBase(BaseModel):
     action: str  # 'start', 'stop', 'restart', 'shutdown', 'reset'
     cron_expression: str
     enabled: bool = True
+    batch_size: int = Field(1, ge=1)
+    batch_delay_seconds: int = Field(0, ge=0)
+    max_in_flight_per_node: int = Field(0, ge=0)  # 0 = unlimited
+    wait_for_completion: bool = False
+    retry_budget: int = Field(3, ge=0)
+    jitter_seconds: Optional[int] = Field(None, ge=0, le=3600)
     
     @validator('target_type')
     def validate_target_type(cls, v):
@@ -139,6 +248,12 @@ class ScheduleUpdate(BaseModel):
     action: Optional[str] = None
     cron_expression: Optional[str] = None
     enabled: Optional[bool] = None
+    batch_size: Optional[int] = Field(None, ge=1)
+    batch_delay_seconds: Optional[int] = Field(None, ge=0)
+    max_in_flight_per_node: Optional[int] = Field(None, ge=0)
+    wait_for_completion: Optional[bool] = None
+    retry_budget: Optional[int] = Field(None, ge=0)
+    jitter_seconds: Optional[int] = Field(None, ge=0, le=3600)
 
 
 class ScheduleResponse(ScheduleBase):
@@ -152,6 +267,72 @@ class ScheduleResponse(ScheduleBase):
         from_attributes = True
 
 
+class ScheduleTimelineEntry(BaseModel):
+    schedule_id: int
+    name: str
+    action: str
+    target_type: str
+    target_id: int
+    fire_at: datetime
+
+
+class ScheduleRunResponse(BaseModel):
+    id: int
+    schedule_id: Optional[int] = None
+    planned_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    lag_seconds: Optional[float] = None
+    completion_seconds: Optional[float] = None
+    status: str
+    
+    class Config:
+        from_attributes = True
+
+
+class PercentileSummary(BaseModel):
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    max: Optional[float] = None
+
+
+class ScheduleRunStats(BaseModel):
+    since: datetime
+    runs: int
+    missed: int
+    lag_seconds: PercentileSummary
+    completion_seconds: PercentileSummary
+
+
+class ForecastBucket(BaseModel):
+    minute: datetime
+    node: str
+    actions: int
+
+
+class ForecastHotspot(ForecastBucket):
+    schedule_ids: List[int]
+
+
+class ForecastSuggestion(BaseModel):
+    schedule_id: int
+    name: str
+    offset_minutes: int
+
+
+class LoadForecastResponse(BaseModel):
+    start: datetime
+    end: datetime
+    threshold: int
+    total_actions: int
+    peak: Optional[ForecastBucket] = None
+    load: List[ForecastBucket]
+    hotspots: List[ForecastHotspot]
+    suggestions: List[ForecastSuggestion]
+
+
 # Blackout Window Schemas
 class BlackoutWindowBase(BaseModel):
     name: str
@@ -197,6 +378,8 @@ class ExecutionLogResponse(BaseModel):
     error_message: Optional[str] = None
     upid: Optional[str] = None
     skipped_reason: Optional[str] = None
+    attempts: int = 1
+    run_id: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -220,6 +403,33 @@ class ActionResponse(BaseModel):
     vmid: int
 
 
+class BatchActionRequest(ActionRequest):
+    vmids: List[int] = []
+    group_id: Optional[int] = None
+
+
+class ActionJobResult(BaseModel):
+    vmid: int
+    status: str  # 'running', 'success', 'failed', 'cancelled'
+    name: Optional[str] = None
+    upid: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ActionJobResponse(BaseModel):
+    job_id: str
+    action: str
+    status: str  # 'pending', 'running', 'completed', 'cancelled'
+    total: int
+    successful: int
+    failed: int
+    cancelled: int
+    in_progress: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    results: List[ActionJobResult] = []
+
+
 # Proxmox Credentials Schema
 class ProxmoxCredentialCreate(BaseModel):
     cluster_name: str
@@ -0,0 +1,263 @@
+"""
+Action Job Service
+Runs manual batch actions in the background and tracks per-VM progress
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+import threading
+import logging
+import time
+import uuid
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ExecutionLog
+from app.services.proxmox import get_proxmox_service
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ActionJob:
+    """A batch action on a list of VMs, executed in the background"""
+
+    def __init__(self, action: str, targets: List[Dict]):
+        """
+        Initialize a job
+
+        Args:
+            action: Action to perform on every target
+            targets: List of VM dictionaries (id, vmid, name, node, type)
+        """
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.targets = targets
+        self.status = 'pending'
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self.results: Dict[int, Dict] = {}
+        self.events: List[Dict] = []
+
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation was requested"""
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job reached a final state"""
+        return self.status in ('completed', 'cancelled')
+
+    def cancel(self):
+        """Request cancellation; VMs not yet started are skipped"""
+        self._cancel_event.set()
+
+    def record(self, vmid: int, status: str, **details):
+        """
+        Record the outcome of a single VM and publish a progress event
+
+        Args:
+            vmid: VM ID
+            status: 'running', 'success', 'failed' or 'cancelled'
+            **details: Extra fields (name, upid, error)
+        """
+        with self._lock:
+            result = {'vmid': vmid, 'status': status, **details}
+            self.results[vmid] = result
+
+            done = sum(1 for r in self.results.values() if r['status'] != 'running')
+            self.events.append({
+                'event': 'progress',
+                'data': {**result, 'done': done, 'total': len(self.targets)}
+            })
+
+            if done == len(self.targets):
+                self.status = 'cancelled' if self.cancelled else 'completed'
+                self.finished_at = datetime.now()
+                self.events.append({'event': 'done', 'data': self.summary()})
+
+    def summary(self) -> Dict:
+        """Get job summary (without per-VM results)"""
+        counts = {'success': 0, 'failed': 0, 'cancelled': 0, 'running': 0}
+        for result in self.results.values():
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+
+        return {
+            'job_id': self.id,
+            'action': self.action,
+            'status': self.status,
+            'total': len(self.targets),
+            'successful': counts['success'],
+            'failed': counts['failed'],
+            'cancelled': counts['cancelled'],
+            'in_progress': counts['running'],
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+    def to_dict(self) -> Dict:
+        """Get job summary including per-VM results"""
+        with self._lock:
+            return {
+                **self.summary(),
+                'results': list(self.results.values())
+            }
+
+
+class ActionJobService:
+    """Service for executing batch actions concurrently in the background"""
+
+    def __init__(self, max_workers: int = None, retention: int = None):
+        """
+        Initialize the job service
+
+        Args:
+            max_workers: Number of concurrent Proxmox calls across all jobs
+            retention: Number of jobs kept in memory for status queries
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ACTION_JOB_WORKERS,
+            thread_name_prefix='action-job'
+        )
+        self.retention = retention or settings.ACTION_JOB_RETENTION
+        self.proxmox_service = get_proxmox_service()
+
+        self._jobs: "OrderedDict[str, ActionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        metrics.register_queue('action_jobs', self.pending_actions)
+
+    def submit(self, action: str, targets: List[Dict]) -> ActionJob:
+        """
+        Create a job and start executing it in the background
+
+        Args:
+            action: Action to perform
+            targets: List of VM dictionaries (id, vmid, name, node, type)
+
+        Returns:
+            The created job
+        """
+        job = ActionJob(action, targets)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+
+        job.status = 'running'
+        for target in targets:
+            self.executor.submit(self._run_target, job, target)
+
+        logger.info(f"Submitted action job {job.id}: {action} on {len(targets)} VMs")
+        return job
+
+    def pending_actions(self) -> int:
+        """Number of VM actions of unfinished jobs that have not started yet"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if not job.finished]
+        return sum(len(job.targets) - len(job.results) for job in jobs)
+
+    def get_job(self, job_id: str) -> Optional[ActionJob]:
+        """Get job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel_job(self, job_id: str) -> Optional[ActionJob]:
+        """
+        Cancel a job
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            The job, or None if unknown
+        """
+        job = self.get_job(job_id)
+        if job and not job.finished:
+            job.cancel()
+            logger.info(f"Cancellation requested for action job {job_id}")
+        return job
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        excess = len(self._jobs) - self.retention
+        if excess <= 0:
+            return
+
+        for job_id in [jid for jid, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[job_id]
+
+    def _run_target(self, job: ActionJob, target: Dict):
+        """Execute the job action on a single VM"""
+        vmid = target['vmid']
+
+        if job.cancelled:
+            job.record(vmid, 'cancelled', name=target['name'])
+            return
+
+        job.record(vmid, 'running', name=target['name'])
+
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            upid = self.proxmox_service.execute_action(
+                target['node'], vmid, target['type'], job.action
+            )
+
+            db.add(ExecutionLog(
+                schedule_id=None,
+                vm_id=target['id'],
+                vmid=vmid,
+                vm_name=target['name'],
+                action=job.action,
+                status='success',
+                executed_at=datetime.now(),
+                upid=upid
+            ))
+            db.commit()
+
+            metrics.ACTION_DURATION_SECONDS.labels(job.action, 'success').observe(time.perf_counter() - start)
+            job.record(vmid, 'success', name=target['name'], upid=upid)
+
+        except Exception as e:
+            logger.error(f"Action job {job.id}: {job.action} on {vmid} failed: {str(e)}")
+            db.rollback()
+
+            try:
+                db.add(ExecutionLog(
+                    schedule_id=None,
+                    vm_id=target['id'],
+                    vmid=vmid,
+                    vm_name=target['name'],
+                    action=job.action,
+                    status='failed',
+                    executed_at=datetime.now(),
+                    error_message=str(e)
+                ))
+                db.commit()
+            except Exception as log_error:
+                logger.error(f"Failed to log action job result for {vmid}: {str(log_error)}")
+                db.rollback()
+
+            metrics.ACTION_DURATION_SECONDS.labels(job.action, 'failed').observe(time.perf_counter() - start)
+            job.record(vmid, 'failed', name=target['name'], error=str(e))
+
+        finally:
+            db.close()
+
+
+# Singleton instance
+_action_job_service = None
+
+
+def get_action_job_service() -> ActionJobService:
+    """Get singleton action job service instance"""
+    global _action_job_service
+    if _action_job_service is None:
+        _action_job_service = ActionJobService()
+    return _action_job_service
@@ -0,0 +1,181 @@
+"""
+Load Forecast
+Predicts per-minute, per-node action load of the enabled schedules
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Schedule, VM, GroupMember
+from app.utils.cron_index import CronIndex, compile_cron
+from app.utils.jitter import get_schedule_offset
+
+
+def _schedule_node_counts(db: Session, schedules) -> Dict[int, Counter]:
+    """
+    Count the VMs each schedule acts on per node
+
+    Args:
+        db: Database session
+        schedules: Schedule rows (id, target_type, target_id)
+
+    Returns:
+        Mapping of schedule ID to Counter of node -> number of VMs
+    """
+    vm_nodes = dict(db.query(VM.id, VM.node).all())
+
+    group_vms = defaultdict(list)
+    for group_id, vm_id in db.query(GroupMember.group_id, GroupMember.vm_id).all():
+        group_vms[group_id].append(vm_id)
+
+    counts = {}
+    for schedule in schedules:
+        if schedule.target_type == 'vm':
+            vm_ids = [schedule.target_id]
+        else:
+            vm_ids = group_vms.get(schedule.target_id, [])
+        counts[schedule.id] = Counter(vm_nodes[vm_id] for vm_id in vm_ids if vm_id in vm_nodes)
+
+    return counts
+
+
+def _cron_minute(minute: datetime, offset: int) -> datetime:
+    """Get the cron minute whose fire, delayed by offset seconds, lands in a given minute"""
+    base = minute - timedelta(seconds=offset)
+    if base.second:
+        base += timedelta(seconds=60 - base.second)
+    return base
+
+
+def _suggest_offsets(
+    load: Dict[datetime, Counter],
+    hotspots: List[Dict],
+    node_counts: Dict[int, Counter],
+    threshold: int,
+    max_offset: int
+) -> Dict[int, int]:
+    """
+    Greedily shift schedules out of hotspots
+
+    Largest contributors are moved first, each to the offset whose busiest
+    node ends up least loaded. Only the hotspot fire is re-planned, so the
+    result is an estimate for schedules firing more often than the window.
+
+    Returns:
+        Mapping of schedule ID to suggested offset in minutes
+    """
+    projected = defaultdict(Counter, {minute: Counter(nodes) for minute, nodes in load.items()})
+    offsets = {}
+
+    for hotspot in sorted(hotspots, key=lambda h: h['actions'], reverse=True):
+        minute, node = hotspot['minute'], hotspot['node']
+        contributors = sorted(
+            hotspot['schedule_ids'], key=lambda sid: node_counts[sid][node], reverse=True
+        )
+
+        for schedule_id in contributors:
+            if projected[minute][node] <= threshold:
+                break
+
+            counts = node_counts[schedule_id]
+            # Shifting cannot help a schedule that overloads a node on its own
+            if schedule_id in offsets or counts[node] > threshold:
+                continue
+
+            best = min(
+                range(1, max_offset + 1),
+                key=lambda offset: max(
+                    projected[minute + timedelta(minutes=offset)][n] + c for n, c in counts.items()
+                )
+            )
+            target = minute + timedelta(minutes=best)
+            projected[minute].subtract(counts)
+            projected[target].update(counts)
+            offsets[schedule_id] = best
+
+    return offsets
+
+
+def forecast_load(db: Session, hours: int = 24, threshold: int = None, start: datetime = None) -> Dict:
+    """
+    Forecast the action load of all enabled schedules
+
+    Fire times are enumerated once per distinct cron expression and jitter
+    offset; the per-node VM counts of all schedules sharing them are added
+    in one step.
+
+    Args:
+        db: Database session
+        hours: Forecast horizon in hours
+        threshold: Actions per node and minute above which a minute is a hotspot
+        start: Start of the horizon (default: now)
+
+    Returns:
+        Dictionary with load buckets, hotspots and suggested offsets
+    """
+    threshold = settings.FORECAST_HOTSPOT_THRESHOLD if threshold is None else threshold
+    start = start or datetime.now()
+    end = start + timedelta(hours=hours)
+
+    schedules = db.query(
+        Schedule.id, Schedule.name, Schedule.target_type, Schedule.target_id,
+        Schedule.cron_expression, Schedule.jitter_seconds
+    ).filter(Schedule.enabled == True).all()
+    names = {schedule.id: schedule.name for schedule in schedules}
+
+    node_counts = _schedule_node_counts(db, schedules)
+    index = CronIndex(
+        (schedule.id, schedule.cron_expression, get_schedule_offset(schedule.id, schedule.jitter_seconds))
+        for schedule in schedules
+    )
+
+    load: Dict[datetime, Counter] = defaultdict(Counter)
+    for (expression, offset), schedule_ids in index.groups.items():
+        group_counts = Counter()
+        for schedule_id in schedule_ids:
+            group_counts.update(node_counts[schedule_id])
+        if not group_counts:
+            continue
+
+        delay = timedelta(seconds=offset)
+        for fire_time in compile_cron(expression).iter_fire_times(start - delay, end - delay):
+            load[(fire_time + delay).replace(second=0)].update(group_counts)
+
+    buckets = [
+        {'minute': minute, 'node': node, 'actions': actions}
+        for minute in sorted(load)
+        for node, actions in sorted(load[minute].items())
+    ]
+
+    hotspots = []
+    for bucket in buckets:
+        if bucket['actions'] <= threshold:
+            continue
+        firing = [
+            schedule_id
+            for (expression, offset), schedule_ids in index.groups.items()
+            if compile_cron(expression).matches(_cron_minute(bucket['minute'], offset))
+            for schedule_id in schedule_ids
+            if node_counts[schedule_id][bucket['node']]
+        ]
+        hotspots.append({**bucket, 'schedule_ids': firing})
+
+    offsets = _suggest_offsets(
+        load, hotspots, node_counts, threshold, settings.FORECAST_MAX_OFFSET_MINUTES
+    )
+
+    return {
+        'start': start,
+        'end': end,
+        'threshold': threshold,
+        'total_actions': sum(bucket['actions'] for bucket in buckets),
+        'peak': max(buckets, key=lambda bucket: bucket['actions'], default=None),
+        'load': buckets,
+        'hotspots': hotspots,
+        'suggestions': [
+            {'schedule_id': schedule_id, 'name': names[schedule_id], 'offset_minutes': offset}
+            for schedule_id, offset in sorted(offsets.items())
+        ]
+    }
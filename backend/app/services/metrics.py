@@ -0,0 +1,199 @@
+"""
+Prometheus Metrics
+Metric definitions and helpers for instrumenting hot paths
+"""
+from functools import wraps
+from typing import Callable, Dict, Tuple
+import inspect
+import threading
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Proxmox API
+PROXMOX_REQUEST_SECONDS = Histogram(
+    'proxmox_request_duration_seconds',
+    'Latency of ProxmoxService calls',
+    ['method', 'node']
+)
+PROXMOX_REQUEST_ERRORS = Counter(
+    'proxmox_request_errors_total',
+    'Failed ProxmoxService calls',
+    ['method', 'node']
+)
+
+# Scheduler
+SCHEDULE_LAG_SECONDS = Histogram(
+    'schedule_fire_lag_seconds',
+    'Actual start minus planned fire time of scheduled runs',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+SCHEDULE_RUN_SECONDS = Histogram(
+    'schedule_run_duration_seconds',
+    'End-to-end duration of scheduled runs',
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+ACTION_DURATION_SECONDS = Histogram(
+    'vm_action_duration_seconds',
+    'Duration of VM actions including task wait',
+    ['action', 'status'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+# VM sync
+VM_SYNC_SECONDS = Histogram(
+    'vm_sync_duration_seconds',
+    'Duration of VM synchronizations',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+VM_SYNC_RUNS = Counter(
+    'vm_sync_runs_total',
+    'VM synchronizations by mode (full, incremental, idle)',
+    ['mode']
+)
+VM_SYNC_INTERVAL_SECONDS = Gauge(
+    'vm_sync_interval_seconds',
+    'Effective interval between scheduled full VM synchronizations'
+)
+VM_CHURN = Counter(
+    'vm_sync_changes_total',
+    'VM changes detected by synchronization',
+    ['change']
+)
+
+# Resource metrics collector
+RESOURCE_METRICS_COLLECT_SECONDS = Histogram(
+    'resource_metrics_collect_duration_seconds',
+    'Duration of resource metrics collections including rollups',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+# HTTP API
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'Latency of API requests',
+    ['method', 'route', 'status']
+)
+
+
+class CallbackGauges:
+    """
+    Collector of gauges read from callbacks at scrape time
+
+    Used instead of Gauge.set_function(), whose values are not written to
+    the files PROMETHEUS_MULTIPROC_DIR aggregates, so registries built on
+    MultiProcessCollector would drop them. This collector can be added to
+    such a registry and reports the values of the scraped process.
+    """
+
+    def __init__(self):
+        # Metric name -> (documentation, label name, {label value: callback})
+        self._gauges: Dict[str, Tuple[str, str, Dict[str, Callable[[], float]]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, documentation: str, label: str, value: str, callback: Callable[[], float]):
+        """
+        Register the callback of one labelled gauge value
+
+        Args:
+            name: Metric name
+            documentation: Metric help text
+            label: Label name
+            value: Label value
+            callback: Callable returning the current value
+        """
+        with self._lock:
+            self._gauges.setdefault(name, (documentation, label, {}))[2][value] = callback
+
+    def collect(self):
+        with self._lock:
+            gauges = [
+                (name, documentation, label, dict(callbacks))
+                for name, (documentation, label, callbacks) in self._gauges.items()
+            ]
+
+        for name, documentation, label, callbacks in gauges:
+            family = GaugeMetricFamily(name, documentation, labels=[label])
+            for value, callback in callbacks.items():
+                try:
+                    family.add_metric([value], callback())
+                except Exception:
+                    # A failing callback must not break the whole scrape
+                    continue
+            yield family
+
+
+CALLBACK_GAUGES = CallbackGauges()
+REGISTRY.register(CALLBACK_GAUGES)
+
+
+def observe_proxmox_call(func: Callable) -> Callable:
+    """
+    Decorator recording latency and errors of a ProxmoxService method
+
+    The node label is taken from the method's 'node' argument, or 'cluster'
+    for cluster-wide calls.
+    """
+    parameters = list(inspect.signature(func).parameters)
+    node_index = parameters.index('node') - 1 if 'node' in parameters else None
+    method = func.__name__
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        node = kwargs.get('node')
+        if node is None and node_index is not None and len(args) > node_index:
+            node = args[node_index]
+        labels = (method, node or 'cluster')
+
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        except Exception:
+            PROXMOX_REQUEST_ERRORS.labels(*labels).inc()
+            raise
+        finally:
+            PROXMOX_REQUEST_SECONDS.labels(*labels).observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def register_pool_metrics(engine):
+    """
+    Expose connection pool usage of a SQLAlchemy engine
+
+    Args:
+        engine: SQLAlchemy engine with a QueuePool
+    """
+    pool = engine.pool
+    for state, getter in (
+        ('size', 'size'),
+        ('checked_out', 'checkedout'),
+        ('checked_in', 'checkedin'),
+        ('overflow', 'overflow'),
+    ):
+        if hasattr(pool, getter):
+            CALLBACK_GAUGES.add(
+                'db_pool_connections', 'SQLAlchemy connection pool usage', 'state', state, getattr(pool, getter)
+            )
+
+
+def register_queue(name: str, depth: Callable[[], int]):
+    """
+    Expose the depth of a work queue
+
+    Args:
+        name: Queue label
+        depth: Callable returning the current number of waiting items
+    """
+    CALLBACK_GAUGES.add('queue_depth', 'Work waiting to be executed', 'queue', name, depth)
+
+
+def render_metrics():
+    """
+    Render all metrics in Prometheus text format
+
+    Returns:
+        Tuple of (payload, content type)
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
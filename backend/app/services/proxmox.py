@@ -2,21 +2,32 @@
 Proxmox API Service
 Wrapper around proxmoxer library for cluster management
 """
-from proxmoxer import ProxmoxAPI
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+import threading
 import logging
-from cryptography.fernet import Fernet
+import time
 
 from app.config import settings
+from app.services.metrics import observe_proxmox_call
+
+if TYPE_CHECKING:
+    from proxmoxer import ProxmoxAPI
 
 logger = logging.getLogger(__name__)
 
+# Actions that can be sent for many guests of a node at once, with the
+# node endpoint implementing them
+BULK_ACTIONS = {
+    'start': 'startall',
+    'shutdown': 'stopall',
+}
+
 
 class ProxmoxService:
     """Service for interacting with Proxmox API"""
     
     def __init__(self, host: str = None, user: str = None, token_name: str = None, 
-                 token_value: str = None, verify_ssl: bool = False):
+                 token_value: str = None, verify_ssl: bool = False, port: int = None):
         """
         Initialize Proxmox API connection
         
@@ -26,33 +37,45 @@ class ProxmoxService:
             token_name: API token name
             token_value: API token value (UUID)
             verify_ssl: Whether to verify SSL certificates
+            port: API port
         """
         self.host = host or settings.PROXMOX_HOST
         self.user = user or settings.PROXMOX_USER
         self.token_name = token_name or settings.PROXMOX_TOKEN_NAME
         self.token_value = token_value or settings.PROXMOX_TOKEN_VALUE
         self.verify_ssl = verify_ssl or settings.PROXMOX_VERIFY_SSL
+        self.port = port or settings.PROXMOX_PORT
         
         self._proxmox = None
+        
+        # Latest guest snapshot (monotonic fetch time, vmid -> resource)
+        self._snapshot: Optional[Tuple[float, Dict[int, Dict]]] = None
+        self._snapshot_lock = threading.Lock()
     
-    def _get_connection(self) -> ProxmoxAPI:
+    def _get_connection(self) -> "ProxmoxAPI":
         """Get or create Proxmox API connection"""
         if self._proxmox is None:
+            # Imported on first use so processes that never talk to
+            # Proxmox do not load proxmoxer and requests
+            from proxmoxer import ProxmoxAPI
+            
             try:
                 self._proxmox = ProxmoxAPI(
                     self.host,
+                    port=self.port,
                     user=self.user,
                     token_name=self.token_name,
                     token_value=self.token_value,
                     verify_ssl=self.verify_ssl
                 )
-                logger.info(f"Connected to Proxmox at {self.host}")
+                logger.info(f"Connected to Proxmox at {self.host}:{self.port}")
             except Exception as e:
                 logger.error(f"Failed to connect to Proxmox: {str(e)}")
                 raise
         
         return self._proxmox
     
+    @observe_proxmox_call
     def get_cluster_nodes(self) -> List[Dict]:
         """
         Get list of cluster nodes
@@ -69,6 +92,7 @@ class ProxmoxService:
             logger.error(f"Error getting cluster nodes: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def get_cluster_resources(self, resource_type: str = None) -> List[Dict]:
         """
         Get cluster resources (VMs, containers, etc.)
@@ -92,6 +116,59 @@ class ProxmoxService:
             logger.error(f"Error getting cluster resources: {str(e)}")
             raise
     
+    @observe_proxmox_call
+    def get_cluster_tasks(self) -> List[Dict]:
+        """
+        Get the recent tasks of all cluster nodes
+        
+        Returns:
+            List of task dictionaries (upid, node, type, id, starttime, and endtime once finished)
+        """
+        try:
+            proxmox = self._get_connection()
+            tasks = proxmox.cluster.tasks.get()
+            logger.debug(f"Retrieved {len(tasks)} cluster tasks")
+            return tasks
+        except Exception as e:
+            logger.error(f"Error getting cluster tasks: {str(e)}")
+            raise
+    
+    def _store_snapshot(self, resources: List[Dict]) -> Dict[int, Dict]:
+        """Keep the guests of a cluster/resources response as the latest snapshot"""
+        snapshot = {
+            resource['vmid']: resource
+            for resource in resources
+            if resource.get('type') in ('qemu', 'lxc')
+        }
+        self._snapshot = (time.monotonic(), snapshot)
+        return snapshot
+    
+    def get_vm_snapshot(self, max_age: float = None) -> Tuple[Dict[int, Dict], float]:
+        """
+        Get live state of all guests from a single cluster/resources call
+        
+        The snapshot is shared: it is reused while younger than max_age, and
+        concurrent callers wait for one fetch instead of each calling
+        Proxmox. get_all_vms() refreshes it as well.
+        
+        Args:
+            max_age: Maximum snapshot age in seconds (default: PROXMOX_SNAPSHOT_TTL_SECONDS)
+            
+        Returns:
+            Tuple of (mapping of VMID to resource dictionary, snapshot age in seconds)
+        """
+        if max_age is None:
+            max_age = settings.PROXMOX_SNAPSHOT_TTL_SECONDS
+        
+        with self._snapshot_lock:
+            if self._snapshot is not None:
+                age = time.monotonic() - self._snapshot[0]
+                if age <= max_age:
+                    return self._snapshot[1], age
+            
+            return self._store_snapshot(self.get_cluster_resources('vm')), 0.0
+    
+    @observe_proxmox_call
     def get_all_vms(self) -> List[Dict]:
         """
         Get all VMs and containers from cluster
@@ -100,7 +177,8 @@ class ProxmoxService:
             List of VM/container dictionaries with unified format
         """
         try:
-            resources = self.get_cluster_resources()
+            resources = self.get_cluster_resources('vm')
+            self._store_snapshot(resources)
             
             vms = []
             for resource in resources:
@@ -115,6 +193,7 @@ class ProxmoxService:
                         'maxmem': resource.get('maxmem'),
                         'maxdisk': resource.get('maxdisk'),
                         'uptime': resource.get('uptime'),
+                        'tags': resource.get('tags'),
                     }
                     vms.append(vm_data)
             
@@ -124,6 +203,7 @@ class ProxmoxService:
             logger.error(f"Error getting all VMs: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def get_vm_status(self, node: str, vmid: int, vm_type: str) -> Dict:
         """
         Get current status of a VM or container
@@ -152,6 +232,7 @@ class ProxmoxService:
             logger.error(f"Error getting VM status: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def start_vm(self, node: str, vmid: int, vm_type: str) -> str:
         """
         Start a VM or container
@@ -180,6 +261,7 @@ class ProxmoxService:
             logger.error(f"Error starting VM: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def stop_vm(self, node: str, vmid: int, vm_type: str) -> str:
         """
         Stop a VM or container (forced)
@@ -208,6 +290,7 @@ class ProxmoxService:
             logger.error(f"Error stopping VM: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def shutdown_vm(self, node: str, vmid: int, vm_type: str) -> str:
         """
         Gracefully shutdown a VM or container
@@ -236,6 +319,7 @@ class ProxmoxService:
             logger.error(f"Error shutting down VM: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def reboot_vm(self, node: str, vmid: int, vm_type: str) -> str:
         """
         Reboot a VM or container
@@ -264,6 +348,7 @@ class ProxmoxService:
             logger.error(f"Error rebooting VM: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def reset_vm(self, node: str, vmid: int, vm_type: str) -> str:
         """
         Reset (hard reboot) a VM
@@ -289,7 +374,78 @@ class ProxmoxService:
         except Exception as e:
             logger.error(f"Error resetting VM: {str(e)}")
             raise
-    
+
+    def execute_action(self, node: str, vmid: int, vm_type: str, action: str) -> str:
+        """
+        Execute a power action on a VM or container
+
+        Not instrumented itself: the handler it dispatches to records the call.
+
+        Args:
+            node: Node name
+            vmid: VM ID
+            vm_type: 'qemu' or 'lxc'
+            action: 'start', 'stop', 'restart', 'shutdown' or 'reset'
+
+        Returns:
+            Task UPID
+        """
+        handlers = {
+            'start': self.start_vm,
+            'stop': self.stop_vm,
+            'restart': self.reboot_vm,
+            'shutdown': self.shutdown_vm,
+            'reset': self.reset_vm,
+        }
+
+        handler = handlers.get(action)
+        if handler is None:
+            raise ValueError(f"Unknown action: {action}")
+
+        return handler(node, vmid, vm_type)
+
+    @observe_proxmox_call
+    def bulk_action(self, node: str, vmids: List[int], action: str) -> str:
+        """
+        Start or shut down several guests of a node with one call
+        
+        Uses nodes/{node}/startall or stopall, which process the guests in
+        their configured startup order. Shutdowns are never forced: a guest
+        that does not shut down within TASK_TIMEOUT_SECONDS keeps running.
+        
+        Args:
+            node: Node name
+            vmids: IDs of guests on this node
+            action: 'start' or 'shutdown'
+            
+        Returns:
+            UPID of the bulk task
+        """
+        endpoint = BULK_ACTIONS.get(action)
+        if endpoint is None:
+            raise ValueError(f"No bulk endpoint for action: {action}")
+        
+        try:
+            proxmox = self._get_connection()
+            params = {'vms': ','.join(str(vmid) for vmid in vmids)}
+            if action == 'start':
+                # Otherwise guests without 'onboot' are left out
+                params['force'] = 1
+            else:
+                # stopall hard-stops guests still running after the timeout
+                # unless told not to; shutdown_vm never does
+                params['force-stop'] = 0
+                params['timeout'] = settings.TASK_TIMEOUT_SECONDS
+
+            result = getattr(proxmox.nodes(node), endpoint).post(**params)
+            
+            logger.info(f"{endpoint} of {len(vmids)} guests on {node}, UPID: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"Error in {endpoint} on {node}: {str(e)}")
+            raise
+
+    @observe_proxmox_call
     def get_task_status(self, node: str, upid: str) -> Dict:
         """
         Get status of a Proxmox task
@@ -309,6 +465,7 @@ class ProxmoxService:
             logger.error(f"Error getting task status: {str(e)}")
             raise
     
+    @observe_proxmox_call
     def wait_for_task(self, node: str, upid: str, timeout: int = 300) -> Tuple[bool, str]:
         """
         Wait for a task to complete
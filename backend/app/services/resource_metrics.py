@@ -0,0 +1,335 @@
+"""
+Resource Metrics Service
+Samples CPU, memory, network and disk usage of all guests from cluster/resources
+and keeps raw samples plus 5 minute and 1 hour rollups with bounded retention
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import logging
+import threading
+import time
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import VMMetricSample
+from app.services import metrics
+from app.services.proxmox import get_proxmox_service
+
+logger = logging.getLogger(__name__)
+
+# Rollup resolutions in seconds, each built from the next finer one (0 = raw)
+ROLLUPS = [(300, 0), (3600, 300)]
+
+# Cumulative Proxmox counters stored as rates per second
+COUNTERS = ('netin', 'netout', 'diskread', 'diskwrite')
+
+# Columns returned by series queries
+SERIES_FIELDS = ('cpu', 'cpu_max', 'mem', 'maxmem', 'netin', 'netout', 'diskread', 'diskwrite')
+
+_samples_table = VMMetricSample.__table__
+
+
+def retention(resolution: int) -> timedelta:
+    """Get how long samples of a resolution are kept"""
+    if resolution == 0:
+        return timedelta(hours=settings.METRICS_RAW_RETENTION_HOURS)
+    if resolution == 300:
+        return timedelta(days=settings.METRICS_5MIN_RETENTION_DAYS)
+    return timedelta(days=settings.METRICS_1H_RETENTION_DAYS)
+
+
+def bucket_start(moment: datetime, resolution: int) -> datetime:
+    """Align a time to the start of its bucket"""
+    timestamp = moment.timestamp()
+    return datetime.fromtimestamp(timestamp - timestamp % resolution)
+
+
+def _weighted_average(rows: List[Dict], field: str) -> Optional[float]:
+    """Average of a field over rows, weighted by their sample counts"""
+    values = [(row[field], row['samples']) for row in rows if row[field] is not None]
+    total = sum(weight for _, weight in values)
+    return sum(value * weight for value, weight in values) / total if total else None
+
+
+def aggregate(rows: List[Dict]) -> Dict:
+    """
+    Combine samples or finer rollups of one VM into one rollup row
+
+    Args:
+        rows: Rows with samples and the fields of SERIES_FIELDS
+
+    Returns:
+        Rollup values (samples, averages, cpu_max and latest maxmem)
+    """
+    cpu_max = [row['cpu_max'] for row in rows if row['cpu_max'] is not None]
+    mem = _weighted_average(rows, 'mem')
+    return {
+        'samples': sum(row['samples'] for row in rows),
+        'cpu': _weighted_average(rows, 'cpu'),
+        'cpu_max': max(cpu_max) if cpu_max else None,
+        'mem': int(mem) if mem is not None else None,
+        'maxmem': rows[-1]['maxmem'],
+        **{field: _weighted_average(rows, field) for field in COUNTERS},
+    }
+
+
+def _insert_missing(db: Session):
+    """Build an insert into the samples table that skips rows whose key already exists"""
+    dialect = postgresql if db.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(_samples_table).on_conflict_do_nothing()
+
+
+class ResourceMetricsService:
+    """Service collecting and querying resource usage history of guests"""
+
+    def __init__(self):
+        self.proxmox_service = get_proxmox_service()
+        self._lock = threading.Lock()
+        # vmid -> (sample time, counter values) of the previous sample
+        self._counters: Dict[int, Tuple[datetime, Dict[str, int]]] = {}
+        self._last_snapshot = None
+        self._last_prune: Optional[datetime] = None
+
+    def collect(self, db: Session = None) -> dict:
+        """
+        Take one raw sample of all guests and roll up finished buckets
+
+        Args:
+            db: Database session (optional, will create if not provided)
+
+        Returns:
+            Dictionary with collection statistics
+        """
+        should_close_db = False
+        if db is None:
+            db = SessionLocal()
+            should_close_db = True
+
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                snapshot, age = self.proxmox_service.get_vm_snapshot()
+                sampled_at = datetime.now() - timedelta(seconds=age)
+
+                # A snapshot shared with other callers is only sampled once
+                rows = [] if snapshot is self._last_snapshot else self._raw_rows(snapshot, sampled_at)
+                self._last_snapshot = snapshot
+                if rows:
+                    db.execute(insert(_samples_table), rows)
+
+                rolled_up = self._roll_up(db, sampled_at)
+                pruned = self._prune(db, sampled_at)
+                db.commit()
+
+            metrics.RESOURCE_METRICS_COLLECT_SECONDS.observe(time.perf_counter() - start)
+            return {'samples': len(rows), 'rollups': rolled_up, 'pruned': pruned}
+
+        except Exception as e:
+            logger.error(f"Resource metrics collection failed: {str(e)}")
+            db.rollback()
+            raise
+
+        finally:
+            if should_close_db:
+                db.close()
+
+    def _raw_rows(self, snapshot: Dict[int, Dict], sampled_at: datetime) -> List[Dict]:
+        """Build raw sample rows, turning cumulative counters into rates"""
+        rows = []
+        counters = {}
+        for vmid, resource in snapshot.items():
+            if resource.get('template'):
+                continue
+
+            values = {field: resource.get(field) for field in COUNTERS}
+            counters[vmid] = (sampled_at, values)
+
+            # Rates need the previous sample; counter resets (restarts) give no rate
+            rates = dict.fromkeys(COUNTERS)
+            previous = self._counters.get(vmid)
+            if previous is not None:
+                elapsed = (sampled_at - previous[0]).total_seconds()
+                for field in COUNTERS:
+                    now_value, before = values[field], previous[1][field]
+                    if elapsed > 0 and now_value is not None and before is not None and now_value >= before:
+                        rates[field] = (now_value - before) / elapsed
+
+            cpu = resource.get('cpu')
+            rows.append({
+                'resolution': 0,
+                'vmid': vmid,
+                'ts': sampled_at,
+                'samples': 1,
+                'cpu': cpu,
+                'cpu_max': cpu,
+                'mem': resource.get('mem'),
+                'maxmem': resource.get('maxmem'),
+                **rates,
+            })
+
+        self._counters = counters
+        return rows
+
+    def _roll_up(self, db: Session, now: datetime) -> int:
+        """
+        Aggregate all finished buckets that are not rolled up yet
+
+        Progress is read from the newest rollup row on every run, and buckets
+        another worker already wrote are skipped on insert, so concurrent or
+        restarted collectors never fail on the same bucket.
+
+        Returns:
+            Number of rollup rows written
+        """
+        written = 0
+        for resolution, source in ROLLUPS:
+            until = bucket_start(now, resolution)
+            newest = db.execute(
+                select(func.max(_samples_table.c.ts)).where(_samples_table.c.resolution == resolution)
+            ).scalar()
+            since = newest + timedelta(seconds=resolution) if newest else until - retention(resolution)
+            if since >= until:
+                continue
+
+            columns = [_samples_table.c.vmid, _samples_table.c.ts, _samples_table.c.samples] + [
+                _samples_table.c[field] for field in SERIES_FIELDS
+            ]
+            source_rows = db.execute(
+                select(*columns).where(
+                    _samples_table.c.resolution == source,
+                    _samples_table.c.ts >= since,
+                    _samples_table.c.ts < until
+                ).order_by(_samples_table.c.ts)
+            ).mappings().all()
+
+            buckets = defaultdict(list)
+            for row in source_rows:
+                buckets[(row['vmid'], bucket_start(row['ts'], resolution))].append(row)
+
+            rows = [
+                {'resolution': resolution, 'vmid': vmid, 'ts': bucket, **aggregate(bucket_rows)}
+                for (vmid, bucket), bucket_rows in buckets.items()
+            ]
+            if rows:
+                db.execute(_insert_missing(db), rows)
+                written += len(rows)
+        return written
+
+    def _prune(self, db: Session, now: datetime) -> int:
+        """Delete samples past their retention, at most once per hour"""
+        if self._last_prune is not None and now - self._last_prune < timedelta(hours=1):
+            return 0
+        self._last_prune = now
+
+        pruned = 0
+        for resolution in [0] + [resolution for resolution, _ in ROLLUPS]:
+            result = db.execute(
+                delete(_samples_table).where(
+                    _samples_table.c.resolution == resolution,
+                    _samples_table.c.ts < now - retention(resolution)
+                )
+            )
+            pruned += result.rowcount
+        return pruned
+
+    def choose_resolution(self, since: datetime, now: datetime = None) -> int:
+        """
+        Pick the finest resolution whose retention still covers a start time
+
+        Args:
+            since: Start of the requested range
+            now: Current time (default: now)
+
+        Returns:
+            Resolution in seconds (0 = raw)
+        """
+        now = now or datetime.now()
+        for resolution in [0] + [resolution for resolution, _ in ROLLUPS]:
+            if since >= now - retention(resolution):
+                return resolution
+        return ROLLUPS[-1][0]
+
+    def get_series(self, db: Session, vmid: int, since: datetime, until: datetime, resolution: int) -> Dict:
+        """
+        Get the usage series of a VM as parallel lists
+
+        Args:
+            db: Database session
+            vmid: VM ID
+            since: Start of the range
+            until: End of the range
+            resolution: Resolution in seconds (0 = raw)
+
+        Returns:
+            Dictionary with timestamps and one list per field of SERIES_FIELDS
+        """
+        rows = db.execute(
+            select(_samples_table.c.ts, *(_samples_table.c[field] for field in SERIES_FIELDS)).where(
+                _samples_table.c.resolution == resolution,
+                _samples_table.c.vmid == vmid,
+                _samples_table.c.ts >= since,
+                _samples_table.c.ts < until
+            ).order_by(_samples_table.c.ts)
+        ).all()
+
+        return {
+            'timestamps': [row[0] for row in rows],
+            'series': {field: [row[index + 1] for row in rows] for index, field in enumerate(SERIES_FIELDS)},
+        }
+
+    def get_usage_summary(self, db: Session, vmids: List[int], minutes: int) -> Dict[int, Dict]:
+        """
+        Get recent average and peak usage of VMs from raw samples
+
+        Meant for decisions like skipping the shutdown of a busy VM.
+
+        Args:
+            db: Database session
+            vmids: VM IDs
+            minutes: Length of the window ending now
+
+        Returns:
+            Mapping of VMID to samples, cpu, cpu_max, mem and maxmem (VMs without samples are left out)
+        """
+        since = datetime.now() - timedelta(minutes=minutes)
+        rows = db.execute(
+            select(
+                _samples_table.c.vmid,
+                func.count(),
+                func.avg(_samples_table.c.cpu),
+                func.max(_samples_table.c.cpu),
+                func.avg(_samples_table.c.mem),
+                func.max(_samples_table.c.maxmem)
+            ).where(
+                _samples_table.c.resolution == 0,
+                _samples_table.c.vmid.in_(vmids),
+                _samples_table.c.ts >= since
+            ).group_by(_samples_table.c.vmid)
+        ).all()
+
+        return {
+            vmid: {
+                'samples': samples,
+                'cpu': float(cpu) if cpu is not None else None,
+                'cpu_max': float(cpu_max) if cpu_max is not None else None,
+                'mem': int(mem) if mem is not None else None,
+                'maxmem': maxmem,
+            }
+            for vmid, samples, cpu, cpu_max, mem, maxmem in rows
+        }
+
+
+# Singleton instance
+_resource_metrics_service = None
+
+
+def get_resource_metrics_service() -> ResourceMetricsService:
+    """Get singleton resource metrics service instance"""
+    global _resource_metrics_service
+    if _resource_metrics_service is None:
+        _resource_metrics_service = ResourceMetricsService()
+    return _resource_metrics_service
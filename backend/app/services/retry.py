@@ -0,0 +1,119 @@
+"""
+Retry Policy
+Error classification, backoff and retry budgets for Proxmox actions
+"""
+import random
+import threading
+
+from app.config import settings
+
+# Error classes
+TRANSIENT = 'transient'  # Network errors, timeouts, pveproxy 5xx
+LOCKED = 'locked'  # VM config lock held by another task
+PERMISSION = 'permission'  # Token lacks privileges
+NOT_FOUND = 'not_found'  # VM or node does not exist (anymore)
+INVALID_STATE = 'invalid_state'  # VM is not in a state the action applies to
+UNKNOWN = 'unknown'
+
+# Error classes worth retrying
+RETRYABLE = (TRANSIENT, LOCKED)
+
+_LOCK_MARKERS = ("can't lock", "lock file", "is locked")
+_PERMISSION_MARKERS = ("permission", "unauthorized", "forbidden")
+_NOT_FOUND_MARKERS = ("does not exist", "not found", "no such")
+_INVALID_STATE_MARKERS = ("not running", "already running")
+_TRANSIENT_MARKERS = ("timed out", "timeout", "connection", "temporarily", "595")
+
+
+def classify_error(error) -> str:
+    """
+    Classify an action error
+
+    Args:
+        error: Exception raised by the Proxmox API, or an error message
+
+    Returns:
+        One of TRANSIENT, LOCKED, PERMISSION, NOT_FOUND, INVALID_STATE, UNKNOWN
+    """
+    message = str(error).lower()
+
+    # pveproxy reports lock, permission, missing config and VM state errors
+    # as 500, so the message is checked before the status code
+    if any(marker in message for marker in _LOCK_MARKERS):
+        return LOCKED
+    if any(marker in message for marker in _PERMISSION_MARKERS):
+        return PERMISSION
+    if any(marker in message for marker in _NOT_FOUND_MARKERS):
+        return NOT_FOUND
+    if any(marker in message for marker in _INVALID_STATE_MARKERS):
+        return INVALID_STATE
+
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        response = getattr(error, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+
+    if status_code in (401, 403):
+        return PERMISSION
+    if status_code == 404:
+        return NOT_FOUND
+    if status_code is not None and status_code >= 500:
+        return TRANSIENT
+
+    # requests.ConnectionError / Timeout and proxmoxer connection failures
+    error_names = {cls.__name__ for cls in type(error).__mro__} if isinstance(error, Exception) else set()
+    if error_names & {'ConnectionError', 'Timeout', 'TimeoutError', 'ConnectTimeout', 'ReadTimeout'}:
+        return TRANSIENT
+
+    if any(marker in message for marker in _TRANSIENT_MARKERS):
+        return TRANSIENT
+
+    return UNKNOWN
+
+
+def is_retryable(error_class: str) -> bool:
+    """Check whether an error class is worth retrying"""
+    return error_class in RETRYABLE
+
+
+def compute_backoff(attempt: int, base: float = None, cap: float = None) -> float:
+    """
+    Compute an exponential backoff delay with jitter
+
+    The delay is drawn from the upper half of the exponential window so
+    retries of many VMs spread out without retrying too early.
+
+    Args:
+        attempt: Number of the attempt that failed (1 = first try)
+        base: Base delay in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        Delay in seconds before the next attempt
+    """
+    base = settings.RETRY_BASE_DELAY_SECONDS if base is None else base
+    cap = settings.RETRY_MAX_DELAY_SECONDS if cap is None else cap
+
+    ceiling = min(cap, base * (2 ** max(attempt - 1, 0)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class RetryBudget:
+    """Number of retries a single schedule run may spend across all its VMs"""
+
+    def __init__(self, retries: int):
+        self.remaining = max(retries or 0, 0)
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """
+        Consume one retry
+
+        Returns:
+            True if a retry was available
+        """
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
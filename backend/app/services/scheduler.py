@@ -3,20 +3,69 @@ Scheduler Service
 Manages scheduled tasks using APScheduler
 """
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
 from apscheduler.jobstores.memory import MemoryJobStore
-from datetime import datetime
+from apscheduler.executors.pool import ThreadPoolExecutor as JobThreadPoolExecutor
+from apscheduler.events import EVENT_JOB_MISSED
+from apscheduler.util import localize
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import update, bindparam
 from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+import threading
 import logging
+import time
 
+from app.config import settings
 from app.database import SessionLocal
-from app.models import Schedule, ExecutionLog, VM, Group, GroupMember
-from app.services.proxmox import get_proxmox_service
+from app.models import Schedule, ScheduleRun, ExecutionLog, VM, Group, GroupMember
+from app.services import metrics
+from app.services import table_versions  # noqa: F401 - counts the writes of runs and logs
+from app.services.proxmox import get_proxmox_service, BULK_ACTIONS
+from app.services.retry import RetryBudget, classify_error, is_retryable, compute_backoff, LOCKED, UNKNOWN
+from app.services.scheduler_workers import WorkerPool
 from app.utils.blackout_checker import is_in_blackout
+from app.utils.cron_index import CronIndex, compile_cron
 from app.utils.cron_validator import get_next_run_time
+from app.utils.dependency_graph import load_group_graph, has_dependencies, topological_levels
+from app.utils.jitter import get_schedule_offset
 
 logger = logging.getLogger(__name__)
 
+# Schedules get their job once their next fire is this close; until then
+# they wait in SchedulerService._deferred
+JOB_HORIZON = timedelta(hours=1)
+
+
+class _ScheduledRun:
+    """View of a schedule job that passes one scheduled run time to the job function"""
+    
+    def __init__(self, job, run_time: datetime):
+        self._job = job
+        self.kwargs = {**job.kwargs, 'planned_at': run_time.replace(tzinfo=None)}
+    
+    def __getattr__(self, name):
+        return getattr(self._job, name)
+    
+    def __str__(self):
+        return str(self._job)
+
+
+class ScheduleJobExecutor(JobThreadPoolExecutor):
+    """
+    Thread pool executor handing schedule jobs their scheduled run time
+    
+    APScheduler only passes the run time to listeners, which run after the
+    job was submitted. Schedule jobs are coalesced, so each submission has
+    exactly one run time.
+    """
+    
+    def _do_submit_job(self, job, run_times):
+        if job.func is _fire_schedule_job and len(run_times) == 1:
+            job = _ScheduledRun(job, run_times[0])
+        super()._do_submit_job(job, run_times)
+
 
 class SchedulerService:
     """Service for managing scheduled VM/container actions"""
@@ -26,70 +75,206 @@ class SchedulerService:
         jobstores = {
             'default': MemoryJobStore()
         }
+        executors = {
+            'default': ScheduleJobExecutor(settings.SCHEDULER_POOL_SIZE)
+        }
         
-        self.scheduler = BackgroundScheduler(jobstores=jobstores)
+        self.scheduler = BackgroundScheduler(jobstores=jobstores, executors=executors)
+        self.scheduler.add_listener(self._on_job_missed, EVENT_JOB_MISSED)
         self.proxmox_service = get_proxmox_service()
+        self.worker_pool = None
         self._running = False
+        
+        # Run record and retry budget of the run in progress of each schedule;
+        # retries of a run carry both in their job arguments
+        self._run_ids: Dict[int, int] = {}
+        self._retry_budgets: Dict[int, RetryBudget] = {}
+        
+        # Schedules without a job yet: schedule ID -> (cron expression, offset, next fire)
+        self._deferred: Dict[int, Tuple[str, int, Optional[datetime]]] = {}
+        self._deferred_lock = threading.Lock()
+        
+        metrics.register_queue('retries', self.pending_retries)
     
     def start(self):
         """Start the scheduler"""
         if not self._running:
-            self.scheduler.start()
-            self._running = True
-            logger.info("Scheduler started")
+            # Workers are started before any scheduler thread exists
+            if settings.SCHEDULER_EXECUTOR == 'process':
+                self.worker_pool = WorkerPool(settings.SCHEDULER_WORKERS, settings.SCHEDULER_POOL_SIZE)
+                self.worker_pool.start()
+                metrics.register_queue('scheduled_runs', self.worker_pool.depth)
             
-            # Load all enabled schedules
+            # Load all enabled schedules; jobs added before start() are
+            # queued and scheduled in a single pass when the scheduler starts
             self.load_schedules()
+            self.scheduler.add_job(
+                func=self._register_deferred_jobs,
+                trigger='interval',
+                seconds=JOB_HORIZON.total_seconds() / 2,
+                id='register_deferred_schedules',
+                replace_existing=True,
+                coalesce=True
+            )
+            self.scheduler.start()
+            
+            self._running = True
+            logger.info(f"Scheduler started ({settings.SCHEDULER_EXECUTOR} executor)")
     
     def stop(self):
         """Stop the scheduler"""
         if self._running:
             self.scheduler.shutdown()
+            if self.worker_pool:
+                self.worker_pool.stop()
+                self.worker_pool = None
             self._running = False
             logger.info("Scheduler stopped")
     
+    def pending_retries(self) -> int:
+        """Number of queued action retries"""
+        return sum(1 for job in self.scheduler.get_jobs() if job.id.startswith('retry_'))
+    
     def load_schedules(self):
-        """Load all enabled schedules from database"""
+        """
+        Load all enabled schedules from database
+        
+        Uses one query for the schedules and one bulk UPDATE for their
+        next_run timestamps. Next run times are computed once per distinct
+        cron expression and offset, and handed to the jobs as well so the
+        scheduler does not evaluate every trigger again on start.
+        
+        Only schedules firing within JOB_HORIZON get their job here, since
+        creating APScheduler jobs dominates startup; the others are deferred
+        to _register_deferred_jobs().
+        """
         db = SessionLocal()
         try:
-            schedules = db.query(Schedule).filter(Schedule.enabled == True).all()
+            schedules = db.query(
+                Schedule.id, Schedule.cron_expression, Schedule.jitter_seconds, Schedule.next_run
+            ).filter(Schedule.enabled == True).all()
             
+            offsets = {
+                schedule.id: get_schedule_offset(schedule.id, schedule.jitter_seconds)
+                for schedule in schedules
+            }
+            index = CronIndex(
+                (schedule.id, schedule.cron_expression, offsets[schedule.id]) for schedule in schedules
+            )
+            now = datetime.now()
+            next_runs = index.next_fire_times(now)
+            horizon = now + JOB_HORIZON
+            deferred = {}
+            
+            # Schedules with unsupported expressions are not in the index;
+            # they are not scheduled and keep their next_run
             for schedule in schedules:
-                self.add_schedule(schedule.id, schedule.cron_expression)
+                if schedule.id not in next_runs:
+                    logger.error(f"Error adding schedule {schedule.id}: unsupported cron expression")
+                    continue
+                
+                next_run = next_runs[schedule.id]
+                if next_run is None or next_run > horizon:
+                    deferred[schedule.id] = (schedule.cron_expression, offsets[schedule.id], next_run)
+                    continue
+                
+                self._add_job(
+                    schedule.id, schedule.cron_expression, offsets[schedule.id],
+                    next_run_time=localize(next_run, self.scheduler.timezone)
+                )
+            
+            with self._deferred_lock:
+                self._deferred = deferred
             
-            logger.info(f"Loaded {len(schedules)} schedules")
+            # Only next_run values that changed since the last start are written
+            changed = [
+                {'schedule_id': schedule.id, 'next_run_at': next_runs[schedule.id]}
+                for schedule in schedules
+                if schedule.id in next_runs and schedule.next_run != next_runs[schedule.id]
+            ]
+            if changed:
+                schedules_table = Schedule.__table__
+                db.execute(
+                    update(schedules_table)
+                    .where(schedules_table.c.id == bindparam('schedule_id'))
+                    .values(next_run=bindparam('next_run_at')),
+                    changed
+                )
+                db.commit()
+            
+            logger.info(f"Loaded {len(next_runs)} of {len(schedules)} schedules")
         finally:
             db.close()
     
-    def add_schedule(self, schedule_id: int, cron_expression: str):
+    def _register_deferred_jobs(self):
+        """Create the jobs of deferred schedules whose next fire is within JOB_HORIZON"""
+        horizon = datetime.now() + JOB_HORIZON
+        
+        # The lock keeps remove_schedule() from racing the job creation
+        with self._deferred_lock:
+            due = [
+                (schedule_id, entry) for schedule_id, entry in self._deferred.items()
+                if entry[2] is not None and entry[2] <= horizon
+            ]
+            for schedule_id, (cron_expression, offset, next_run) in due:
+                del self._deferred[schedule_id]
+                self._add_job(
+                    schedule_id, cron_expression, offset,
+                    next_run_time=localize(next_run, self.scheduler.timezone)
+                )
+        
+        if due:
+            logger.info(f"Registered {len(due)} deferred schedules")
+    
+    def scheduled_count(self) -> int:
+        """Number of schedules with a job or a deferred one"""
+        with self._deferred_lock:
+            deferred = len(self._deferred)
+        return deferred + sum(1 for job in self.scheduler.get_jobs() if job.id.startswith('schedule_'))
+    
+    def _add_job(self, schedule_id: int, cron_expression: str, offset: int, **job_options):
+        """
+        Register the job of a schedule, replacing an existing one
+        
+        Args:
+            schedule_id: Schedule ID
+            cron_expression: Cron expression
+            offset: Jitter offset in seconds
+            **job_options: Extra add_job() options, e.g. a precomputed next_run_time
+        """
+        # The compiled trigger keeps cron day-of-week semantics, which
+        # CronTrigger.from_crontab() does not
+        self.scheduler.add_job(
+            func=_fire_schedule_job,
+            trigger=compile_cron(cron_expression).to_trigger(offset_seconds=offset),
+            args=[self, schedule_id],
+            id=f"schedule_{schedule_id}",
+            name=f"schedule_{schedule_id}",
+            replace_existing=True,
+            misfire_grace_time=settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+            coalesce=True,
+            **job_options
+        )
+    
+    def add_schedule(self, schedule_id: int, cron_expression: str, jitter_seconds: Optional[int] = None):
         """
         Add a schedule to the scheduler
         
         Args:
             schedule_id: Schedule ID
             cron_expression: Cron expression
+            jitter_seconds: Spread window (None = global SCHEDULE_JITTER_SECONDS)
         """
         try:
-            # Create job ID
-            job_id = f"schedule_{schedule_id}"
+            offset = get_schedule_offset(schedule_id, jitter_seconds)
+            with self._deferred_lock:
+                self._deferred.pop(schedule_id, None)
+                self._add_job(schedule_id, cron_expression, offset)
             
-            # Remove existing job if present
-            if self.scheduler.get_job(job_id):
-                self.scheduler.remove_job(job_id)
-            
-            # Add new job
-            self.scheduler.add_job(
-                func=self.execute_schedule,
-                trigger=CronTrigger.from_crontab(cron_expression),
-                args=[schedule_id],
-                id=job_id,
-                replace_existing=True
-            )
-            
-            logger.info(f"Added schedule {schedule_id} with cron: {cron_expression}")
+            logger.info(f"Added schedule {schedule_id} with cron: {cron_expression} (+{offset}s)")
             
             # Update next_run time in database
-            self.update_next_run(schedule_id, cron_expression)
+            self.update_next_run(schedule_id, cron_expression, offset)
         
         except Exception as e:
             logger.error(f"Error adding schedule {schedule_id}: {str(e)}")
@@ -103,47 +288,74 @@ class SchedulerService:
         """
         try:
             job_id = f"schedule_{schedule_id}"
-            if self.scheduler.get_job(job_id):
-                self.scheduler.remove_job(job_id)
+            with self._deferred_lock:
+                removed = self._deferred.pop(schedule_id, None) is not None
+                if self.scheduler.get_job(job_id):
+                    self.scheduler.remove_job(job_id)
+                    removed = True
+            if removed:
                 logger.info(f"Removed schedule {schedule_id}")
         except Exception as e:
             logger.error(f"Error removing schedule {schedule_id}: {str(e)}")
     
-    def update_schedule(self, schedule_id: int, cron_expression: str):
+    def update_schedule(self, schedule_id: int, cron_expression: str, jitter_seconds: Optional[int] = None):
         """
         Update a schedule
         
         Args:
             schedule_id: Schedule ID
             cron_expression: New cron expression
+            jitter_seconds: Spread window (None = global SCHEDULE_JITTER_SECONDS)
         """
-        self.add_schedule(schedule_id, cron_expression)
+        self.add_schedule(schedule_id, cron_expression, jitter_seconds)
     
-    def update_next_run(self, schedule_id: int, cron_expression: str):
+    def update_next_run(self, schedule_id: int, cron_expression: str, offset_seconds: int = 0):
         """
         Update next_run timestamp in database
         
         Args:
             schedule_id: Schedule ID
             cron_expression: Cron expression
+            offset_seconds: Jitter offset of the schedule
         """
         db = SessionLocal()
         try:
             schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
             if schedule:
-                next_run = get_next_run_time(cron_expression)
+                next_run = get_next_run_time(cron_expression, offset_seconds=offset_seconds)
                 schedule.next_run = next_run
                 db.commit()
         finally:
             db.close()
     
-    def execute_schedule(self, schedule_id: int):
+    def fire_schedule(self, schedule_id: int, planned_at: Optional[datetime] = None):
+        """
+        Run a schedule in this process or hand it to a worker process
+        
+        Args:
+            schedule_id: Schedule ID
+            planned_at: Fire time the run was scheduled for
+        """
+        if self.worker_pool:
+            # The job returns once the run is queued, so max_instances cannot
+            # keep a slow run from overlapping the next fire; the pool does
+            if not self.worker_pool.submit(schedule_id, planned_at):
+                logger.warning(f"Schedule {schedule_id} skipped: previous run still in progress")
+        else:
+            self.execute_schedule(schedule_id, planned_at)
+    
+    def execute_schedule(self, schedule_id: int, planned_at: Optional[datetime] = None):
         """
         Execute a scheduled task
         
         Args:
             schedule_id: Schedule ID
+            planned_at: Fire time the run was scheduled for (None for manual runs)
         """
+        started_at = datetime.now()
+        run_id = None
+        run_status = 'completed'
+        
         db = SessionLocal()
         try:
             logger.info(f"Executing schedule {schedule_id}")
@@ -154,33 +366,115 @@ class SchedulerService:
                 logger.error(f"Schedule {schedule_id} not found")
                 return
             
+            # Record planned versus actual start of this fire; manual runs
+            # were not planned and have no lag
+            offset = get_schedule_offset(schedule.id, schedule.jitter_seconds)
+            lag = None
+            if planned_at is None:
+                planned_at = started_at
+            else:
+                lag = max((started_at - planned_at).total_seconds(), 0)
+                metrics.SCHEDULE_LAG_SECONDS.observe(lag)
+            
+            run = ScheduleRun(
+                schedule_id=schedule.id,
+                planned_at=planned_at,
+                started_at=started_at,
+                lag_seconds=lag,
+                status='running'
+            )
+            db.add(run)
+            db.commit()
+            run_id = run.id
+            self._run_ids[schedule.id] = run_id
+            
             # Check if in blackout window
             in_blackout, reason = is_in_blackout(db)
             if in_blackout:
                 logger.info(f"Schedule {schedule_id} skipped: {reason}")
                 self._log_execution(db, schedule, None, 'skipped', skipped_reason=reason)
+                run_status = 'skipped'
                 return
             
+            self._retry_budgets[schedule.id] = RetryBudget(schedule.retry_budget)
+            
             # Get target VMs
             vms = self._get_target_vms(db, schedule)
             
             if not vms:
                 logger.warning(f"No VMs found for schedule {schedule_id}")
+                run_status = 'skipped'
                 return
             
-            # Execute action on each VM
-            for vm in vms:
-                self._execute_vm_action(db, schedule, vm)
+            # Skip actions that would not change the VM state
+            if settings.SKIP_NOOP_ACTIONS:
+                vms = self._skip_noop_actions(db, schedule, vms)
+                
+                if not vms:
+                    logger.info(f"Schedule {schedule_id} skipped: all VMs already in target state")
+                    schedule.last_run = datetime.now()
+                    schedule.next_run = get_next_run_time(schedule.cron_expression, offset_seconds=offset)
+                    db.commit()
+                    run_status = 'skipped'
+                    return
+            
+            # Ordered groups run as a dependency graph, everything else
+            # according to the schedule's execution policy
+            graph = None
+            if schedule.target_type == 'group':
+                graph = load_group_graph(db, schedule.target_id, schedule.action)
+            
+            if graph and has_dependencies(graph):
+                self._execute_graph(db, schedule, vms, graph)
+            else:
+                self._execute_rolling(db, schedule, vms)
             
             # Update last_run and next_run
             schedule.last_run = datetime.now()
-            schedule.next_run = get_next_run_time(schedule.cron_expression)
+            schedule.next_run = get_next_run_time(schedule.cron_expression, offset_seconds=offset)
             db.commit()
         
         except Exception as e:
             logger.error(f"Error executing schedule {schedule_id}: {str(e)}")
             db.rollback()
+            run_status = 'failed'
         
+        finally:
+            if run_id is not None:
+                self._finish_run(db, run_id, planned_at, run_status)
+            db.close()
+            metrics.SCHEDULE_RUN_SECONDS.observe((datetime.now() - started_at).total_seconds())
+    
+    def _finish_run(self, db: Session, run_id: int, planned_at: datetime, status: str):
+        """Store completion time and final status of a schedule run"""
+        finished_at = datetime.now()
+        try:
+            db.query(ScheduleRun).filter(ScheduleRun.id == run_id).update({
+                ScheduleRun.finished_at: finished_at,
+                ScheduleRun.completion_seconds: (finished_at - planned_at).total_seconds(),
+                ScheduleRun.status: status
+            }, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error finishing schedule run {run_id}: {str(e)}")
+            db.rollback()
+    
+    def _on_job_missed(self, event):
+        """Record fires APScheduler dropped because they started too late"""
+        if not event.job_id.startswith('schedule_'):
+            return
+        
+        schedule_id = int(event.job_id[len('schedule_'):])
+        planned_at = event.scheduled_run_time.replace(tzinfo=None)
+        logger.warning(f"Schedule {schedule_id} missed its fire time {planned_at}")
+        
+        db = SessionLocal()
+        try:
+            db.add(ScheduleRun(schedule_id=schedule_id, planned_at=planned_at, status='missed'))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error recording missed run of schedule {schedule_id}: {str(e)}")
+            db.rollback()
         finally:
             db.close()
     
@@ -195,10 +489,10 @@ class SchedulerService:
                 vms.append(vm)
         
         elif schedule.target_type == 'group':
-            # Group of VMs
+            # Group of VMs, in start order
             group_members = db.query(GroupMember).filter(
                 GroupMember.group_id == schedule.target_id
-            ).all()
+            ).order_by(GroupMember.start_order, GroupMember.id).all()
             
             for member in group_members:
                 if member.vm:
@@ -206,60 +500,528 @@ class SchedulerService:
         
         return vms
     
+    def _skip_noop_actions(self, db: Session, schedule: Schedule, vms: List[VM]) -> List[VM]:
+        """
+        Drop VMs already in the target state, based on one cluster snapshot
+        
+        Skipped VMs are logged with a reason. The cached node is refreshed
+        for VMs that migrated since the last sync. If the snapshot cannot be
+        fetched, all VMs are kept.
+        
+        Args:
+            db: Database session
+            schedule: Schedule being executed
+            vms: Target VMs
+            
+        Returns:
+            VMs the action still has to be sent to
+        """
+        try:
+            snapshot = {vm_data['vmid']: vm_data for vm_data in self.proxmox_service.get_all_vms()}
+        except Exception as e:
+            logger.warning(f"Cluster snapshot unavailable, not skipping no-op actions: {str(e)}")
+            return vms
+        
+        remaining = []
+        for vm in vms:
+            vm_data = snapshot.get(vm.vmid)
+            
+            if vm_data is None:
+                self._log_execution(db, schedule, vm, 'skipped', skipped_reason='VM not found in cluster')
+                continue
+            
+            reason = get_noop_reason(schedule.action, vm_data.get('status'))
+            if reason:
+                logger.info(f"Skipping {schedule.action} on {vm.vmid}: {reason}")
+                self._log_execution(db, schedule, vm, 'skipped', skipped_reason=reason)
+                continue
+            
+            if vm_data.get('node') and vm_data['node'] != vm.node:
+                vm.node = vm_data['node']
+            
+            remaining.append(vm)
+        
+        return remaining
+    
+    def _execute_rolling(self, db: Session, schedule: Schedule, vms: List[VM]):
+        """
+        Execute the schedule action in batches
+        
+        Start and shutdown of several VMs on a node go out as one bulk call
+        per node first (see _execute_bulk). The remaining VMs are split into
+        batches of schedule.batch_size which run concurrently, with
+        schedule.batch_delay_seconds between batches.
+        
+        Args:
+            db: Database session
+            schedule: Schedule being executed
+            vms: Target VMs
+        """
+        if self._use_bulk(schedule):
+            vms = self._execute_bulk(db, schedule, vms)
+        
+        batch_size = max(schedule.batch_size or 1, 1)
+        
+        for index in range(0, len(vms), batch_size):
+            if index and schedule.batch_delay_seconds:
+                time.sleep(schedule.batch_delay_seconds)
+            
+            self._execute_batch(db, schedule, vms[index:index + batch_size])
+    
+    def _use_bulk(self, schedule: Schedule) -> bool:
+        """
+        Check whether a schedule's action can use startall/stopall calls
+        
+        A bulk call puts all guests of a node in flight at once and its task
+        is not awaited, so it is only used for schedules without a rolling
+        policy: batch size 1, no batch delay, no per-node limit and no
+        waiting for completion.
+        """
+        return bool(
+            settings.PROXMOX_BULK_ACTIONS
+            and schedule.action in BULK_ACTIONS
+            and (schedule.batch_size or 1) <= 1
+            and not schedule.batch_delay_seconds
+            and not schedule.max_in_flight_per_node
+            and not schedule.wait_for_completion
+        )
+    
+    def _execute_batch(self, db: Session, schedule: Schedule, vms: List[VM]):
+        """
+        Execute the schedule action on a batch of VMs concurrently
+        
+        Proxmox calls run in worker threads, limited per node by
+        schedule.max_in_flight_per_node. A VM counts as in flight until its
+        task has finished when waiting is enabled. Results are logged from
+        the calling thread since the session is not thread-safe.
+        
+        Args:
+            db: Database session
+            schedule: Schedule being executed
+            vms: VMs of this batch
+        """
+        if len(vms) == 1:
+            self._execute_vm_action(db, schedule, vms[0])
+            return
+        
+        max_in_flight = schedule.max_in_flight_per_node or 0
+        wait = bool(schedule.wait_for_completion or max_in_flight)
+        
+        node_slots = {}
+        if max_in_flight:
+            node_slots = {
+                node: threading.BoundedSemaphore(max_in_flight)
+                for node in {vm.node for vm in vms}
+            }
+        
+        workers = min(len(vms), settings.SCHEDULER_ACTION_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"schedule-{schedule.id}") as pool:
+            futures = [
+                (vm, pool.submit(
+                    self._perform_action, schedule.action, vm.node, vm.vmid, vm.type,
+                    wait, node_slots.get(vm.node)
+                ))
+                for vm in vms
+            ]
+            
+            for vm, future in futures:
+                self._record_result(db, schedule, vm, future.result())
+    
+    def _execute_bulk(self, db: Session, schedule: Schedule, vms: List[VM]) -> List[VM]:
+        """
+        Execute the schedule action with one startall/stopall call per node
+        
+        Covers all target VMs of the run. Nodes with a single target VM, and
+        nodes whose bulk call is rejected, are left to per-VM calls. The bulk
+        tasks are not awaited, so each VM of an accepted call is logged as
+        successful with the call's UPID.
+        
+        Args:
+            db: Database session
+            schedule: Schedule being executed
+            vms: Target VMs
+            
+        Returns:
+            VMs that still need a per-VM action
+        """
+        by_node = defaultdict(list)
+        for vm in vms:
+            by_node[vm.node].append(vm)
+        
+        bulk_nodes = {node: node_vms for node, node_vms in by_node.items() if len(node_vms) > 1}
+        remaining = [vm for vm in vms if vm.node not in bulk_nodes]
+        if not bulk_nodes:
+            return remaining
+        
+        workers = min(len(bulk_nodes), settings.SCHEDULER_ACTION_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"schedule-{schedule.id}") as pool:
+            futures = [
+                (node, pool.submit(
+                    self._perform_bulk_action, schedule.action, node,
+                    [vm.vmid for vm in node_vms]
+                ))
+                for node, node_vms in bulk_nodes.items()
+            ]
+            
+            for node, future in futures:
+                result = future.result()
+                
+                if result['upid'] is None:
+                    logger.warning(
+                        f"Bulk {schedule.action} on {node} failed, "
+                        f"falling back to per-VM actions: {result['error']}"
+                    )
+                    remaining.extend(bulk_nodes[node])
+                    continue
+                
+                for vm in bulk_nodes[node]:
+                    self._record_result(db, schedule, vm, dict(result))
+        
+        return remaining
+    
+    def _execute_graph(self, db: Session, schedule: Schedule, vms: List[VM],
+                       prerequisites: Dict[int, set]):
+        """
+        Execute the schedule action following a dependency graph
+        
+        Every VM starts as soon as all of its prerequisites have finished
+        their Proxmox task, so independent branches run in parallel.
+        Retries happen inline since dependents have to wait for them anyway;
+        dependents of a VM that finally failed are skipped. schedule.max_in_flight_per_node
+        is honoured; batch settings do not apply to ordered groups.
+        
+        Args:
+            db: Database session
+            schedule: Schedule being executed
+            vms: Target VMs
+            prerequisites: Mapping of VM ID to the VM IDs that must finish first
+        """
+        if not vms:
+            return
+        
+        by_id = {vm.id: vm for vm in vms}
+        
+        try:
+            topological_levels(prerequisites)
+        except ValueError as e:
+            for vm in vms:
+                self._log_execution(db, schedule, vm, 'skipped', skipped_reason=str(e))
+            logger.error(f"Schedule {schedule.id} not executed: {str(e)}")
+            return
+        
+        remaining = {
+            vm_id: {other for other in prerequisites.get(vm_id, ()) if other in by_id}
+            for vm_id in by_id
+        }
+        dependents = defaultdict(set)
+        for vm_id, before in remaining.items():
+            for other in before:
+                dependents[other].add(vm_id)
+        
+        max_in_flight = schedule.max_in_flight_per_node or 0
+        node_slots = {}
+        if max_in_flight:
+            node_slots = {
+                node: threading.BoundedSemaphore(max_in_flight)
+                for node in {vm.node for vm in vms}
+            }
+        
+        blocked = set()
+        budget = self._retry_budgets.get(schedule.id)
+        workers = min(len(vms), settings.SCHEDULER_ACTION_WORKERS)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"schedule-{schedule.id}") as pool:
+            running = {}
+            
+            def launch(vm_id):
+                vm = by_id[vm_id]
+                future = pool.submit(
+                    self._perform_with_retries, schedule.action, vm.node, vm.vmid, vm.type,
+                    node_slots.get(vm.node), budget
+                )
+                running[future] = vm_id
+            
+            for vm_id, before in remaining.items():
+                if not before:
+                    launch(vm_id)
+            
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    vm_id = running.pop(future)
+                    result = future.result()
+                    self._record_result(db, schedule, by_id[vm_id], result)
+                    
+                    if result['error'] is not None:
+                        self._skip_dependents(db, schedule, by_id, dependents, vm_id, blocked)
+                        continue
+                    
+                    for dependent in dependents[vm_id]:
+                        remaining[dependent].discard(vm_id)
+                        if not remaining[dependent] and dependent not in blocked:
+                            launch(dependent)
+    
+    def _skip_dependents(self, db: Session, schedule: Schedule, by_id: Dict[int, VM],
+                         dependents: Dict[int, set], failed_id: int, blocked: set):
+        """Mark every transitive dependent of a failed VM as skipped"""
+        reason = f"Dependency failed: {by_id[failed_id].name}"
+        pending = list(dependents[failed_id])
+        
+        while pending:
+            vm_id = pending.pop()
+            if vm_id in blocked:
+                continue
+            
+            blocked.add(vm_id)
+            self._log_execution(db, schedule, by_id[vm_id], 'skipped', skipped_reason=reason[:100])
+            pending.extend(dependents[vm_id])
+    
     def _execute_vm_action(self, db: Session, schedule: Schedule, vm: VM):
         """Execute action on a single VM"""
+        result = self._perform_action(
+            schedule.action, vm.node, vm.vmid, vm.type,
+            wait=bool(schedule.wait_for_completion)
+        )
+        self._record_result(db, schedule, vm, result)
+    
+    def _perform_with_retries(self, action: str, node: str, vmid: int, vm_type: str,
+                              node_slot: threading.Semaphore = None,
+                              budget: RetryBudget = None) -> Dict:
+        """
+        Perform an action and wait for its task, retrying retryable errors in place
+        
+        Returns:
+            Result dictionary as returned by _perform_action, with attempts
+        """
+        attempt = 1
+        while True:
+            result = self._perform_action(action, node, vmid, vm_type, True, node_slot)
+            result['attempts'] = attempt
+            
+            if not self._should_retry(result, budget):
+                return result
+            
+            delay = compute_backoff(attempt)
+            logger.warning(
+                f"{action} on {vmid} failed ({result['error_class']}), "
+                f"retrying in {delay:.1f}s: {result['error']}"
+            )
+            time.sleep(delay)
+            attempt += 1
+    
+    def _should_retry(self, result: Dict, budget: RetryBudget = None) -> bool:
+        """Check whether a failed action may be retried, consuming budget if so"""
+        return (
+            result['error'] is not None
+            and is_retryable(result.get('error_class'))
+            and result.get('attempts', 1) < settings.RETRY_MAX_ATTEMPTS
+            and budget is not None
+            and budget.take()
+        )
+    
+    def _perform_action(self, action: str, node: str, vmid: int, vm_type: str,
+                        wait: bool = False, node_slot: threading.Semaphore = None) -> Dict:
+        """
+        Send an action to Proxmox, optionally waiting for its task to finish
+        
+        Runs without database access so it can be used from worker threads.
+        
+        Args:
+            action: Action to perform
+            node: Node name
+            vmid: VM ID
+            vm_type: 'qemu' or 'lxc'
+            wait: Wait for the Proxmox task to complete
+            node_slot: Semaphore limiting in-flight actions on the node
+            
+        Returns:
+            Dictionary with upid, error, error_class and duration_seconds
+        """
         start_time = datetime.now()
+        result = {'upid': None, 'error': None, 'error_class': None}
+        
+        if node_slot:
+            node_slot.acquire()
         
         try:
-            logger.info(f"Executing {schedule.action} on {vm.type}/{vm.vmid} ({vm.name})")
-            
-            # Execute action via Proxmox API
-            upid = None
-            if schedule.action == 'start':
-                upid = self.proxmox_service.start_vm(vm.node, vm.vmid, vm.type)
-            elif schedule.action == 'stop':
-                upid = self.proxmox_service.stop_vm(vm.node, vm.vmid, vm.type)
-            elif schedule.action == 'restart':
-                upid = self.proxmox_service.reboot_vm(vm.node, vm.vmid, vm.type)
-            elif schedule.action == 'shutdown':
-                upid = self.proxmox_service.shutdown_vm(vm.node, vm.vmid, vm.type)
-            elif schedule.action == 'reset':
-                upid = self.proxmox_service.reset_vm(vm.node, vm.vmid, vm.type)
-            else:
-                raise ValueError(f"Unknown action: {schedule.action}")
+            logger.info(f"Executing {action} on {vm_type}/{vmid}")
+            result['upid'] = self.proxmox_service.execute_action(node, vmid, vm_type, action)
             
-            # Calculate duration
-            duration = int((datetime.now() - start_time).total_seconds())
+            if wait and result['upid']:
+                success, message = self.proxmox_service.wait_for_task(
+                    node, result['upid'], timeout=settings.TASK_TIMEOUT_SECONDS
+                )
+                if not success:
+                    # Only lock conflicts make a failed task worth repeating
+                    result['error'] = message
+                    result['error_class'] = LOCKED if classify_error(message) == LOCKED else UNKNOWN
+        
+        except Exception as e:
+            result['error'] = str(e)
+            result['error_class'] = classify_error(e)
+        
+        finally:
+            if node_slot:
+                node_slot.release()
+        
+        elapsed = (datetime.now() - start_time).total_seconds()
+        metrics.ACTION_DURATION_SECONDS.labels(
+            action, 'success' if result['error'] is None else 'failed'
+        ).observe(elapsed)
+        
+        result['duration_seconds'] = int(elapsed)
+        return result
+    
+    def _perform_bulk_action(self, action: str, node: str, vmids: List[int]) -> Dict:
+        """
+        Send a bulk action for guests of one node
+        
+        Runs without database access so it can be used from worker threads.
+        
+        Args:
+            action: 'start' or 'shutdown'
+            node: Node name
+            vmids: IDs of guests on this node
             
-            # Log success
+        Returns:
+            Result dictionary as returned by _perform_action; upid is None
+            if the bulk call itself failed
+        """
+        start_time = datetime.now()
+        result = {'upid': None, 'error': None, 'error_class': None}
+        
+        try:
+            logger.info(f"Executing bulk {action} of {len(vmids)} guests on {node}")
+            result['upid'] = self.proxmox_service.bulk_action(node, vmids, action)
+        
+        except Exception as e:
+            result['upid'] = None
+            result['error'] = str(e)
+            result['error_class'] = classify_error(e)
+        
+        elapsed = (datetime.now() - start_time).total_seconds()
+        metrics.ACTION_DURATION_SECONDS.labels(
+            BULK_ACTIONS[action], 'success' if result['error'] is None else 'failed'
+        ).observe(elapsed)
+        
+        result['duration_seconds'] = int(elapsed)
+        return result
+    
+    def _record_result(self, db: Session, schedule: Schedule, vm: VM, result: Dict,
+                       run_id: Optional[int] = None, budget: Optional[RetryBudget] = None):
+        """
+        Log the outcome of an action on a VM, or queue a retry
+        
+        Retries pass the run ID and retry budget of the run they belong to;
+        otherwise those of the schedule's run in progress are used.
+        """
+        if run_id is None:
+            run_id = self._run_ids.get(schedule.id)
+            budget = self._retry_budgets.get(schedule.id)
+        
+        attempts = result.setdefault('attempts', 1)
+        
+        if result['error'] is None:
             self._log_execution(
                 db, schedule, vm, 'success',
-                duration_seconds=duration,
-                upid=upid
+                duration_seconds=result['duration_seconds'],
+                upid=result['upid'],
+                attempts=attempts,
+                run_id=run_id
             )
-            
             logger.info(f"Successfully executed {schedule.action} on {vm.vmid}")
         
-        except Exception as e:
-            # Calculate duration
-            duration = int((datetime.now() - start_time).total_seconds())
-            
-            # Log failure
-            error_message = str(e)
+        elif self._should_retry(result, budget):
+            self._enqueue_retry(schedule, vm, result, run_id, budget)
+        
+        else:
             self._log_execution(
                 db, schedule, vm, 'failed',
-                duration_seconds=duration,
-                error_message=error_message
+                duration_seconds=result['duration_seconds'],
+                error_message=result['error'],
+                upid=result['upid'],
+                attempts=attempts,
+                run_id=run_id
             )
+            logger.error(f"Failed to execute {schedule.action} on {vm.vmid}: {result['error']}")
+    
+    def _enqueue_retry(self, schedule: Schedule, vm: VM, result: Dict,
+                       run_id: Optional[int], budget: Optional[RetryBudget]):
+        """
+        Queue a retry of a failed action without blocking the current run
+        
+        Retries are one-off scheduler jobs, so they run on the scheduler's
+        executor after the backoff delay. The job keeps the run ID and retry
+        budget, so a retry still pending when the next run starts is neither
+        charged to nor logged under that run.
+        """
+        attempt = result['attempts']
+        delay = compute_backoff(attempt)
+        
+        self.scheduler.add_job(
+            func=self._retry_vm_action,
+            trigger='date',
+            run_date=datetime.now() + timedelta(seconds=delay),
+            args=[schedule.id, vm.id, attempt + 1, run_id, budget],
+            id=f"retry_{schedule.id}_{run_id}_{vm.id}_{attempt + 1}",
+            replace_existing=True
+        )
+        
+        logger.warning(
+            f"{schedule.action} on {vm.vmid} failed ({result['error_class']}), "
+            f"retry {attempt + 1} in {delay:.1f}s: {result['error']}"
+        )
+    
+    def _retry_vm_action(self, schedule_id: int, vm_id: int, attempt: int,
+                         run_id: Optional[int] = None, budget: Optional[RetryBudget] = None):
+        """
+        Retry a scheduled action on a single VM
+        
+        Args:
+            schedule_id: Schedule ID
+            vm_id: VM database ID
+            attempt: Number of this attempt
+            run_id: Schedule run the action belongs to
+            budget: Retry budget of that run
+        """
+        db = SessionLocal()
+        try:
+            schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+            vm = db.query(VM).filter(VM.id == vm_id).first()
+            if not schedule or not vm:
+                logger.warning(f"Dropping retry of schedule {schedule_id} on VM {vm_id}: not found")
+                return
             
-            logger.error(f"Failed to execute {schedule.action} on {vm.vmid}: {error_message}")
+            in_blackout, reason = is_in_blackout(db)
+            if in_blackout:
+                self._log_execution(
+                    db, schedule, vm, 'skipped', skipped_reason=reason, attempts=attempt, run_id=run_id
+                )
+                return
+            
+            result = self._perform_action(
+                schedule.action, vm.node, vm.vmid, vm.type,
+                wait=bool(schedule.wait_for_completion)
+            )
+            result['attempts'] = attempt
+            self._record_result(db, schedule, vm, result, run_id=run_id, budget=budget)
+        
+        except Exception as e:
+            logger.error(f"Error retrying schedule {schedule_id} on VM {vm_id}: {str(e)}")
+            db.rollback()
+        
+        finally:
+            db.close()
     
     def _log_execution(self, db: Session, schedule: Schedule, vm: VM, status: str,
                        duration_seconds: int = None, error_message: str = None,
-                       upid: str = None, skipped_reason: str = None):
-        """Log execution to database"""
+                       upid: str = None, skipped_reason: str = None, attempts: int = 1,
+                       run_id: int = None):
+        """Log execution to database, under the schedule's run in progress unless run_id is given"""
         log = ExecutionLog(
             schedule_id=schedule.id,
+            run_id=run_id if run_id is not None else self._run_ids.get(schedule.id),
             vm_id=vm.id if vm else None,
             vmid=vm.vmid if vm else None,
             vm_name=vm.name if vm else None,
@@ -269,12 +1031,38 @@ class SchedulerService:
             duration_seconds=duration_seconds,
             error_message=error_message,
             upid=upid,
-            skipped_reason=skipped_reason
+            skipped_reason=skipped_reason,
+            attempts=attempts
         )
         db.add(log)
         db.commit()
 
 
+def _fire_schedule_job(service: SchedulerService, schedule_id: int, planned_at: Optional[datetime] = None):
+    """Job function of schedules, calls SchedulerService.fire_schedule()"""
+    service.fire_schedule(schedule_id, planned_at)
+
+
+def get_noop_reason(action: str, status: str):
+    """
+    Check whether an action would leave a VM unchanged
+    
+    Args:
+        action: Scheduled action
+        status: Current VM status from Proxmox
+        
+    Returns:
+        Skip reason, or None if the action has to be executed
+    """
+    if action == 'start' and status == 'running':
+        return "Already running"
+    if action in ('stop', 'shutdown') and status == 'stopped':
+        return "Already stopped"
+    if action in ('restart', 'reset') and status == 'stopped':
+        return "Not running"
+    return None
+
+
 # Singleton instance
 _scheduler_service = None
 
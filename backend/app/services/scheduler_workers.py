@@ -0,0 +1,277 @@
+"""
+Scheduler Worker Processes
+Executes scheduled runs in separate processes fed by local queues
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import multiprocessing
+import queue as queue_module
+import threading
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# How often the pool looks for worker processes that died
+WORKER_CHECK_SECONDS = 5
+
+
+def _worker_main(queue, events, threads: int):
+    """
+    Entry point of a worker process
+
+    Runs `threads` consumer threads, each taking (schedule ID, planned
+    time) items from the queue and executing them, until a None sentinel
+    per thread arrives.
+    The start and end of every run are reported on the events queue.
+
+    Args:
+        queue: Multiprocessing queue of (schedule ID, planned time) for this worker
+        events: Shared multiprocessing queue of ('started'/'finished', schedule ID, pid)
+        threads: Number of concurrent runs in this process
+    """
+    from app.services.scheduler import SchedulerService
+
+    service = SchedulerService()
+
+    # Only used for retry jobs of runs executed in this process
+    service.scheduler.start()
+
+    def consume():
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            schedule_id, planned_at = item
+            events.put(('started', schedule_id, os.getpid()))
+            try:
+                service.execute_schedule(schedule_id, planned_at)
+            finally:
+                events.put(('finished', schedule_id, os.getpid()))
+
+    consumers = [
+        threading.Thread(target=consume, name=f"schedule-worker-{index}")
+        for index in range(threads)
+    ]
+    for consumer in consumers:
+        consumer.start()
+    for consumer in consumers:
+        consumer.join()
+
+    service.scheduler.shutdown(wait=False)
+
+
+class WorkerPool:
+    """
+    Pool of worker processes executing scheduled runs
+
+    A schedule is in flight from submit() until a worker reports its run
+    as finished. Fires of a schedule that is still in flight are dropped,
+    like APScheduler's max_instances=1 does for the thread executor.
+
+    Every worker has its own queue: a process killed while waiting in
+    queue.get() keeps the queue's reader lock, so a shared queue would stop
+    feeding all workers. Dead workers are respawned with a fresh queue and
+    the runs still queued for them.
+    """
+
+    def __init__(self, processes: int = 0, threads: int = 1):
+        """
+        Initialize the pool
+
+        Args:
+            processes: Number of worker processes (0 = number of CPUs)
+            threads: Concurrent runs per worker process
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.threads = max(threads, 1)
+
+        # Spawn instead of fork: the parent already runs scheduler threads
+        # and holds pooled database connections
+        self._context = multiprocessing.get_context('spawn')
+        self.events = self._context.Queue()
+        self._queues = []
+        self._workers = []
+
+        # Schedule ID -> (index of the worker it was queued for, run started, planned time)
+        self._in_flight: Dict[int, Tuple[int, bool, Optional[datetime]]] = {}
+        self._lock = threading.Lock()
+        self._tracker = None
+        self._stopping = False
+
+    def start(self):
+        """Start the worker processes"""
+        for index in range(self.processes):
+            self._queues.append(self._context.Queue())
+            self._workers.append(self._spawn_worker(index))
+
+        self._tracker = threading.Thread(target=self._track_runs, name="scheduler-worker-tracker", daemon=True)
+        self._tracker.start()
+
+        logger.info(f"Started {self.processes} scheduler worker processes with {self.threads} threads each")
+
+    def _spawn_worker(self, index: int):
+        """Start worker process number `index` on its queue"""
+        worker = self._context.Process(
+            target=_worker_main,
+            args=(self._queues[index], self.events, self.threads),
+            name=f"scheduler-worker-{index}",
+            daemon=True
+        )
+        worker.start()
+        return worker
+
+    def submit(self, schedule_id: int, planned_at: Optional[datetime] = None) -> bool:
+        """
+        Queue a scheduled run for the worker with the fewest runs in flight
+
+        Args:
+            schedule_id: Schedule ID
+            planned_at: Fire time the run was scheduled for
+
+        Returns:
+            False if a run of the schedule is still queued or running
+        """
+        with self._lock:
+            if schedule_id in self._in_flight:
+                return False
+
+            load = [0] * len(self._workers)
+            for index, _, _ in self._in_flight.values():
+                load[index] += 1
+            index = load.index(min(load))
+
+            self._in_flight[schedule_id] = (index, False, planned_at)
+            worker_queue = self._queues[index]
+
+        worker_queue.put((schedule_id, planned_at))
+        return True
+
+    def in_flight(self) -> int:
+        """Number of schedules queued or running in a worker"""
+        with self._lock:
+            return len(self._in_flight)
+
+    def _track_runs(self):
+        """Follow run events of the workers until a None sentinel arrives"""
+        last_check = time.monotonic()
+        while True:
+            try:
+                event = self.events.get(timeout=WORKER_CHECK_SECONDS)
+            except queue_module.Empty:
+                event = ()
+            if event is None:
+                break
+
+            if event:
+                self._apply_event(event)
+
+            if time.monotonic() - last_check >= WORKER_CHECK_SECONDS:
+                self._replace_dead_workers()
+                last_check = time.monotonic()
+
+    def _apply_event(self, event):
+        """Update the in-flight schedules from a ('started'/'finished', schedule ID, pid) event"""
+        kind, schedule_id, _ = event
+        with self._lock:
+            if kind == 'finished':
+                self._in_flight.pop(schedule_id, None)
+            elif schedule_id in self._in_flight:
+                index, _, planned_at = self._in_flight[schedule_id]
+                self._in_flight[schedule_id] = (index, True, planned_at)
+
+    def _replace_dead_workers(self):
+        """
+        Respawn worker processes that died
+
+        Runs a dead worker had started are released. Runs still queued for
+        it go to the respawned worker, or are released if it cannot be
+        started.
+        """
+        if self._stopping:
+            return
+
+        dead = [index for index, worker in enumerate(self._workers) if not worker.is_alive()]
+        if not dead:
+            return
+
+        # Start events sent before a worker died must not look queued
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue_module.Empty:
+                break
+            if event is None:
+                # Keep the stop sentinel for _track_runs
+                self.events.put(None)
+                break
+            self._apply_event(event)
+
+        for index in dead:
+            logger.error(f"{self._workers[index].name} died (exit code {self._workers[index].exitcode}), respawning")
+
+            with self._lock:
+                lost = [
+                    schedule_id for schedule_id, (worker, started, _) in self._in_flight.items()
+                    if worker == index and started
+                ]
+                for schedule_id in lost:
+                    del self._in_flight[schedule_id]
+                queued = [
+                    (schedule_id, planned_at) for schedule_id, (worker, _, planned_at) in self._in_flight.items()
+                    if worker == index
+                ]
+
+            if lost:
+                logger.error(f"Runs of schedules {lost} were lost with {self._workers[index].name}")
+
+            self._queues[index] = self._context.Queue()
+            try:
+                self._workers[index] = self._spawn_worker(index)
+            except Exception as e:
+                logger.error(f"Could not respawn scheduler worker {index}, releasing its queued schedules: {e}")
+                with self._lock:
+                    for schedule_id, _ in queued:
+                        self._in_flight.pop(schedule_id, None)
+                continue
+
+            for item in queued:
+                self._queues[index].put(item)
+
+    def depth(self) -> int:
+        """Number of queued runs not yet picked up by a worker"""
+        try:
+            return sum(worker_queue.qsize() for worker_queue in self._queues)
+        except NotImplementedError:
+            return 0
+
+    def stop(self, timeout: float = 30):
+        """
+        Stop the workers after the queued runs are finished
+
+        Args:
+            timeout: Seconds to wait per worker before terminating it
+        """
+        self._stopping = True
+        for worker_queue in self._queues:
+            for _ in range(self.threads):
+                worker_queue.put(None)
+
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                logger.warning(f"Terminating unresponsive {worker.name}")
+                worker.terminate()
+
+        self.events.put(None)
+        if self._tracker:
+            self._tracker.join(timeout)
+            self._tracker = None
+
+        self._workers = []
+        self._queues = []
+        with self._lock:
+            self._in_flight.clear()
+        self._stopping = False
+        logger.info("Scheduler worker processes stopped")
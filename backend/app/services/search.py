@@ -0,0 +1,118 @@
+"""
+Search Service
+Ranked substring and fuzzy search over VMs, schedules, groups and execution logs
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import func, literal, or_, text
+from sqlalchemy.orm import Session
+
+from app.models import VM, Schedule, Group, ExecutionLog
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TYPES = ('vms', 'schedules', 'groups', 'logs')
+
+
+def _describe_log(log: ExecutionLog) -> Tuple[int, str, str]:
+    """Get id, title and detail of a log hit"""
+    detail = f"{log.action} {log.vm_name or log.vmid}"
+    if log.executed_at:
+        detail += f" at {log.executed_at:%Y-%m-%d %H:%M:%S}"
+    return log.id, log.error_message, detail
+
+
+# Searched column and the hit fields (id, title, detail) of each type;
+# on PostgreSQL every searched column has a pg_trgm GIN index
+SEARCH_TARGETS: Dict[str, Tuple[object, Callable]] = {
+    'vms': (VM.name, lambda vm: (vm.id, vm.name, f"{vm.type} {vm.vmid} on {vm.node}")),
+    'schedules': (Schedule.name, lambda schedule: (
+        schedule.id, schedule.name, f"{schedule.action} {schedule.cron_expression}"
+    )),
+    'groups': (Group.name, lambda group: (group.id, group.name, group.description)),
+    'logs': (ExecutionLog.error_message, _describe_log),
+}
+
+# Whether pg_trgm is installed, checked once per process
+_trigram_available: Optional[bool] = None
+
+
+def like_pattern(value: str) -> str:
+    """Build a substring LIKE pattern matching a value literally (escape character: backslash)"""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _has_trigram(db: Session) -> bool:
+    """Check whether trigram functions can be used on this database"""
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = False
+        if db.get_bind().dialect.name == 'postgresql':
+            _trigram_available = db.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).first() is not None
+            if not _trigram_available:
+                logger.warning("pg_trgm is not installed, search falls back to unindexed ILIKE")
+    return _trigram_available
+
+
+def _search_type(db: Session, search_type: str, query: str, limit: int, trigram: bool) -> List[Dict]:
+    """Get the best hits of one type, each with a score between 0 and 1"""
+    column, describe = SEARCH_TARGETS[search_type]
+    model = column.class_
+    pattern = like_pattern(query)
+
+    if trigram:
+        # Substring matches plus fuzzy word matches (q <% column), ranked by
+        # how well the query matches the closest word sequence in the column
+        score = func.word_similarity(query, column)
+        rows = db.query(model, score).filter(
+            or_(column.ilike(pattern, escape='\\'), literal(query).op('<%')(column))
+        ).order_by(score.desc(), func.length(column), model.id.desc()).limit(limit).all()
+    else:
+        # Substring matches only, scored by the share of the text they cover
+        rows = [
+            (row, len(query) / max(len(getattr(row, column.key)), 1))
+            for row in db.query(model).filter(column.ilike(pattern, escape='\\'))
+            .order_by(func.length(column), model.id.desc()).limit(limit).all()
+        ]
+
+    hits = []
+    for row, row_score in rows:
+        hit_id, title, detail = describe(row)
+        hits.append({
+            'type': search_type,
+            'id': hit_id,
+            'title': title,
+            'detail': detail,
+            'score': round(float(row_score), 4),
+        })
+    return hits
+
+
+def search(db: Session, query: str, types: List[str] = None, limit: int = 20) -> List[Dict]:
+    """
+    Search names of VMs, schedules and groups and error messages of logs
+
+    Uses pg_trgm on PostgreSQL (index-backed ILIKE and fuzzy matching,
+    ranked by word similarity); other databases get a plain ILIKE
+    substring search ranked by match coverage.
+
+    Args:
+        db: Database session
+        query: Search text
+        types: Types to search (default: all of SEARCH_TYPES)
+        limit: Maximum number of hits
+
+    Returns:
+        Hits (type, id, title, detail, score), best first
+    """
+    trigram = _has_trigram(db)
+    hits = []
+    for search_type in types or SEARCH_TYPES:
+        hits.extend(_search_type(db, search_type, query, limit, trigram))
+
+    hits.sort(key=lambda hit: hit['score'], reverse=True)
+    return hits[:limit]
@@ -0,0 +1,122 @@
+"""
+Table Versions Service
+Per-table change counters for cheap ETags and conditional GET requests
+
+Free of web framework imports, since the scheduler daemon loads it to
+count its writes; the HTTP side lives in app.api.etag
+"""
+from datetime import datetime
+from typing import Dict, Iterable
+import hashlib
+import logging
+
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import TableVersion
+
+logger = logging.getLogger(__name__)
+
+# Tables whose writes are counted; every other table is written without overhead
+TRACKED_TABLES = frozenset({
+    'vms', 'groups', 'group_members', 'group_dependencies',
+    'schedules', 'blackout_windows', 'schedule_runs', 'execution_logs',
+})
+
+_versions_table = TableVersion.__table__
+
+
+def _bump(session: Session, tables: Iterable[str]):
+    """Increment the counters of tables inside the session's transaction"""
+    tables = sorted(set(tables) & TRACKED_TABLES)
+    if not tables:
+        return
+
+    connection = session.connection()
+    now = datetime.now()
+    result = connection.execute(
+        update(_versions_table)
+        .where(_versions_table.c.table_name.in_(tables))
+        .values(version=_versions_table.c.version + 1, updated_at=now)
+    )
+    if result.rowcount == len(tables):
+        return
+
+    # Counter rows missing (database not created from schema.sql)
+    existing = set(connection.execute(
+        select(_versions_table.c.table_name).where(_versions_table.c.table_name.in_(tables))
+    ).scalars())
+    for table_name in tables:
+        if table_name in existing:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(
+                    _versions_table.insert().values(table_name=table_name, version=1, updated_at=now)
+                )
+        except IntegrityError:
+            # Created concurrently by another writer, whose bump marks the change as well
+            pass
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flush(session: Session, flush_context):
+    """Bump the counters of all tables with rows inserted, changed or deleted by a flush"""
+    tables = set()
+    for obj in session.new:
+        tables.add(obj.__table__.name)
+    for obj in session.deleted:
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tables.add(obj.__table__.name)
+    _bump(session, tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_statement(orm_execute_state):
+    """Bump the counter of a table written by an UPDATE or DELETE statement"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _bump(orm_execute_state.session, [table.name])
+
+
+def get_versions(db: Session, tables: Iterable[str]) -> Dict[str, tuple]:
+    """
+    Get the current counters of tables
+
+    Args:
+        db: Database session
+        tables: Table names
+
+    Returns:
+        Mapping of table name to (version, updated_at), (0, None) for unwritten tables
+    """
+    tables = sorted(set(tables))
+    rows = db.execute(
+        select(_versions_table.c.table_name, _versions_table.c.version, _versions_table.c.updated_at)
+        .where(_versions_table.c.table_name.in_(tables))
+    ).all()
+    versions = {table_name: (0, None) for table_name in tables}
+    versions.update({table_name: (version, updated_at) for table_name, version, updated_at in rows})
+    return versions
+
+
+def compute_etag(db: Session, tables: Iterable[str], *extra) -> str:
+    """
+    Build a weak ETag that changes whenever one of the tables is written
+
+    Args:
+        db: Database session
+        tables: Tables the representation is built from
+        extra: Further values the representation depends on
+
+    Returns:
+        ETag header value
+    """
+    versions = get_versions(db, tables)
+    # updated_at guards against counters restarting after a database restore
+    key = repr((sorted(versions.items()), extra)).encode()
+    return f'W/"{hashlib.sha1(key).hexdigest()[:20]}"'
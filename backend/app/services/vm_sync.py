@@ -3,21 +3,140 @@ VM Synchronization Service
 Periodically syncs VM/Container list from Proxmox cluster to database
 """
 from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
 import logging
+import threading
+import time
 
+from app.config import settings
 from app.services.proxmox import get_proxmox_service
-from app.models import VM
+from app.services import metrics
+from app.services import table_versions  # noqa: F401 - counts the writes of the sync
+from app.models import VM, VMStateEvent
 from app.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
+# Task types changing the state of the guest in their id
+GUEST_TASK_TYPES = frozenset({
+    'qmstart', 'qmstop', 'qmshutdown', 'qmreboot', 'qmreset', 'qmsuspend', 'qmresume', 'qmpause',
+    'vzstart', 'vzstop', 'vzshutdown', 'vzreboot', 'vzsuspend', 'vzresume',
+})
+
+# Task types adding, removing or moving guests, or acting on many guests at once
+FULL_SYNC_TASK_TYPES = frozenset({
+    'qmcreate', 'qmclone', 'qmrestore', 'qmdestroy', 'qmigrate', 'qmtemplate',
+    'vzcreate', 'vzrestore', 'vzdestroy', 'vzmigrate', 'vztemplate',
+    'startall', 'stopall', 'migrateall',
+})
+
+# Tolerance for task end times of nodes with skewed clocks
+TASK_CLOCK_SKEW_SECONDS = 60
+
+# Share of changed VMs that counts as a large diff
+LARGE_CHURN_RATIO = 0.05
+
+# Growth of the sync interval after a sync without changes
+IDLE_BACKOFF_FACTOR = 1.5
+
+
+def detect_changes(vm: Optional[VM], vm_data: dict) -> List[str]:
+    """
+    Compare the cached state of a VM with fresh data from Proxmox
+    
+    Args:
+        vm: Cached VM (None if not seen before)
+        vm_data: VM data from the cluster resources
+        
+    Returns:
+        Kinds of change ('added', 'status', 'node', 'resources', 'restart'), empty if none
+    """
+    if vm is None:
+        return ['added']
+    
+    changes = []
+    if vm.status != vm_data['status']:
+        changes.append('status')
+    if vm.node != vm_data['node']:
+        changes.append('node')
+    if vm.maxmem != vm_data.get('maxmem') or vm.maxdisk != vm_data.get('maxdisk'):
+        changes.append('resources')
+    
+    # Still running but uptime went back: restarted between two syncs
+    uptime = vm_data.get('uptime')
+    if ('status' not in changes and vm_data['status'] == 'running'
+            and vm.uptime is not None and uptime is not None and uptime < vm.uptime):
+        changes.append('restart')
+    return changes
+
+
+class AdaptiveInterval:
+    """
+    Full sync interval following the observed churn
+    
+    A large diff or cluster activity drops the interval to the minimum,
+    a small diff halves it and a sync without changes lengthens it by
+    IDLE_BACKOFF_FACTOR, always within [minimum, maximum].
+    """
+    
+    def __init__(self, minimum: float, maximum: float, initial: float):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.current = self._clamp(initial)
+        metrics.VM_SYNC_INTERVAL_SECONDS.set(self.current)
+    
+    def _clamp(self, interval: float) -> float:
+        """Keep an interval within the bounds"""
+        return min(max(interval, self.minimum), self.maximum)
+    
+    def observe_sync(self, churn: int, total: int) -> float:
+        """
+        Adjust the interval to the result of a full sync
+        
+        Args:
+            churn: Added plus changed VMs
+            total: VMs seen by the sync
+            
+        Returns:
+            New interval in seconds
+        """
+        if churn == 0:
+            self.current = self._clamp(self.current * IDLE_BACKOFF_FACTOR)
+        elif churn >= max(total, 1) * LARGE_CHURN_RATIO:
+            self.current = self.minimum
+        else:
+            self.current = self._clamp(self.current / 2)
+        metrics.VM_SYNC_INTERVAL_SECONDS.set(self.current)
+        return self.current
+    
+    def observe_activity(self) -> float:
+        """Drop the interval to the minimum after guest actions in the cluster"""
+        self.current = self.minimum
+        metrics.VM_SYNC_INTERVAL_SECONDS.set(self.current)
+        return self.current
+
 
 class VMSyncService:
     """Service for synchronizing VM data from Proxmox to database"""
     
     def __init__(self):
         self.proxmox_service = get_proxmox_service()
+        # Full and incremental syncs never run at the same time
+        self._lock = threading.Lock()
+        # Finished tasks already handled: newest end time and the UPIDs near it
+        self._task_cursor: Optional[int] = None
+        self._seen_upids: Dict[str, int] = {}
+        # Newest start time in the previous read of the task log
+        self._log_newest_start: Optional[int] = None
+        # Interval of scheduled full syncs and the time of the last one
+        self.interval = AdaptiveInterval(
+            settings.VM_SYNC_MIN_INTERVAL_SECONDS,
+            settings.VM_SYNC_MAX_INTERVAL_SECONDS,
+            settings.VM_SYNC_INTERVAL_MINUTES * 60
+        )
+        self._last_full_sync: Optional[float] = None
     
     def sync_vms(self, db: Session = None) -> dict:
         """
@@ -29,66 +148,62 @@ class VMSyncService:
         Returns:
             Dictionary with sync statistics
         """
+        with self._lock:
+            return self._sync_full(db)
+    
+    def sync_if_due(self, db: Session = None) -> Optional[dict]:
+        """
+        Run a full sync if the adaptive interval has passed since the last one
+        
+        Meant to be called every VM_SYNC_MIN_INTERVAL_SECONDS; skipped calls cost nothing.
+        
+        Args:
+            db: Database session (optional, will create if not provided)
+            
+        Returns:
+            Sync statistics, or None if no sync was due
+        """
+        with self._lock:
+            if (self._last_full_sync is not None
+                    and time.monotonic() - self._last_full_sync < self.interval.current):
+                return None
+            return self._sync_full(db)
+    
+    def _sync_full(self, db: Session = None, tasks: Optional[List[Dict]] = None) -> dict:
+        """Sync all VMs/containers (caller holds the lock), tasks: task log read just before"""
         should_close_db = False
         if db is None:
             db = SessionLocal()
             should_close_db = True
         
+        start = time.perf_counter()
         try:
             logger.info("Starting VM synchronization from Proxmox cluster")
             
+            # Tasks finished before this point are covered by the full sync
+            if tasks is None:
+                tasks = self._fetch_tasks()
+            
             # Get all VMs from Proxmox
             proxmox_vms = self.proxmox_service.get_all_vms()
             
-            stats = {
-                'total': len(proxmox_vms),
-                'added': 0,
-                'updated': 0,
-                'errors': 0
-            }
-            
             # Get existing VMs from database
             existing_vms = {vm.vmid: vm for vm in db.query(VM).all()}
             
-            for vm_data in proxmox_vms:
-                try:
-                    vmid = vm_data['vmid']
-                    
-                    if vmid in existing_vms:
-                        # Update existing VM
-                        vm = existing_vms[vmid]
-                        vm.name = vm_data['name']
-                        vm.type = vm_data['type']
-                        vm.node = vm_data['node']
-                        vm.status = vm_data['status']
-                        vm.maxmem = vm_data.get('maxmem')
-                        vm.maxdisk = vm_data.get('maxdisk')
-                        vm.uptime = vm_data.get('uptime')
-                        vm.last_synced = datetime.now()
-                        stats['updated'] += 1
-                    else:
-                        # Add new VM
-                        vm = VM(
-                            vmid=vmid,
-                            name=vm_data['name'],
-                            type=vm_data['type'],
-                            node=vm_data['node'],
-                            status=vm_data['status'],
-                            maxmem=vm_data.get('maxmem'),
-                            maxdisk=vm_data.get('maxdisk'),
-                            uptime=vm_data.get('uptime'),
-                            last_synced=datetime.now()
-                        )
-                        db.add(vm)
-                        stats['added'] += 1
-                
-                except Exception as e:
-                    logger.error(f"Error syncing VM {vm_data.get('vmid')}: {str(e)}")
-                    stats['errors'] += 1
+            stats = self._apply(db, proxmox_vms, existing_vms)
+            stats['total'] = len(proxmox_vms)
             
             # Commit all changes
             db.commit()
             
+            if tasks is not None:
+                self._mark_seen(tasks)
+            
+            metrics.VM_SYNC_SECONDS.observe(time.perf_counter() - start)
+            metrics.VM_SYNC_RUNS.labels('full').inc()
+            self._last_full_sync = time.monotonic()
+            self.interval.observe_sync(stats['added'] + stats['changed'], stats['total'])
+            
             logger.info(f"VM sync completed: {stats}")
             return stats
         
@@ -102,6 +217,239 @@ class VMSyncService:
             if should_close_db and db:
                 db.close()
     
+    def sync_incremental(self, db: Session = None) -> dict:
+        """
+        Refresh only the VMs/containers touched by tasks finished since the last sync
+        
+        Polls the cluster task log. Start/stop style tasks refresh their guest
+        with one status call each; tasks that add, remove or move guests, or
+        more touched guests than SYNC_INCREMENTAL_MAX_GUESTS, lead to a full
+        sync, as do the first run and gaps in the task log.
+        
+        Args:
+            db: Database session (optional, will create if not provided)
+            
+        Returns:
+            Dictionary with sync statistics and the mode used ('idle', 'incremental' or 'full')
+        """
+        with self._lock:
+            tasks = self._fetch_tasks()
+            if tasks is None or self._task_cursor is None or self._has_gap(tasks):
+                return {'mode': 'full', **self._sync_full(db, tasks)}
+            
+            new_tasks = self._new_tasks(tasks)
+            if not new_tasks:
+                metrics.VM_SYNC_RUNS.labels('idle').inc()
+                return {'mode': 'idle', 'tasks': 0}
+            
+            touched = set()
+            for task in new_tasks:
+                task_type = task.get('type', '')
+                if task_type in FULL_SYNC_TASK_TYPES:
+                    return {'mode': 'full', **self._sync_full(db, tasks)}
+                if task_type in GUEST_TASK_TYPES and str(task.get('id', '')).isdigit():
+                    touched.add(int(task['id']))
+            
+            # Guest actions were just issued: reconcile everything sooner
+            if touched:
+                self.interval.observe_activity()
+            
+            if not touched:
+                # Only tasks without effect on guest state (backups, updates, ...)
+                self._mark_seen(tasks)
+                metrics.VM_SYNC_RUNS.labels('idle').inc()
+                return {'mode': 'idle', 'tasks': len(new_tasks)}
+            
+            if len(touched) > settings.SYNC_INCREMENTAL_MAX_GUESTS:
+                return {'mode': 'full', **self._sync_full(db, tasks)}
+            
+            stats = self._sync_guests(db, touched)
+            if stats is None:
+                return {'mode': 'full', **self._sync_full(db, tasks)}
+            
+            self._mark_seen(tasks)
+            return {'mode': 'incremental', 'tasks': len(new_tasks), **stats}
+    
+    def _sync_guests(self, db: Session, vmids: set) -> Optional[dict]:
+        """
+        Refresh some VMs/containers from their status (caller holds the lock)
+        
+        Returns:
+            Sync statistics, or None if a guest is unknown or was not found on its node
+        """
+        should_close_db = False
+        if db is None:
+            db = SessionLocal()
+            should_close_db = True
+        
+        start = time.perf_counter()
+        try:
+            existing_vms = {vm.vmid: vm for vm in db.query(VM).filter(VM.vmid.in_(vmids)).all()}
+            if len(existing_vms) < len(vmids):
+                return None
+            
+            vm_datas = []
+            for vm in existing_vms.values():
+                try:
+                    status = self.proxmox_service.get_vm_status(vm.node, vm.vmid, vm.type)
+                except Exception:
+                    # Moved or removed in the meantime
+                    return None
+                vm_datas.append({
+                    'vmid': vm.vmid,
+                    'name': status.get('name', vm.name),
+                    'type': vm.type,
+                    'node': vm.node,
+                    'status': status.get('status'),
+                    'maxmem': status.get('maxmem', vm.maxmem),
+                    'maxdisk': status.get('maxdisk', vm.maxdisk),
+                    'uptime': status.get('uptime'),
+                    'tags': status.get('tags', vm.tags),
+                })
+            
+            stats = self._apply(db, vm_datas, existing_vms)
+            db.commit()
+            
+            metrics.VM_SYNC_SECONDS.observe(time.perf_counter() - start)
+            metrics.VM_SYNC_RUNS.labels('incremental').inc()
+            logger.info(f"Incremental VM sync completed: {stats}")
+            return stats
+        
+        except Exception as e:
+            logger.error(f"Incremental VM synchronization failed: {str(e)}")
+            db.rollback()
+            raise
+        
+        finally:
+            if should_close_db:
+                db.close()
+    
+    def _apply(self, db: Session, vm_datas: List[dict], existing_vms: Dict[int, VM]) -> dict:
+        """
+        Write fresh VM data to the cache and record state transitions
+        
+        Args:
+            db: Database session
+            vm_datas: VM data in the format of get_all_vms()
+            existing_vms: Cached VMs by VMID
+            
+        Returns:
+            Dictionary with sync statistics
+        """
+        stats = {
+            'total': len(vm_datas),
+            'added': 0,
+            'updated': 0,
+            'changed': 0,
+            'errors': 0,
+            'events': 0
+        }
+        
+        # State transitions, written in one statement with the sync
+        now = datetime.now()
+        events = []
+        
+        for vm_data in vm_datas:
+            try:
+                vmid = vm_data['vmid']
+                
+                changes = detect_changes(existing_vms.get(vmid), vm_data)
+                if changes:
+                    events.append({
+                        'vmid': vmid,
+                        'observed_at': now,
+                        'changes': ','.join(changes),
+                        'status': vm_data['status'],
+                        'node': vm_data['node'],
+                        'maxmem': vm_data.get('maxmem'),
+                        'maxdisk': vm_data.get('maxdisk'),
+                        'uptime': vm_data.get('uptime')
+                    })
+                
+                if vmid in existing_vms:
+                    # Update existing VM
+                    vm = existing_vms[vmid]
+                    if vm.status != vm_data['status'] or vm.node != vm_data['node']:
+                        stats['changed'] += 1
+                    vm.name = vm_data['name']
+                    vm.type = vm_data['type']
+                    vm.node = vm_data['node']
+                    vm.status = vm_data['status']
+                    vm.maxmem = vm_data.get('maxmem')
+                    vm.maxdisk = vm_data.get('maxdisk')
+                    vm.uptime = vm_data.get('uptime')
+                    vm.tags = vm_data.get('tags')
+                    vm.last_synced = now
+                    stats['updated'] += 1
+                else:
+                    # Add new VM
+                    vm = VM(
+                        vmid=vmid,
+                        name=vm_data['name'],
+                        type=vm_data['type'],
+                        node=vm_data['node'],
+                        status=vm_data['status'],
+                        maxmem=vm_data.get('maxmem'),
+                        maxdisk=vm_data.get('maxdisk'),
+                        uptime=vm_data.get('uptime'),
+                        tags=vm_data.get('tags'),
+                        last_synced=now
+                    )
+                    db.add(vm)
+                    stats['added'] += 1
+            
+            except Exception as e:
+                logger.error(f"Error syncing VM {vm_data.get('vmid')}: {str(e)}")
+                stats['errors'] += 1
+        
+        if events:
+            db.execute(insert(VMStateEvent.__table__), events)
+            stats['events'] = len(events)
+        
+        metrics.VM_CHURN.labels('added').inc(stats['added'])
+        metrics.VM_CHURN.labels('changed').inc(stats['changed'])
+        return stats
+    
+    def _fetch_tasks(self) -> Optional[List[Dict]]:
+        """Get the cluster task log, or None if it cannot be read"""
+        try:
+            return self.proxmox_service.get_cluster_tasks()
+        except Exception as e:
+            logger.warning(f"Cannot read cluster tasks, incremental sync unavailable: {str(e)}")
+            return None
+    
+    def _has_gap(self, tasks: List[Dict]) -> bool:
+        """Check whether the task log rolled over since the previous read, so tasks may be missing"""
+        if not tasks or self._log_newest_start is None:
+            return False
+        return min(task.get('starttime', 0) for task in tasks) > self._log_newest_start
+    
+    def _new_tasks(self, tasks: List[Dict]) -> List[Dict]:
+        """Get finished tasks not handled yet"""
+        return [
+            task for task in tasks
+            if task.get('endtime') is not None
+            and task['endtime'] >= self._task_cursor - TASK_CLOCK_SKEW_SECONDS
+            and task['upid'] not in self._seen_upids
+        ]
+    
+    def _mark_seen(self, tasks: List[Dict]):
+        """Advance the cursor past the finished tasks of a handled task log read"""
+        if tasks:
+            self._log_newest_start = max(task.get('starttime', 0) for task in tasks)
+        for task in tasks:
+            if task.get('endtime') is not None:
+                self._seen_upids[task['upid']] = task['endtime']
+        if self._seen_upids:
+            newest = max(self._seen_upids.values())
+            self._task_cursor = max(self._task_cursor or 0, newest)
+        elif self._task_cursor is None:
+            self._task_cursor = 0
+        self._seen_upids = {
+            upid: endtime for upid, endtime in self._seen_upids.items()
+            if endtime >= self._task_cursor - TASK_CLOCK_SKEW_SECONDS
+        }
+    
     def get_vm_by_vmid(self, db: Session, vmid: int) -> VM:
         """
         Get VM from database by VMID
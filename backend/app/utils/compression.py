@@ -0,0 +1,124 @@
+"""
+Response compression middleware
+Negotiates brotli or gzip from Accept-Encoding for complete (non-streaming) responses
+"""
+from typing import Optional
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip only without it
+    brotli = None
+
+# Compression levels trading ratio for CPU (brotli 0-11, gzip 1-9)
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+
+def _supported_encodings() -> tuple:
+    """Encodings in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the response encoding from an Accept-Encoding header
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        'br', 'gzip' or None for an uncompressed response
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in _supported_encodings():
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses sent in one piece
+
+    Streaming responses (e.g. Server-Sent Events), bodies below
+    minimum_size and responses that already carry a Content-Encoding
+    are passed through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ''
+        for name, value in scope['headers']:
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if start_message is None or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = [(name, value) for name, value in start.get('headers', [])]
+            names = {name.lower() for name, _ in headers}
+            body = message.get('body', b'')
+
+            if (message.get('more_body', False) or b'content-encoding' in names
+                    or len(body) < self.minimum_size):
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            vary = [value for name, value in headers if name.lower() == b'vary']
+            headers = [
+                (name, value) for name, value in headers
+                if name.lower() not in (b'content-length', b'vary')
+            ]
+            headers += [
+                (b'content-encoding', encoding.encode()),
+                (b'content-length', str(len(body)).encode()),
+                (b'vary', b', '.join(vary + [b'Accept-Encoding'])),
+            ]
+            await send({**start, 'headers': headers})
+            await send({**message, 'body': body})
+
+        await self.app(scope, receive, send_compressed)
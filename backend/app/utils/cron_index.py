@@ -0,0 +1,408 @@
+"""
+Compiled cron expressions
+Cron fields are compiled once into bitsets so fire times of many
+schedules can be computed in a single pass without croniter
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.util import astimezone, localize
+from tzlocal import get_localzone
+
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+DAY_NAMES = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+# (minimum, maximum, names) per field; day of week allows 7 for Sunday
+FIELDS = (
+    (0, 59, None),
+    (0, 23, None),
+    (1, 31, None),
+    (1, 12, {name: index + 1 for index, name in enumerate(MONTH_NAMES)}),
+    (0, 7, {name: index for index, name in enumerate(DAY_NAMES)}),
+)
+
+# Bitsets of unrestricted day-of-month (1-31) and day-of-week (0-6) fields
+ALL_DAYS = ((1 << 32) - 1) & ~1
+ALL_WEEKDAYS = (1 << 7) - 1
+
+# How far next/previous fire time searches look before giving up
+SEARCH_DAYS = 366 * 5
+
+
+def _parse_value(value: str, names: Optional[Dict[str, int]]) -> int:
+    """Parse a single field value (number or name)"""
+    if names and value.lower() in names:
+        return names[value.lower()]
+    if not value.isdigit():
+        raise ValueError(f"Invalid value: {value}")
+    return int(value)
+
+
+def _parse_field(field: str, minimum: int, maximum: int, names: Optional[Dict[str, int]]) -> int:
+    """
+    Parse one cron field into a bitset
+
+    Args:
+        field: Field text, e.g. '*/15', '1-5', 'mon,wed'
+        minimum: Lowest allowed value
+        maximum: Highest allowed value
+        names: Optional mapping of names to values
+
+    Returns:
+        Integer with bit n set if value n matches
+    """
+    bits = 0
+
+    for part in field.split(','):
+        step = 1
+        stepped = '/' in part
+        if stepped:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Invalid step: {step_text}")
+            step = int(step_text)
+
+        if part in ('*', '?'):
+            start, end = minimum, maximum
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = _parse_value(part, names)
+            # 'N/step' runs from N to the maximum, even with a step of 1
+            end = maximum if stepped else start
+
+        if start < minimum or end > maximum or start > end:
+            raise ValueError(f"Value out of range: {part}")
+
+        for value in range(start, end + 1, step):
+            bits |= 1 << value
+
+    return bits
+
+
+def _bits_to_list(bits: int) -> List[int]:
+    """List the set bit positions of a bitset"""
+    values = []
+    position = 0
+    while bits:
+        if bits & 1:
+            values.append(position)
+        bits >>= 1
+        position += 1
+    return values
+
+
+class CompiledCron:
+    """A cron expression compiled into per-field bitsets"""
+
+    __slots__ = (
+        'expression', 'minutes', 'hours', 'days', 'months', 'weekdays',
+        'day_restricted', 'weekday_restricted', '_minute_list', '_hour_list'
+    )
+
+    def __init__(self, expression: str):
+        """
+        Compile a standard 5-field cron expression
+
+        Args:
+            expression: Cron expression or macro such as '@daily'
+
+        Raises:
+            ValueError if the expression is not supported
+        """
+        self.expression = expression
+        fields = MACROS.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 fields, got {len(fields)}")
+
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(field, *spec) for field, spec in zip(fields, FIELDS)
+        )
+
+        # Sunday may be written as 0 or 7
+        if self.weekdays & (1 << 7):
+            self.weekdays = (self.weekdays | 1) & ~(1 << 7)
+
+        # Like croniter, a day field is restricted unless it covers every value,
+        # so steps such as '*/2' restrict while '1-31' or '*/1' do not
+        self.day_restricted = self.days != ALL_DAYS
+        self.weekday_restricted = self.weekdays != ALL_WEEKDAYS
+
+        self._minute_list = _bits_to_list(self.minutes)
+        self._hour_list = _bits_to_list(self.hours)
+
+    def matches_day(self, day: date) -> bool:
+        """Check whether the expression fires at all on a given day"""
+        if not self.months >> day.month & 1:
+            return False
+
+        day_match = bool(self.days >> day.day & 1)
+        weekday_match = bool(self.weekdays >> (day.isoweekday() % 7) & 1)
+
+        # If both day fields are restricted either one matching is enough,
+        # otherwise the unrestricted field matches every day anyway
+        if self.day_restricted and self.weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def matches(self, moment: datetime) -> bool:
+        """Check whether the expression fires in the minute of a point in time"""
+        return bool(
+            self.minutes >> moment.minute & 1
+            and self.hours >> moment.hour & 1
+            and self.matches_day(moment.date())
+        )
+
+    def iter_fire_times(self, start: datetime, end: datetime) -> Iterator[datetime]:
+        """
+        Iterate fire times in [start, end)
+
+        Args:
+            start: First instant to consider (inclusive)
+            end: Last instant to consider (exclusive)
+
+        Yields:
+            Fire times in ascending order
+        """
+        first = start.replace(second=0, microsecond=0)
+        if first < start:
+            first += timedelta(minutes=1)
+
+        day = first.date()
+        while datetime.combine(day, time()) < end:
+            if self.matches_day(day):
+                hours = self._hour_list
+                if day == first.date():
+                    hours = hours[bisect_left(hours, first.hour):]
+
+                for hour in hours:
+                    minutes = self._minute_list
+                    if day == first.date() and hour == first.hour:
+                        minutes = minutes[bisect_left(minutes, first.minute):]
+
+                    for minute in minutes:
+                        fire_time = datetime(day.year, day.month, day.day, hour, minute)
+                        if fire_time >= end:
+                            return
+                        yield fire_time
+
+            day += timedelta(days=1)
+
+    def next_fire(self, after: datetime) -> Optional[datetime]:
+        """
+        Get the first fire time strictly after a point in time
+
+        Args:
+            after: Reference time
+
+        Returns:
+            Next fire time or None if there is none within the search window
+        """
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        return next(self.iter_fire_times(start, start + timedelta(days=SEARCH_DAYS)), None)
+
+    def previous_fire(self, at: datetime) -> Optional[datetime]:
+        """
+        Get the latest fire time at or before a point in time
+
+        Args:
+            at: Reference time
+
+        Returns:
+            Previous fire time or None if there is none within the search window
+        """
+        day = at.date()
+        for _ in range(SEARCH_DAYS):
+            if self.matches_day(day):
+                hours = self._hour_list
+                if day == at.date():
+                    hours = hours[:bisect_right(hours, at.hour)]
+
+                for hour in reversed(hours):
+                    minutes = self._minute_list
+                    if day == at.date() and hour == at.hour:
+                        minutes = minutes[:bisect_right(minutes, at.minute)]
+
+                    if minutes:
+                        return datetime(day.year, day.month, day.day, hour, minutes[-1])
+
+            day -= timedelta(days=1)
+
+        return None
+
+    def to_trigger(self, timezone=None, offset_seconds: int = 0) -> 'CompiledCronTrigger':
+        """
+        Build an APScheduler trigger firing exactly like this expression
+
+        Args:
+            timezone: Trigger timezone (default: local timezone)
+            offset_seconds: Fixed delay added to every fire time
+
+        Returns:
+            APScheduler trigger
+        """
+        return CompiledCronTrigger(self, timezone, offset_seconds)
+
+
+class CompiledCronTrigger(BaseTrigger):
+    """
+    APScheduler trigger evaluating a compiled cron expression
+
+    Unlike CronTrigger.from_crontab(), numeric weekdays count from Sunday
+    and restricted day-of-month/day-of-week fields are ORed, as in cron.
+    Creating it does not parse anything, which keeps adding thousands of
+    jobs cheap.
+    """
+
+    __slots__ = ('compiled', 'timezone', 'offset')
+
+    def __init__(self, compiled: CompiledCron, timezone=None, offset_seconds: int = 0):
+        """
+        Initialize the trigger
+
+        Args:
+            compiled: Compiled cron expression
+            timezone: Timezone the expression is evaluated in (default: local)
+            offset_seconds: Fixed delay added to every fire time
+        """
+        self.compiled = compiled
+        self.timezone = astimezone(timezone) or get_localzone()
+        self.offset = timedelta(seconds=offset_seconds)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        # Continue right after the previous fire, like CronTrigger
+        start = now
+        if previous_fire_time is not None:
+            start = min(now, previous_fire_time + timedelta(microseconds=1))
+            if start == previous_fire_time:
+                start += timedelta(microseconds=1)
+
+        # Cron fields apply to wall-clock time, before the offset
+        local_start = start.astimezone(self.timezone).replace(tzinfo=None) - self.offset
+        fire_time = next(
+            self.compiled.iter_fire_times(local_start, local_start + timedelta(days=SEARCH_DAYS)),
+            None
+        )
+        if fire_time is None:
+            return None
+        return localize(fire_time + self.offset, self.timezone)
+
+    def __str__(self):
+        offset = int(self.offset.total_seconds())
+        return f"cron[{self.compiled.expression}]" + (f" +{offset}s" if offset else "")
+
+
+@lru_cache(maxsize=4096)
+def compile_cron(expression: str) -> CompiledCron:
+    """
+    Compile a cron expression, reusing earlier compilations
+
+    Args:
+        expression: Cron expression
+
+    Returns:
+        Compiled expression
+
+    Raises:
+        ValueError if the expression is not supported
+    """
+    return CompiledCron(expression)
+
+
+class CronIndex:
+    """Fire time index over many schedules"""
+
+    def __init__(self, schedules: Iterable[Tuple[int, str, int]]):
+        """
+        Build the index
+
+        Schedules sharing an expression and offset are computed once.
+        Schedules with unsupported expressions are left out and listed in
+        self.invalid.
+
+        Args:
+            schedules: (schedule_id, cron_expression, offset_seconds) tuples
+        """
+        self.groups: Dict[Tuple[str, int], List[int]] = {}
+        self.invalid: List[int] = []
+
+        for schedule_id, expression, offset in schedules:
+            try:
+                compile_cron(expression)
+            except ValueError:
+                self.invalid.append(schedule_id)
+                continue
+            self.groups.setdefault((expression, offset or 0), []).append(schedule_id)
+
+    def fire_times(self, start: datetime, end: datetime) -> Iterator[Tuple[datetime, int]]:
+        """
+        Iterate all fire times of all schedules in [start, end) in time order
+
+        Args:
+            start: Start of the horizon (inclusive)
+            end: End of the horizon (exclusive)
+
+        Yields:
+            (fire_time, schedule_id) tuples
+        """
+        def stream(expression: str, offset: int, schedule_ids: List[int]):
+            delay = timedelta(seconds=offset)
+            for fire_time in compile_cron(expression).iter_fire_times(start - delay, end - delay):
+                yield fire_time + delay, schedule_ids
+
+        streams = [
+            stream(expression, offset, schedule_ids)
+            for (expression, offset), schedule_ids in self.groups.items()
+        ]
+
+        for fire_time, schedule_ids in merge(*streams, key=lambda item: item[0]):
+            for schedule_id in schedule_ids:
+                yield fire_time, schedule_id
+
+    def upcoming(self, start: datetime, end: datetime, limit: int = None) -> List[Tuple[datetime, int]]:
+        """
+        Get the first fire times of all schedules in a horizon
+
+        Args:
+            start: Start of the horizon (inclusive)
+            end: End of the horizon (exclusive)
+            limit: Maximum number of entries
+
+        Returns:
+            (fire_time, schedule_id) tuples in time order
+        """
+        return list(islice(self.fire_times(start, end), limit))
+
+    def next_fire_times(self, after: datetime) -> Dict[int, Optional[datetime]]:
+        """
+        Get the next fire time of every schedule
+
+        Args:
+            after: Reference time
+
+        Returns:
+            Mapping of schedule ID to next fire time
+        """
+        result = {}
+        for (expression, offset), schedule_ids in self.groups.items():
+            delay = timedelta(seconds=offset)
+            next_fire = compile_cron(expression).next_fire(after - delay)
+            for schedule_id in schedule_ids:
+                result[schedule_id] = next_fire + delay if next_fire else None
+        return result
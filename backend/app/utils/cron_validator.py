@@ -1,10 +1,12 @@
 """
 Cron expression validation utilities
+croniter is only imported for syntax the compiled cron index does not cover
 """
-from croniter import croniter
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
+from app.utils.cron_index import compile_cron
+
 
 def validate_cron_expression(expression: str) -> bool:
     """
@@ -16,6 +18,8 @@ def validate_cron_expression(expression: str) -> bool:
     Returns:
         True if valid, False otherwise
     """
+    from croniter import croniter
+    
     try:
         croniter(expression)
         return True
@@ -23,13 +27,18 @@ def validate_cron_expression(expression: str) -> bool:
         return False
 
 
-def get_next_run_time(expression: str, base_time: Optional[datetime] = None) -> Optional[datetime]:
+def get_next_run_time(
+    expression: str,
+    base_time: Optional[datetime] = None,
+    offset_seconds: int = 0
+) -> Optional[datetime]:
     """
     Get the next execution time for a cron expression
     
     Args:
         expression: Cron expression string
         base_time: Base time to calculate from (default: now)
+        offset_seconds: Fixed delay of every execution (schedule jitter)
         
     Returns:
         Next execution datetime or None if invalid
@@ -38,8 +47,48 @@ def get_next_run_time(expression: str, base_time: Optional[datetime] = None) ->
         if base_time is None:
             base_time = datetime.now()
         
-        cron = croniter(expression, base_time)
-        return cron.get_next(datetime)
+        offset = timedelta(seconds=offset_seconds)
+        try:
+            next_run = compile_cron(expression).next_fire(base_time - offset)
+        except ValueError:
+            # Syntax beyond standard cron fields
+            from croniter import croniter
+            next_run = croniter(expression, base_time - offset).get_next(datetime)
+        return next_run + offset if next_run else None
+    except Exception:
+        return None
+
+
+def get_previous_run_time(
+    expression: str,
+    base_time: Optional[datetime] = None,
+    offset_seconds: int = 0
+) -> Optional[datetime]:
+    """
+    Get the latest execution time at or before a point in time
+    
+    Args:
+        expression: Cron expression string
+        base_time: Base time to calculate from (default: now)
+        offset_seconds: Fixed delay of every execution (schedule jitter)
+        
+    Returns:
+        Previous execution datetime or None if invalid
+    """
+    try:
+        if base_time is None:
+            base_time = datetime.now()
+        
+        offset = timedelta(seconds=offset_seconds)
+        base_time -= offset
+        try:
+            previous_run = compile_cron(expression).previous_fire(base_time)
+        except ValueError:
+            from croniter import croniter
+            # croniter's get_prev() is exclusive, so start one second later
+            cron = croniter(expression, base_time.replace(microsecond=0) + timedelta(seconds=1))
+            previous_run = cron.get_prev(datetime)
+        return previous_run + offset if previous_run else None
     except Exception:
         return None
 
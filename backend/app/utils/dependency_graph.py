@@ -0,0 +1,124 @@
+"""
+Dependency graph utilities for ordered group actions
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.models import GroupMember, GroupDependency
+
+# Actions that take a stack down and therefore run in reverse order
+REVERSED_ACTIONS = ('shutdown', 'stop')
+
+
+def build_dependency_graph(orders: Dict[int, int], edges: Iterable[Tuple[int, int]],
+                           reverse: bool = False) -> Dict[int, Set[int]]:
+    """
+    Build the prerequisites of every member for a group action
+
+    Members with a lower start order run before members with a higher one,
+    and an edge (vm, depends_on) makes depends_on run before vm. Reversing
+    flips every constraint, e.g. for shutdown.
+
+    Args:
+        orders: Mapping of VM database ID to start order
+        edges: (vm_id, depends_on_vm_id) pairs; pairs with unknown VMs are ignored
+        reverse: Reverse the order (for shutdown/stop)
+
+    Returns:
+        Mapping of VM ID to the set of VM IDs that must finish first
+    """
+    prerequisites = {vm_id: set() for vm_id in orders}
+
+    # Each order level waits for the whole previous level
+    levels = defaultdict(list)
+    for vm_id, order in orders.items():
+        levels[order or 0].append(vm_id)
+
+    ordered = [levels[order] for order in sorted(levels)]
+    for previous, current in zip(ordered, ordered[1:]):
+        for vm_id in current:
+            prerequisites[vm_id].update(previous)
+
+    for vm_id, depends_on in edges:
+        if vm_id in prerequisites and depends_on in prerequisites and vm_id != depends_on:
+            prerequisites[vm_id].add(depends_on)
+
+    if reverse:
+        reversed_prerequisites = {vm_id: set() for vm_id in prerequisites}
+        for vm_id, before in prerequisites.items():
+            for other in before:
+                reversed_prerequisites[other].add(vm_id)
+        prerequisites = reversed_prerequisites
+
+    return prerequisites
+
+
+def has_dependencies(prerequisites: Dict[int, Set[int]]) -> bool:
+    """Check whether any member has to wait for another one"""
+    return any(prerequisites.values())
+
+
+def topological_levels(prerequisites: Dict[int, Set[int]]) -> List[List[int]]:
+    """
+    Group members into levels that can run in parallel
+
+    Args:
+        prerequisites: Mapping of VM ID to the set of VM IDs that must finish first
+
+    Returns:
+        List of levels, each a list of VM IDs
+
+    Raises:
+        ValueError if the graph contains a cycle
+    """
+    remaining = {vm_id: len(before) for vm_id, before in prerequisites.items()}
+    dependents = defaultdict(list)
+    for vm_id, before in prerequisites.items():
+        for other in before:
+            dependents[other].append(vm_id)
+
+    levels = []
+    current = sorted(vm_id for vm_id, count in remaining.items() if count == 0)
+    processed = 0
+
+    while current:
+        levels.append(current)
+        processed += len(current)
+
+        following = []
+        for vm_id in current:
+            for dependent in dependents[vm_id]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    following.append(dependent)
+        current = sorted(following)
+
+    if processed != len(prerequisites):
+        raise ValueError("Dependency cycle detected")
+
+    return levels
+
+
+def load_group_graph(db: Session, group_id: int, action: str) -> Dict[int, Set[int]]:
+    """
+    Build the dependency graph of a group from the database
+
+    Args:
+        db: Database session
+        group_id: Group ID
+        action: Action to plan (shutdown/stop run in reverse order)
+
+    Returns:
+        Mapping of VM ID to the set of VM IDs that must finish first
+    """
+    orders = dict(
+        db.query(GroupMember.vm_id, GroupMember.start_order).filter(
+            GroupMember.group_id == group_id
+        ).all()
+    )
+    edges = db.query(GroupDependency.vm_id, GroupDependency.depends_on_vm_id).filter(
+        GroupDependency.group_id == group_id
+    ).all()
+
+    return build_dependency_graph(orders, edges, reverse=action in REVERSED_ACTIONS)
@@ -0,0 +1,58 @@
+"""
+Fast JSON responses for large lists
+Rows are fetched as tuples, validated in one pass and encoded with orjson
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+
+@lru_cache(maxsize=None)
+def rows_adapter(model: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    """
+    Get a cached validator for lists of rows with some fields of a response model
+
+    Rows are validated as plain dicts (a TypedDict with the field types of
+    the model) instead of building a model instance per row.
+
+    Args:
+        model: Response model
+        fields: Fields of the rows, all present in every row
+
+    Returns:
+        TypeAdapter validating a list of row dicts
+    """
+    annotations = {field: model.model_fields[field].annotation for field in fields}
+    row_type = TypedDict(f"{model.__name__}Row", annotations)
+    return TypeAdapter(List[row_type])
+
+
+def model_columns(model: Type[BaseModel], entity: Any, fields: Optional[Iterable[str]] = None) -> list:
+    """Get the ORM columns backing fields of a response model (default: all fields)"""
+    return [getattr(entity, field) for field in (fields or model.model_fields)]
+
+
+def rows_response(
+    rows: Sequence[Sequence[Any]],
+    model: Type[BaseModel],
+    fields: Optional[Sequence[str]] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> ORJSONResponse:
+    """
+    Build a JSON list response from tuple rows
+
+    Args:
+        rows: Rows whose leading values are the fields, in order
+        model: Response model the rows are validated against
+        fields: Fields of the rows (default: all fields of the model)
+        headers: Extra response headers
+
+    Returns:
+        Response with one JSON object per row
+    """
+    fields = tuple(fields or model.model_fields)
+    items = [dict(zip(fields, row)) for row in rows]
+    return ORJSONResponse(content=rows_adapter(model, fields).validate_python(items), headers=headers)
@@ -0,0 +1,45 @@
+"""
+Schedule jitter utilities
+Spreads schedules with identical cron expressions over a bounded window
+"""
+from typing import Optional
+import zlib
+
+from app.config import settings
+
+# Upper bound of any jitter window
+MAX_JITTER_SECONDS = 3600
+
+
+def get_jitter_window(jitter_seconds: Optional[int] = None) -> int:
+    """
+    Get the effective jitter window of a schedule
+
+    Args:
+        jitter_seconds: Schedule's own window (None = global SCHEDULE_JITTER_SECONDS)
+
+    Returns:
+        Window in seconds, 0 if jitter is disabled
+    """
+    window = settings.SCHEDULE_JITTER_SECONDS if jitter_seconds is None else jitter_seconds
+    return min(max(window or 0, 0), MAX_JITTER_SECONDS)
+
+
+def get_schedule_offset(schedule_id: int, jitter_seconds: Optional[int] = None) -> int:
+    """
+    Get the fixed delay of a schedule's fires within its jitter window
+
+    The offset is derived from the schedule ID, so a schedule always fires
+    at the same point of its window and never drifts between runs.
+
+    Args:
+        schedule_id: Schedule ID
+        jitter_seconds: Schedule's own window (None = global setting)
+
+    Returns:
+        Offset in seconds
+    """
+    window = get_jitter_window(jitter_seconds)
+    if not window:
+        return 0
+    return zlib.crc32(f"schedule-{schedule_id}".encode()) % (window + 1)
@@ -0,0 +1,121 @@
+"""
+Keyset pagination utilities
+Multi-field sorting with opaque cursors, stable under concurrent inserts
+"""
+from typing import Any, Dict, List, Tuple
+import base64
+import json
+
+from sqlalchemy import and_, or_, func
+
+
+def parse_sort(sort: str, sortable: Dict[str, Tuple[Any, Any]], tiebreaker: str) -> List[Tuple[str, bool]]:
+    """
+    Parse a sort parameter like "node,-name"
+
+    Args:
+        sort: Comma-separated field names, '-' prefix for descending
+        sortable: Mapping of field name to (column, substitute for NULL)
+        tiebreaker: Unique field appended so the order is total
+
+    Returns:
+        List of (field, descending)
+
+    Raises:
+        ValueError: If a field is not sortable
+    """
+    keys = []
+    for part in (sort or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        descending = part.startswith('-')
+        field = part.lstrip('-+')
+        if field not in sortable:
+            raise ValueError(f"Cannot sort by '{field}'")
+        if field not in (key for key, _ in keys):
+            keys.append((field, descending))
+
+    if tiebreaker not in (key for key, _ in keys):
+        keys.append((tiebreaker, False))
+    return keys
+
+
+def _sort_expression(sortable: Dict[str, Tuple[Any, Any]], field: str):
+    """Column of a sort field, with NULLs replaced so they compare like values"""
+    column, null_value = sortable[field]
+    return column if null_value is None else func.coalesce(column, null_value)
+
+
+def order_by_clauses(keys: List[Tuple[str, bool]], sortable: Dict[str, Tuple[Any, Any]]) -> list:
+    """Get ORDER BY clauses for parsed sort keys"""
+    return [
+        _sort_expression(sortable, field).desc() if descending else _sort_expression(sortable, field).asc()
+        for field, descending in keys
+    ]
+
+
+def keyset_filter(keys: List[Tuple[str, bool]], sortable: Dict[str, Tuple[Any, Any]], values: List[Any]):
+    """
+    Build the condition selecting rows after a cursor
+
+    For keys (a, b, c) this is a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+    with < for descending keys.
+
+    Args:
+        keys: Parsed sort keys
+        sortable: Mapping of field name to (column, substitute for NULL)
+        values: Sort values of the last row of the previous page
+    """
+    conditions = []
+    for index, (field, descending) in enumerate(keys):
+        expression = _sort_expression(sortable, field)
+        equal = [
+            _sort_expression(sortable, previous) == values[position]
+            for position, (previous, _) in enumerate(keys[:index])
+        ]
+        beyond = expression < values[index] if descending else expression > values[index]
+        conditions.append(and_(*equal, beyond))
+    return or_(*conditions)
+
+
+def row_sort_values(row: Any, keys: List[Tuple[str, bool]], sortable: Dict[str, Tuple[Any, Any]]) -> List[Any]:
+    """Get the sort values of a row, with NULLs substituted like in the query"""
+    values = []
+    for field, _ in keys:
+        value = getattr(row, field)
+        null_value = sortable[field][1]
+        values.append(null_value if value is None and null_value is not None else value)
+    return values
+
+
+def encode_cursor(keys: List[Tuple[str, bool]], values: List[Any]) -> str:
+    """Encode the sort keys and values of a row as an opaque cursor"""
+    payload = {'s': [f"-{field}" if descending else field for field, descending in keys], 'v': values}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, keys: List[Tuple[str, bool]]) -> List[Any]:
+    """
+    Decode a cursor created by encode_cursor()
+
+    Args:
+        cursor: Cursor string
+        keys: Sort keys of the current request
+
+    Returns:
+        Sort values of the last row of the previous page
+
+    Raises:
+        ValueError: If the cursor is malformed or was created for a different sort
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort, values = payload['s'], payload['v']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if sort != [f"-{field}" if descending else field for field, descending in keys] or len(values) != len(keys):
+        raise ValueError("Cursor does not match the requested sort")
+    return values
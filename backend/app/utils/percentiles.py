@@ -0,0 +1,46 @@
+"""
+Percentile utilities
+"""
+from typing import Dict, List, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """
+    Get a percentile using linear interpolation
+    
+    Args:
+        sorted_values: Values in ascending order
+        q: Percentile between 0 and 100
+        
+    Returns:
+        Percentile value or None if there are no values
+    """
+    if not sorted_values:
+        return None
+    
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Summarize values as p50/p90/p95/p99/max
+    
+    Args:
+        values: Values in any order
+        
+    Returns:
+        Dictionary of percentiles
+    """
+    ordered = sorted(values)
+    return {
+        'p50': percentile(ordered, 50),
+        'p90': percentile(ordered, 90),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+        'max': ordered[-1] if ordered else None
+    }
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Cluster benchmark
+Runs the backend against a simulated Proxmox cluster (benchmarks/fake_proxmox.py)
+and measures:
+    - VM sync time (initial import and steady-state resync)
+    - group action throughput of a scheduled run
+    - schedule fan-out lag when many schedules fire in the same minute
+    - API endpoint latency (in-process, p50/p95/p99)
+
+Usage (from the backend directory):
+    python benchmarks/bench_cluster.py [--nodes 4] [--guests 1000] [--latency-ms 10]
+        [--output results.json] [--baseline results.json] [--tolerance 0.2]
+
+With --baseline, exits with status 1 if any metric is more than
+--tolerance worse than in the baseline results. The fan-out benchmark
+waits for the next full minute; skip it with --skip-fanout.
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.utils.percentiles import summarize  # noqa: E402
+from fake_proxmox import FakeCluster, FakeProxmoxServer  # noqa: E402
+
+# The fake cluster uses a self-signed certificate
+warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+
+# Metric name -> True if higher values are better
+HIGHER_IS_BETTER = {'group_actions_per_second': True}
+
+
+def configure_environment(database_path: str, proxmox_port: int):
+    """Point the settings at a throwaway database and the fake cluster"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{database_path}"
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('ENCRYPTION_KEY', 'benchmark')
+    os.environ['PROXMOX_HOST'] = '127.0.0.1'
+    os.environ['PROXMOX_PORT'] = str(proxmox_port)
+    os.environ['PROXMOX_VERIFY_SSL'] = 'false'
+    os.environ.setdefault('PROXMOX_USER', 'root@pam')
+    os.environ.setdefault('PROXMOX_TOKEN_NAME', 'benchmark')
+    os.environ.setdefault('PROXMOX_TOKEN_VALUE', 'benchmark')
+    os.environ['SCHEDULER_EXECUTOR'] = 'thread'
+    os.environ['SKIP_NOOP_ACTIONS'] = 'false'  # Every targeted VM gets an action
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def bench_sync(attempts: int = 5) -> Dict[str, float]:
+    """Time an initial VM import and a resync of unchanged VMs"""
+    from app.services.vm_sync import VMSyncService
+
+    service = VMSyncService()
+    results = {}
+    for name in ('sync_initial_seconds', 'sync_seconds'):
+        # With a failure rate, syncs fail like against a flaky cluster;
+        # the time of the successful attempt is reported
+        for attempt in range(1, attempts + 1):
+            start = time.perf_counter()
+            try:
+                stats = service.sync_vms()
+                break
+            except Exception:
+                if attempt == attempts:
+                    raise
+        results[name] = time.perf_counter() - start
+        print(f"  {name}: {results[name]:.3f}s ({stats['total']} VMs, attempt {attempt})")
+    return results
+
+
+def bench_group_action(service, group_size: int, wait: bool) -> Dict[str, float]:
+    """Run one scheduled action on a group and measure actions per second"""
+    from app.database import SessionLocal
+    from app.models import VM, Group, GroupMember, Schedule, ExecutionLog
+
+    db = SessionLocal()
+    try:
+        vms = db.query(VM).order_by(VM.vmid).limit(group_size).all()
+        group = Group(name='benchmark-group')
+        db.add(group)
+        db.flush()
+        db.add_all(GroupMember(group_id=group.id, vm_id=vm.id) for vm in vms)
+        schedule = Schedule(
+            name='benchmark-group-action', target_type='group', target_id=group.id,
+            action='start', cron_expression='0 0 1 1 *', enabled=False,
+            wait_for_completion=wait
+        )
+        db.add(schedule)
+        db.commit()
+        schedule_id = schedule.id
+    finally:
+        db.close()
+
+    start = time.perf_counter()
+    service.execute_schedule(schedule_id)
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        logs = db.query(ExecutionLog.status).filter(ExecutionLog.schedule_id == schedule_id).all()
+    finally:
+        db.close()
+
+    succeeded = sum(1 for (status,) in logs if status == 'success')
+    throughput = len(logs) / elapsed if elapsed else 0.0
+    print(f"  group action: {len(logs)} actions ({succeeded} succeeded) in {elapsed:.3f}s, "
+          f"{throughput:.1f} actions/s")
+    return {'group_action_seconds': elapsed, 'group_actions_per_second': throughput}
+
+
+def bench_fanout(service, schedules: int, timeout: float) -> Dict[str, float]:
+    """Let many single-VM schedules fire in the same minute and measure their start lag"""
+    from app.database import SessionLocal
+    from app.models import VM, Schedule, ScheduleRun
+
+    db = SessionLocal()
+    try:
+        vms = db.query(VM).order_by(VM.vmid.desc()).limit(schedules).all()
+        fanout = [
+            Schedule(
+                name=f"benchmark-fanout-{vm.vmid}", target_type='vm', target_id=vm.id,
+                action='start', cron_expression='* * * * *', enabled=True, jitter_seconds=0
+            )
+            for vm in vms
+        ]
+        db.add_all(fanout)
+        db.commit()
+        schedule_ids = [schedule.id for schedule in fanout]
+        expected = len(vms)
+    finally:
+        db.close()
+
+    service.start()
+    seconds_left = 60 - datetime.now().second
+    print(f"  waiting {seconds_left}s for the next minute...")
+
+    deadline = time.time() + seconds_left + timeout
+    runs = []
+    try:
+        while time.time() < deadline:
+            time.sleep(1)
+            db = SessionLocal()
+            try:
+                runs = db.query(ScheduleRun.lag_seconds, ScheduleRun.completion_seconds).filter(
+                    ScheduleRun.schedule_id.in_(schedule_ids),
+                    ScheduleRun.status.notin_(('running', 'missed'))
+                ).all()
+            finally:
+                db.close()
+            if len(runs) >= expected:
+                break
+    finally:
+        service.stop()
+
+    lags = [lag for lag, _ in runs if lag is not None]
+    completions = [completion for _, completion in runs if completion is not None]
+    lag = summarize(lags)
+    results = {
+        'fanout_lag_p50_seconds': lag['p50'] or 0.0,
+        'fanout_lag_p95_seconds': lag['p95'] or 0.0,
+        'fanout_lag_max_seconds': lag['max'] or 0.0,
+        'fanout_completion_max_seconds': max(completions, default=0.0),
+    }
+    print(f"  fan-out: {len(runs)} of {expected} runs, lag p50 {results['fanout_lag_p50_seconds']:.3f}s "
+          f"p95 {results['fanout_lag_p95_seconds']:.3f}s max {results['fanout_lag_max_seconds']:.3f}s, "
+          f"last finished {results['fanout_completion_max_seconds']:.3f}s after the fire time")
+    if len(runs) < expected:
+        results['fanout_missing_runs'] = expected - len(runs)
+    return results
+
+
+def bench_api(requests_per_endpoint: int) -> Dict[str, float]:
+    """Measure in-process latency of the main read endpoints"""
+    from fastapi.testclient import TestClient
+    from app.database import SessionLocal
+    from app.dependencies import create_access_token
+    from app.main import app
+    from app.models import User, VM, Group
+
+    db = SessionLocal()
+    try:
+        # Requests use a token, so the user needs no usable password
+        db.add(User(username='benchmark', password_hash='!'))
+        db.commit()
+        vmid = db.query(VM.vmid).order_by(VM.vmid).first()[0]
+        group_id = db.query(Group.id).order_by(Group.id).first()[0]
+    finally:
+        db.close()
+
+    # Without a context manager the startup event (scheduler, sync) does not run
+    client = TestClient(app)
+    client.headers['Authorization'] = f"Bearer {create_access_token({'sub': 'benchmark'})}"
+
+    endpoints = [
+        ('vms', '/api/vms'),
+        ('vm', f"/api/vms/{vmid}"),
+        ('vm_status', f"/api/vms/{vmid}/status"),
+        ('vms_status', '/api/vms/status'),
+        ('groups', '/api/groups'),
+        ('group', f"/api/groups/{group_id}"),
+        ('schedules', '/api/schedules'),
+        ('timeline', '/api/schedules/timeline?hours=24'),
+        ('logs', '/api/logs'),
+        ('stats', '/api/stats'),
+    ]
+
+    results = {}
+    for name, path in endpoints:
+        client.get(path)  # Warm up
+        timings = []
+        errors = 0
+        for _ in range(requests_per_endpoint):
+            start = time.perf_counter()
+            # Endpoints calling Proxmox fail at the simulated failure rate
+            if client.get(path).status_code >= 400:
+                errors += 1
+            timings.append((time.perf_counter() - start) * 1000)
+
+        summary = summarize(timings)
+        for label in ('p50', 'p95', 'p99'):
+            results[f"api_{name}_{label}_ms"] = summary[label]
+        print(f"  GET {path}: p50 {results[f'api_{name}_p50_ms']:.1f}ms "
+              f"p95 {results[f'api_{name}_p95_ms']:.1f}ms p99 {results[f'api_{name}_p99_ms']:.1f}ms"
+              + (f", {errors} errors" if errors else ""))
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """
+    Compare results with a baseline
+
+    Returns:
+        List of regressions (empty if none)
+    """
+    regressions = []
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if HIGHER_IS_BETTER.get(name, False):
+            worse = value < reference * (1 - tolerance)
+        else:
+            worse = value > reference * (1 + tolerance)
+        if worse:
+            regressions.append(f"{name}: {value:.3f} (baseline {reference:.3f})")
+    return regressions
+
+
+def run(args) -> Tuple[Dict[str, float], Dict[str, int]]:
+    """Run all benchmarks against a fresh database and fake cluster"""
+    cluster = FakeCluster(args.nodes, args.guests, args.task_seconds, args.task_failure_rate)
+    server = FakeProxmoxServer(
+        cluster, latency=args.latency_ms / 1000, latency_jitter=args.jitter_ms / 1000,
+        failure_rate=args.failure_rate
+    )
+    server.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(os.path.join(tmp, 'benchmark.db'), server.port)
+
+        from app.database import Base, engine
+        from app.services.scheduler import SchedulerService
+
+        Base.metadata.create_all(engine)
+        results = {}
+        try:
+            print("VM sync")
+            results.update(bench_sync())
+
+            service = SchedulerService()
+            print("Group action")
+            results.update(bench_group_action(service, args.group_size, args.wait))
+
+            if not args.skip_fanout:
+                print("Schedule fan-out")
+                results.update(bench_fanout(service, args.fanout_schedules, args.fanout_timeout))
+
+            print("API latency")
+            results.update(bench_api(args.requests))
+        finally:
+            server.stop()
+            engine.dispose()
+
+    return results, {'requests': server.requests, 'failures': server.failures}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=4, help='Simulated nodes')
+    parser.add_argument('--guests', type=int, default=1000, help='Simulated guests')
+    parser.add_argument('--latency-ms', type=float, default=10, help='Latency of every Proxmox request')
+    parser.add_argument('--jitter-ms', type=float, default=5, help='Random extra latency per request')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Fraction of Proxmox requests failing with a 500')
+    parser.add_argument('--task-seconds', type=float, default=0.5, help='Duration of action tasks')
+    parser.add_argument('--task-failure-rate', type=float, default=0, help='Fraction of failing action tasks')
+    parser.add_argument('--group-size', type=int, default=200, help='VMs in the benchmarked group')
+    parser.add_argument('--wait', action='store_true', help='Wait for task completion in the group action')
+    parser.add_argument('--fanout-schedules', type=int, default=50, help='Schedules firing in the same minute')
+    parser.add_argument('--fanout-timeout', type=float, default=60, help='Max wait for fan-out runs after the fire time')
+    parser.add_argument('--skip-fanout', action='store_true', help='Skip the fan-out benchmark')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per API endpoint')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare with results of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed regression against the baseline')
+    args = parser.parse_args()
+
+    results, server_stats = run(args)
+    print(f"Fake cluster served {server_stats['requests']} requests ({server_stats['failures']} failed)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if results.get('fanout_missing_runs'):
+        print(f"FAIL: {results['fanout_missing_runs']} fan-out runs did not finish")
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            for regression in regressions:
+                print(f"FAIL: {regression}")
+            return 1
+
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
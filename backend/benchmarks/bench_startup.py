@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Scheduler startup benchmark
+Measures how long SchedulerService.start() takes to load many schedules
+
+Usage (from the backend directory):
+    python benchmarks/bench_startup.py [--schedules 10000] [--budget 1.0] [--repeat 5]
+
+Runs against a temporary SQLite database and exits with status 1 if the
+median of the cold startups exceeds the budget.
+"""
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# No schedule fires within this many minutes after creation
+QUIET_MINUTES = 5
+
+
+def configure_environment(database_path: str):
+    """Point the settings at a throwaway database and a dummy Proxmox host"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{database_path}"
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('ENCRYPTION_KEY', 'benchmark')
+    os.environ.setdefault('PROXMOX_HOST', '127.0.0.1')
+    os.environ.setdefault('PROXMOX_USER', 'root@pam')
+    os.environ.setdefault('PROXMOX_TOKEN_NAME', 'benchmark')
+    os.environ.setdefault('PROXMOX_TOKEN_VALUE', 'benchmark')
+    os.environ['SCHEDULER_EXECUTOR'] = 'thread'
+
+
+def create_schedules(count: int):
+    """Create the schema and `count` enabled schedules with a realistic mix of expressions"""
+    from app.database import Base, engine, SessionLocal
+    from app.models import Schedule
+    from app.utils.cron_index import compile_cron
+    from app.utils.jitter import get_schedule_offset
+
+    Base.metadata.create_all(engine)
+
+    expressions = ['0 2 * * *', '*/15 * * * *', '0 * * * *', '30 8 * * 1-5', '0 0 * * 0', '0 0 1 * *']
+    rng = random.Random(42)
+
+    # Runs executing during the measurement would skew it, so expressions
+    # firing within the next minutes are replaced
+    quiet_until = datetime.now() + timedelta(minutes=QUIET_MINUTES)
+
+    def pick_schedule(index: int) -> dict:
+        while True:
+            expression = (
+                rng.choice(expressions) if index % 2
+                else f"{rng.randint(0, 59)} {rng.randint(0, 23)} * * *"
+            )
+            jitter = rng.choice([None, 0, 300])
+            # IDs are assigned in insertion order starting at 1
+            offset = timedelta(seconds=get_schedule_offset(index + 1, jitter))
+            if compile_cron(expression).next_fire(datetime.now() - offset) + offset > quiet_until:
+                return {'cron_expression': expression, 'jitter_seconds': jitter}
+
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(Schedule, [
+            {
+                'name': f"benchmark-{index}",
+                'target_type': 'group',
+                'target_id': 1,
+                'action': rng.choice(['start', 'shutdown']),
+                'enabled': True,
+                **pick_schedule(index),
+            }
+            for index in range(count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure_startup(expected: int) -> tuple:
+    """
+    Time one cold SchedulerService.start()
+
+    Returns:
+        (seconds, scheduled or deferred schedules, schedules without next_run)
+    """
+    from app.database import SessionLocal
+    from app.models import Schedule
+    from app.services.scheduler import SchedulerService
+
+    # Every repetition starts like the first one, with nothing stored yet
+    db = SessionLocal()
+    try:
+        db.query(Schedule).update({Schedule.next_run: None}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    service = SchedulerService()
+
+    start = time.perf_counter()
+    service.start()
+    elapsed = time.perf_counter() - start
+
+    try:
+        jobs = service.scheduled_count()
+        db = SessionLocal()
+        try:
+            missing = db.query(Schedule).filter(Schedule.next_run == None).count()
+        finally:
+            db.close()
+    finally:
+        service.stop()
+
+    return elapsed, jobs, missing
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--schedules', type=int, default=10000, help='Number of schedules')
+    parser.add_argument('--budget', type=float, default=1.0, help='Maximum median startup time in seconds')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of measured startups')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(os.path.join(tmp, 'benchmark.db'))
+        create_schedules(args.schedules)
+
+        results = [measure_startup(args.schedules) for _ in range(args.repeat)]
+
+    timings = sorted(elapsed for elapsed, _, _ in results)
+    median = statistics.median(timings)
+    print(
+        f"Loaded {args.schedules} schedules in {median:.3f}s median "
+        f"(min {timings[0]:.3f}s, max {timings[-1]:.3f}s, {args.repeat} runs, budget {args.budget:.3f}s)"
+    )
+
+    for _, jobs, missing in results:
+        if jobs != args.schedules or missing:
+            print(f"FAIL: {args.schedules - jobs} schedules not scheduled, {missing} without next_run")
+            return 1
+    if median > args.budget:
+        print("FAIL: median startup exceeded budget")
+        return 1
+
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Fake Proxmox API
+Local HTTPS server simulating a Proxmox VE cluster for benchmarks
+
+Serves the parts of the API the backend uses (token auth is accepted
+without checks):
+    GET  /api2/json/nodes
+    GET  /api2/json/cluster/resources
+    GET  /api2/json/cluster/tasks
+    GET  /api2/json/nodes/{node}/{qemu|lxc}/{vmid}/status/current
+    POST /api2/json/nodes/{node}/{qemu|lxc}/{vmid}/status/{action}
+    POST /api2/json/nodes/{node}/{startall|stopall}
+    GET  /api2/json/nodes/{node}/tasks
+    GET  /api2/json/nodes/{node}/tasks/{upid}/status
+
+Every request is delayed by a configurable latency and fails with a 500
+at a configurable rate. Actions create tasks that finish after a fixed
+duration and fail (with a lock error) at their own rate.
+
+Usage (standalone, from the backend directory):
+    python benchmarks/fake_proxmox.py [--nodes 4] [--guests 500] [--port 8006]
+"""
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+import argparse
+import json
+import os
+import random
+import re
+import ssl
+import tempfile
+import threading
+import time
+
+# Target status of a guest once an action task has finished
+ACTION_STATUS = {
+    'start': 'running',
+    'stop': 'stopped',
+    'shutdown': 'stopped',
+    'reboot': 'running',
+    'reset': 'running',
+    'startall': 'running',
+    'stopall': 'stopped',
+}
+
+# Task types as reported by Proxmox
+ACTION_TASK_TYPES = {
+    'start': 'qmstart',
+    'stop': 'qmstop',
+    'shutdown': 'qmshutdown',
+    'reboot': 'qmreboot',
+    'reset': 'qmreset',
+    'startall': 'startall',
+    'stopall': 'stopall',
+}
+
+# Finished tasks kept for the task lists
+TASK_RETENTION = 10000
+
+GUEST_PATH = re.compile(r'^nodes/([^/]+)/(qemu|lxc)/(\d+)/status/(\w+)$')
+TASK_STATUS_PATH = re.compile(r'^nodes/([^/]+)/tasks/([^/]+)/status$')
+TASK_LIST_PATH = re.compile(r'^nodes/([^/]+)/tasks$')
+BULK_PATH = re.compile(r'^nodes/([^/]+)/(startall|stopall)$')
+
+
+class ProxmoxError(Exception):
+    """Error answered with an HTTP status and a Proxmox style message"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FakeCluster:
+    """In-memory state of a simulated cluster"""
+
+    def __init__(self, nodes: int = 4, guests: int = 500, task_seconds: float = 0.5,
+                 task_failure_rate: float = 0.0, seed: int = 42):
+        """
+        Create a cluster with guests spread round-robin over the nodes
+
+        Args:
+            nodes: Number of nodes
+            guests: Number of guests (90% qemu, 10% lxc, about half running)
+            task_seconds: Duration of action tasks
+            task_failure_rate: Fraction of action tasks that fail
+            seed: Random seed, so runs are reproducible
+        """
+        self.task_seconds = task_seconds
+        self.task_failure_rate = task_failure_rate
+        self.rng = random.Random(seed)
+        self.started = time.time()
+
+        self.nodes = [f"pve{index + 1}" for index in range(nodes)]
+        self.guests: Dict[int, Dict] = {}
+        for index in range(guests):
+            vmid = 100 + index
+            self.guests[vmid] = {
+                'vmid': vmid,
+                'name': f"guest-{vmid}",
+                'type': 'lxc' if index % 10 == 9 else 'qemu',
+                'node': self.nodes[index % nodes],
+                'status': 'running' if self.rng.random() < 0.5 else 'stopped',
+                'maxmem': 2 ** 31,
+                'maxdisk': 32 * 2 ** 30,
+                'started_at': self.started,
+                'tags': ('prod;web', 'prod;db', 'dev', '', '')[index % 5],
+            }
+
+        # UPID -> task; pending tasks are settled lazily on the next read
+        self.tasks: Dict[str, Dict] = {}
+        self._pending: List[str] = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _settle(self):
+        """Finish all tasks whose duration has passed (caller holds the lock)"""
+        now = time.time()
+        still_pending = []
+        for upid in self._pending:
+            task = self.tasks[upid]
+            if task['endtime'] > now:
+                still_pending.append(upid)
+                continue
+
+            task['status'] = 'stopped'
+            if task['exitstatus'] == 'OK':
+                for vmid in task['vmids']:
+                    guest = self.guests.get(vmid)
+                    if guest:
+                        guest['status'] = ACTION_STATUS[task['action']]
+                        guest['started_at'] = now
+        self._pending = still_pending
+
+        if len(self.tasks) > TASK_RETENTION:
+            pending = set(self._pending)
+            finished = [upid for upid in self.tasks if upid not in pending]
+            for upid in finished[:len(self.tasks) - TASK_RETENTION]:
+                del self.tasks[upid]
+
+    def _guest(self, node: str, vm_type: str, vmid: int) -> Dict:
+        """Look up a guest the way pveproxy resolves a guest path"""
+        guest = self.guests.get(vmid)
+        if guest is None or guest['type'] != vm_type:
+            raise ProxmoxError(500, f"Configuration file 'nodes/{node}/{vm_type}/{vmid}.conf' does not exist")
+        if guest['node'] != node:
+            raise ProxmoxError(500, f"{vm_type} {vmid} is not on node '{node}'")
+        return guest
+
+    def _resource(self, guest: Dict, now: float) -> Dict:
+        """Render a guest as a cluster/resources entry"""
+        running = guest['status'] == 'running'
+        uptime = int(now - guest['started_at']) if running else 0
+        return {
+            'id': f"{guest['type']}/{guest['vmid']}",
+            'type': guest['type'],
+            'vmid': guest['vmid'],
+            'name': guest['name'],
+            'node': guest['node'],
+            'status': guest['status'],
+            'maxmem': guest['maxmem'],
+            'mem': guest['maxmem'] // 2 if running else 0,
+            'maxdisk': guest['maxdisk'],
+            'cpu': 0.05 if running else 0,
+            'maxcpu': 2,
+            'uptime': uptime,
+            'netin': uptime * 2000,
+            'netout': uptime * 1000,
+            'diskread': uptime * 4096,
+            'diskwrite': uptime * 8192,
+            'template': 0,
+            **({'tags': guest['tags']} if guest['tags'] else {}),
+        }
+
+    def get_nodes(self) -> List[Dict]:
+        """GET /nodes"""
+        return [{'node': node, 'status': 'online', 'type': 'node'} for node in self.nodes]
+
+    def get_resources(self, resource_type: Optional[str] = None) -> List[Dict]:
+        """GET /cluster/resources"""
+        now = time.time()
+        with self._lock:
+            self._settle()
+            resources = []
+            if resource_type in (None, 'node'):
+                resources += [
+                    {'id': f"node/{node}", 'type': 'node', 'node': node, 'status': 'online'}
+                    for node in self.nodes
+                ]
+            if resource_type in (None, 'vm'):
+                resources += [self._resource(guest, now) for guest in self.guests.values()]
+            return resources
+
+    def get_guest_status(self, node: str, vm_type: str, vmid: int) -> Dict:
+        """GET /nodes/{node}/{type}/{vmid}/status/current"""
+        with self._lock:
+            self._settle()
+            resource = self._resource(self._guest(node, vm_type, vmid), time.time())
+            resource['qmpstatus'] = resource['status']
+            return resource
+
+    def _create_task(self, node: str, action: str, task_id: str, vmids: List[int]) -> str:
+        """Create an action task (caller holds the lock)"""
+        self._counter += 1
+        now = time.time()
+        task_type = ACTION_TASK_TYPES[action]
+        upid = (
+            f"UPID:{node}:{self._counter:08X}:{int(now * 100) & 0xFFFFFFFF:08X}:"
+            f"{int(now):08X}:{task_type}:{task_id}:root@pam!benchmark:"
+        )
+        failed = self.rng.random() < self.task_failure_rate
+        self.tasks[upid] = {
+            'upid': upid,
+            'node': node,
+            'type': task_type,
+            'id': task_id,
+            'user': 'root@pam!benchmark',
+            'starttime': int(now),
+            'endtime': now + self.task_seconds,
+            'status': 'running',
+            'exitstatus': f"can't lock file '/var/lock/qemu-server/lock-{task_id}.conf' - got timeout" if failed else 'OK',
+            'vmids': vmids,
+            'action': action,
+        }
+        self._pending.append(upid)
+        return upid
+
+    def run_action(self, node: str, vm_type: str, vmid: int, action: str) -> str:
+        """POST /nodes/{node}/{type}/{vmid}/status/{action}"""
+        if action not in ACTION_STATUS or action.endswith('all') or (action == 'reset' and vm_type != 'qemu'):
+            raise ProxmoxError(501, f"Method 'POST /nodes/{node}/{vm_type}/{vmid}/status/{action}' not implemented")
+
+        with self._lock:
+            self._settle()
+            self._guest(node, vm_type, vmid)
+            return self._create_task(node, action, str(vmid), [vmid])
+
+    def run_bulk_action(self, node: str, action: str, vms: Optional[str] = None) -> str:
+        """POST /nodes/{node}/startall and /nodes/{node}/stopall"""
+        if node not in self.nodes:
+            raise ProxmoxError(500, f"no such cluster node '{node}'")
+
+        with self._lock:
+            self._settle()
+            on_node = [vmid for vmid, guest in self.guests.items() if guest['node'] == node]
+            if vms:
+                requested = {int(vmid) for vmid in vms.split(',')}
+                on_node = [vmid for vmid in on_node if vmid in requested]
+            return self._create_task(node, action, '', on_node)
+
+    def _render_task(self, task: Dict) -> Dict:
+        """Render a task as Proxmox lists it"""
+        rendered = {key: task[key] for key in ('upid', 'node', 'type', 'id', 'user', 'starttime', 'status')}
+        if task['status'] == 'stopped':
+            rendered['endtime'] = int(task['endtime'])
+            rendered['exitstatus'] = task['exitstatus']
+        return rendered
+
+    def get_task_status(self, node: str, upid: str) -> Dict:
+        """GET /nodes/{node}/tasks/{upid}/status"""
+        with self._lock:
+            self._settle()
+            task = self.tasks.get(upid)
+            if task is None or task['node'] != node:
+                raise ProxmoxError(500, f"no such task '{upid}'")
+            return self._render_task(task)
+
+    def get_tasks(self, node: Optional[str] = None, limit: int = 50, since: int = 0) -> List[Dict]:
+        """GET /nodes/{node}/tasks and /cluster/tasks, newest first"""
+        with self._lock:
+            self._settle()
+            tasks = [
+                self._render_task(task)
+                for task in reversed(list(self.tasks.values()))
+                if (node is None or task['node'] == node) and task['starttime'] >= since
+            ]
+            return tasks[:limit]
+
+
+class FakeProxmoxServer:
+    """HTTPS server exposing a FakeCluster"""
+
+    def __init__(self, cluster: FakeCluster, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, latency_jitter: float = 0.0, failure_rate: float = 0.0):
+        """
+        Initialize the server (call start() to serve)
+
+        Args:
+            cluster: Simulated cluster state
+            host: Address to bind
+            port: Port to bind, 0 = any free port
+            latency: Delay added to every request in seconds
+            latency_jitter: Random extra delay of up to this many seconds
+            failure_rate: Fraction of requests answered with a 500
+        """
+        self.cluster = cluster
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._rng = random.Random(7)
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.httpd.socket = self._tls_context().wrap_socket(self.httpd.socket, server_side=True)
+
+    @property
+    def host(self) -> str:
+        return self.httpd.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self):
+        """Serve requests in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-proxmox', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    @staticmethod
+    def _tls_context() -> ssl.SSLContext:
+        """Create a TLS context with a fresh self-signed certificate"""
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.x509.oid import NameOID
+
+        key = ec.generate_private_key(ec.SECP256R1())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'fake-proxmox')])
+        now = datetime.now(timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=30))
+            .sign(key, hashes.SHA256())
+        )
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        with tempfile.TemporaryDirectory() as tmp:
+            cert_path = os.path.join(tmp, 'cert.pem')
+            key_path = os.path.join(tmp, 'key.pem')
+            with open(cert_path, 'wb') as f:
+                f.write(certificate.public_bytes(serialization.Encoding.PEM))
+            with open(key_path, 'wb') as f:
+                f.write(key.private_bytes(
+                    serialization.Encoding.PEM,
+                    serialization.PrivateFormat.PKCS8,
+                    serialization.NoEncryption()
+                ))
+            context.load_cert_chain(cert_path, key_path)
+        return context
+
+    def _delay_and_fail(self) -> bool:
+        """Apply latency; return True if this request should fail"""
+        with self._stats_lock:
+            self.requests += 1
+            jitter = self._rng.random() * self.latency_jitter
+            failed = self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+
+        if self.latency or jitter:
+            time.sleep(self.latency + jitter)
+        return failed
+
+    def handle(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, object]:
+        """
+        Route a request to the cluster
+
+        Args:
+            method: HTTP method
+            path: Path below /api2/json
+            query: Query string or form parameters
+
+        Returns:
+            Tuple of (HTTP status, response data or error message)
+        """
+        cluster = self.cluster
+        try:
+            if method == 'GET' and path == 'nodes':
+                return 200, cluster.get_nodes()
+            if method == 'GET' and path == 'cluster/resources':
+                return 200, cluster.get_resources(query.get('type'))
+            if method == 'GET' and path == 'cluster/tasks':
+                return 200, cluster.get_tasks(limit=int(query.get('limit', 50)), since=int(query.get('since', 0)))
+
+            match = GUEST_PATH.match(path)
+            if match:
+                node, vm_type, vmid, command = match.group(1), match.group(2), int(match.group(3)), match.group(4)
+                if method == 'GET' and command == 'current':
+                    return 200, cluster.get_guest_status(node, vm_type, vmid)
+                if method == 'POST':
+                    return 200, cluster.run_action(node, vm_type, vmid, command)
+
+            match = BULK_PATH.match(path)
+            if match and method == 'POST':
+                return 200, cluster.run_bulk_action(match.group(1), match.group(2), query.get('vms'))
+
+            match = TASK_STATUS_PATH.match(path)
+            if match and method == 'GET':
+                return 200, cluster.get_task_status(match.group(1), match.group(2))
+
+            match = TASK_LIST_PATH.match(path)
+            if match and method == 'GET':
+                return 200, cluster.get_tasks(
+                    match.group(1), limit=int(query.get('limit', 50)), since=int(query.get('since', 0))
+                )
+
+            return 501, f"Method '{method} /{path}' not implemented"
+        except ProxmoxError as e:
+            return e.status, e.message
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _dispatch(self, method: str):
+                url = urlsplit(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    form = parse_qs(self.rfile.read(length).decode())
+                    query.update({key: values[-1] for key, values in form.items()})
+
+                prefix = '/api2/json/'
+                if not url.path.startswith(prefix):
+                    status, data = 404, 'Not found'
+                elif server._delay_and_fail():
+                    status, data = 500, 'proxy loop detected (simulated failure)'
+                else:
+                    status, data = server.handle(method, unquote(url.path[len(prefix):]).rstrip('/'), query)
+
+                if status == 200:
+                    body = json.dumps({'data': data}).encode()
+                    self.send_response(200)
+                else:
+                    body = json.dumps({'data': None, 'message': data}).encode()
+                    self.send_response(status, data)
+                self.send_header('Content-Type', 'application/json;charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=4, help='Number of nodes')
+    parser.add_argument('--guests', type=int, default=500, help='Number of guests')
+    parser.add_argument('--port', type=int, default=8006, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra delay per request')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Fraction of requests failing with a 500')
+    parser.add_argument('--task-seconds', type=float, default=0.5, help='Duration of action tasks')
+    parser.add_argument('--task-failure-rate', type=float, default=0, help='Fraction of failing action tasks')
+    args = parser.parse_args()
+
+    cluster = FakeCluster(args.nodes, args.guests, args.task_seconds, args.task_failure_rate)
+    server = FakeProxmoxServer(
+        cluster, host='0.0.0.0', port=args.port, latency=args.latency_ms / 1000,
+        latency_jitter=args.jitter_ms / 1000, failure_rate=args.failure_rate
+    )
+    print(f"Fake Proxmox cluster ({args.nodes} nodes, {args.guests} guests) on https://0.0.0.0:{server.port}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Import-time audit
+Imports each entry point in a fresh interpreter with `-X importtime` and
+fails if it pulls in modules it should not need, or exceeds a time budget
+
+Usage (from the backend directory):
+    python benchmarks/import_audit.py [--budget-ms 0] [--top 10]
+
+Exits with status 1 on any violation. tests/test_import_audit.py runs the
+same audit under pytest.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the scheduler daemon must not load at import time: the web stack
+# and libraries only needed once Proxmox is actually contacted
+DAEMON_FORBIDDEN = [
+    'fastapi', 'starlette', 'uvicorn', 'jose', 'passlib',
+    'proxmoxer', 'requests', 'cryptography', 'croniter',
+]
+
+# Entry point -> forbidden modules
+ENTRY_POINTS: Dict[str, List[str]] = {
+    'scheduler_daemon': DAEMON_FORBIDDEN,
+    'app.services.scheduler': DAEMON_FORBIDDEN,
+    'app.models': DAEMON_FORBIDDEN + ['apscheduler', 'prometheus_client'],
+}
+
+# Dummy settings so the audit runs without a .env file
+DUMMY_ENVIRONMENT = {
+    'DATABASE_URL': 'sqlite:///audit.db',  # Never connected to
+    'SECRET_KEY': 'audit',
+    'ENCRYPTION_KEY': 'audit',
+    'PROXMOX_HOST': '127.0.0.1',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_NAME': 'audit',
+    'PROXMOX_TOKEN_VALUE': 'audit',
+}
+
+
+def import_times(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Import a module in a fresh interpreter and collect -X importtime output
+
+    Args:
+        module: Module to import
+
+    Returns:
+        List of (name, depth, self_us, cumulative_us) in import order
+    """
+    env = {**DUMMY_ENVIRONMENT, **os.environ}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        self_us, cumulative_us, raw_name = int(parts[0]), int(parts[1]), parts[2]
+        stripped = raw_name.lstrip()
+        depth = (len(raw_name) - len(stripped) - 1) // 2
+        entries.append((stripped, depth, self_us, cumulative_us))
+
+    return entries
+
+
+def audit(module: str, forbidden: List[str], budget_ms: float, top: int) -> List[str]:
+    """
+    Audit one entry point
+
+    Returns:
+        List of violations (empty if the entry point passes)
+    """
+    entries = import_times(module)
+    names = {name for name, _, _, _ in entries}
+    total_ms = next((cumulative for name, depth, _, cumulative in entries if name == module and depth == 0), 0) / 1000
+
+    print(f"{module}: {total_ms:.1f} ms, {len(names)} modules")
+    direct = sorted(
+        (entry for entry in entries if entry[1] == 1), key=lambda entry: entry[3], reverse=True
+    )
+    for name, _, _, cumulative in direct[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+    violations = [
+        f"{module} imports {package}"
+        for package in forbidden
+        if any(name == package or name.startswith(package + '.') for name in names)
+    ]
+    if budget_ms and total_ms > budget_ms:
+        violations.append(f"{module} takes {total_ms:.1f} ms to import (budget {budget_ms:.1f} ms)")
+
+    return violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=0, help='Import time budget per entry point, 0 = none')
+    parser.add_argument('--top', type=int, default=10, help='Number of direct imports to list')
+    args = parser.parse_args()
+
+    violations = []
+    for module, forbidden in ENTRY_POINTS.items():
+        violations += audit(module, forbidden, args.budget_ms, args.top)
+
+    if violations:
+        print()
+        for violation in violations:
+            print(f"FAIL: {violation}")
+        return 1
+
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
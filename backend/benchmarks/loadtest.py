@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+API load test
+Replays the frontend's traffic mix against a real uvicorn server backed by a
+stand-in database and the simulated Proxmox cluster (benchmarks/fake_proxmox.py)
+
+Scenarios (weights in SCENARIOS):
+    dashboard      GET /api/stats                     (Dashboard)
+    vms            GET /api/vms                       (VMsView)
+    logs           GET /api/logs with filters/paging  (LogsView)
+    schedules      GET /api/schedules, GET /api/groups (SchedulesView)
+    schedule_crud  POST, PUT, toggle and DELETE of a schedule
+
+Each concurrency level runs closed-loop virtual users for --duration seconds
+and reports throughput and p50/p95/p99 latency, overall and per request.
+Every --workers value starts a fresh uvicorn server, so the output can be
+used to size uvicorn workers and DB_POOL_SIZE / DB_MAX_OVERFLOW.
+
+Usage (from the backend directory):
+    python benchmarks/loadtest.py [--workers 1,2] [--concurrency 1,4,16,32]
+        [--duration 20] [--pool-size 10] [--max-overflow 20] [--output results.json]
+
+The default database is a temporary SQLite file; pass --database-url to use
+an empty PostgreSQL database instead (SQLite serializes writes, so numbers
+for several workers are only meaningful on PostgreSQL). The load generator
+runs on the same machine and competes with the server for CPU.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fake_proxmox import FakeCluster, FakeProxmoxServer  # noqa: E402
+
+# The fake cluster uses a self-signed certificate
+warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+
+# Seeded data
+LOG_ROWS = 20000
+GROUPS = 20
+SCHEDULES = 200
+
+
+class Scenario(NamedTuple):
+    name: str
+    weight: int
+    run: Callable
+
+
+class Stats:
+    """Latencies and errors per request label, shared by all virtual users"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, label: str, seconds: float, ok: bool):
+        with self._lock:
+            self.latencies[label].append(seconds * 1000)
+            if not ok:
+                self.errors[label] += 1
+
+
+class Client:
+    """HTTP session of one virtual user that records every request"""
+
+    def __init__(self, base_url: str, token: str, stats: Stats, rng: random.Random):
+        import requests
+
+        self.base_url = base_url
+        self.stats = stats
+        self.rng = rng
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def request(self, method: str, path: str, label: str = None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=30, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.stats.record(label or f"{method} {path}", time.perf_counter() - start, ok)
+        return response
+
+
+def dashboard(client: Client, context: Dict):
+    client.request('GET', '/api/stats')
+
+
+def vms(client: Client, context: Dict):
+    client.request('GET', '/api/vms')
+
+
+def logs(client: Client, context: Dict):
+    rng = client.rng
+    params = {'limit': 50, 'offset': rng.choice([0, 0, 0, 50, 100])}
+    if rng.random() < 0.3:
+        params['status'] = rng.choice(['success', 'failed', 'skipped'])
+    if rng.random() < 0.2:
+        params['vmid'] = rng.choice(context['vmids'])
+    client.request('GET', '/api/logs', label='GET /api/logs', params=params)
+
+
+def schedules(client: Client, context: Dict):
+    client.request('GET', '/api/schedules')
+    client.request('GET', '/api/groups')
+
+
+def schedule_crud(client: Client, context: Dict):
+    rng = client.rng
+    response = client.request('POST', '/api/schedules', json={
+        'name': f"loadtest-{rng.getrandbits(32):08x}",
+        'target_type': 'group',
+        'target_id': rng.choice(context['group_ids']),
+        'action': 'start',
+        'cron_expression': f"{rng.randint(0, 59)} {rng.randint(0, 23)} * * *",
+        'enabled': True,
+    })
+    if response is None or response.status_code != 201:
+        return
+
+    schedule_id = response.json()['id']
+    client.request('PUT', f"/api/schedules/{schedule_id}", label='PUT /api/schedules/{id}',
+                   json={'cron_expression': f"{rng.randint(0, 59)} {rng.randint(0, 23)} * * 1-5"})
+    client.request('POST', f"/api/schedules/{schedule_id}/toggle", label='POST /api/schedules/{id}/toggle')
+    client.request('DELETE', f"/api/schedules/{schedule_id}", label='DELETE /api/schedules/{id}')
+
+
+# Weights follow how often the views are opened and refreshed
+SCENARIOS = [
+    Scenario('dashboard', 30, dashboard),
+    Scenario('vms', 25, vms),
+    Scenario('logs', 25, logs),
+    Scenario('schedules', 15, schedules),
+    Scenario('schedule_crud', 5, schedule_crud),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_environment(args, proxmox_port: int) -> Dict[str, str]:
+    """Environment shared by this process and the uvicorn server"""
+    return {
+        'DATABASE_URL': args.database_url,
+        'DB_POOL_SIZE': str(args.pool_size),
+        'DB_MAX_OVERFLOW': str(args.max_overflow),
+        'SECRET_KEY': 'loadtest',
+        'ENCRYPTION_KEY': 'loadtest',
+        'PROXMOX_HOST': '127.0.0.1',
+        'PROXMOX_PORT': str(proxmox_port),
+        'PROXMOX_VERIFY_SSL': 'false',
+        'PROXMOX_USER': 'root@pam',
+        'PROXMOX_TOKEN_NAME': 'loadtest',
+        'PROXMOX_TOKEN_VALUE': 'loadtest',
+        'LOG_LEVEL': 'WARNING',
+        'PYTHONWARNINGS': 'ignore:Unverified HTTPS request',
+    }
+
+
+def seed_database() -> Dict:
+    """
+    Create schema and data: synced VMs, groups, schedules, execution logs and a user
+
+    Returns:
+        Context for the scenarios (vmids, group_ids) and an access token
+    """
+    from app.database import Base, engine, SessionLocal
+    from app.dependencies import create_access_token
+    from app.models import User, VM, Group, GroupMember, Schedule, ExecutionLog
+    from app.services.vm_sync import VMSyncService
+
+    Base.metadata.create_all(engine)
+    VMSyncService().sync_vms()
+
+    rng = random.Random(1)
+    db = SessionLocal()
+    try:
+        # Requests use a token, so the user needs no usable password
+        db.add(User(username='loadtest', password_hash='!'))
+
+        vms = db.query(VM.id, VM.vmid, VM.name).all()
+        groups = [Group(name=f"loadtest-group-{index}") for index in range(GROUPS)]
+        db.add_all(groups)
+        db.flush()
+        db.bulk_insert_mappings(GroupMember, [
+            {'group_id': groups[index % GROUPS].id, 'vm_id': vm.id}
+            for index, vm in enumerate(vms)
+        ])
+
+        # Rarely firing expressions keep the server's scheduler idle
+        db.bulk_insert_mappings(Schedule, [
+            {
+                'name': f"loadtest-schedule-{index}",
+                'target_type': 'group',
+                'target_id': groups[index % GROUPS].id,
+                'action': rng.choice(['start', 'shutdown']),
+                'cron_expression': f"{rng.randint(0, 59)} {rng.randint(0, 23)} 1 1 *",
+                'enabled': True,
+            }
+            for index in range(SCHEDULES)
+        ])
+
+        now = datetime.now()
+        db.bulk_insert_mappings(ExecutionLog, [
+            {
+                'vmid': vm.vmid,
+                'vm_id': vm.id,
+                'vm_name': vm.name,
+                'action': rng.choice(['start', 'shutdown']),
+                'status': rng.choices(['success', 'failed', 'skipped'], [90, 5, 5])[0],
+                'executed_at': now - timedelta(minutes=index),
+                'duration_seconds': rng.randint(1, 30),
+            }
+            for index, vm in ((index, rng.choice(vms)) for index in range(LOG_ROWS))
+        ])
+        db.commit()
+
+        context = {
+            'vmids': [vm.vmid for vm in vms],
+            'group_ids': [group.id for group in groups],
+        }
+    finally:
+        db.close()
+        engine.dispose()
+
+    return {'context': context, 'token': create_access_token({'sub': 'loadtest'})}
+
+
+def start_server(environment: Dict[str, str], workers: int):
+    """
+    Start uvicorn with the API and wait until it answers
+
+    Returns:
+        Tuple of (process, base URL)
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env={**os.environ, **environment}
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    import requests
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if requests.get(base_url + '/api/health', timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def run_level(base_url: str, token: str, context: Dict, concurrency: int,
+              duration: float, think_time: float) -> Dict:
+    """Run `concurrency` virtual users for `duration` seconds and summarize"""
+    stats = Stats()
+    stop = threading.Event()
+    weights = [scenario.weight for scenario in SCENARIOS]
+
+    def user(index: int):
+        rng = random.Random(index)
+        client = Client(base_url, token, stats, rng)
+        while not stop.is_set():
+            rng.choices(SCENARIOS, weights)[0].run(client, context)
+            if think_time:
+                time.sleep(think_time)
+
+    threads = [threading.Thread(target=user, args=(index,), daemon=True) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    def summarize(latencies: List[float], errors: int) -> Dict:
+        ordered = sorted(latencies)
+        pick = lambda fraction: ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+        return {
+            'requests': len(ordered),
+            'errors': errors,
+            'rps': len(ordered) / elapsed,
+            'p50_ms': pick(0.5),
+            'p95_ms': pick(0.95),
+            'p99_ms': pick(0.99),
+        }
+
+    all_latencies = [latency for latencies in stats.latencies.values() for latency in latencies]
+    return {
+        'concurrency': concurrency,
+        **summarize(all_latencies, sum(stats.errors.values())),
+        'endpoints': {
+            label: summarize(latencies, stats.errors[label])
+            for label, latencies in sorted(stats.latencies.items())
+        },
+    }
+
+
+def print_level(workers: int, level: Dict, verbose: bool):
+    print(f"{workers:>7} {level['concurrency']:>5} {level['rps']:>8.1f} {level['errors']:>6} "
+          f"{level['p50_ms']:>8.1f} {level['p95_ms']:>8.1f} {level['p99_ms']:>8.1f}")
+    if verbose:
+        for label, endpoint in level['endpoints'].items():
+            print(f"{'':>14} {endpoint['rps']:>8.1f} {endpoint['errors']:>6} {endpoint['p50_ms']:>8.1f} "
+                  f"{endpoint['p95_ms']:>8.1f} {endpoint['p99_ms']:>8.1f}  {label}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1', help='Comma-separated uvicorn worker counts')
+    parser.add_argument('--concurrency', default='1,4,16,32', help='Comma-separated numbers of virtual users')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per concurrency level')
+    parser.add_argument('--think-ms', type=float, default=0, help='Pause of each user between scenarios')
+    parser.add_argument('--pool-size', type=int, default=10, help='DB_POOL_SIZE of the server')
+    parser.add_argument('--max-overflow', type=int, default=20, help='DB_MAX_OVERFLOW of the server')
+    parser.add_argument('--database-url', help='Empty database to use (default: temporary SQLite file)')
+    parser.add_argument('--guests', type=int, default=1000, help='Simulated guests')
+    parser.add_argument('--nodes', type=int, default=4, help='Simulated nodes')
+    parser.add_argument('--latency-ms', type=float, default=10, help='Latency of every Proxmox request')
+    parser.add_argument('--verbose', action='store_true', help='Print per-request results of every level')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    worker_counts = [int(value) for value in args.workers.split(',')]
+    levels = [int(value) for value in args.concurrency.split(',')]
+
+    cluster = FakeCluster(args.nodes, args.guests)
+    proxmox = FakeProxmoxServer(cluster, latency=args.latency_ms / 1000)
+    proxmox.start()
+
+    tmp = tempfile.TemporaryDirectory()
+    args.database_url = args.database_url or f"sqlite:///{os.path.join(tmp.name, 'loadtest.db')}"
+    environment = server_environment(args, proxmox.port)
+    os.environ.update(environment)
+
+    results = []
+    try:
+        seeded = seed_database()
+
+        print(f"{'workers':>7} {'users':>5} {'req/s':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for workers in worker_counts:
+            process, base_url = start_server(environment, workers)
+            try:
+                for concurrency in levels:
+                    level = run_level(
+                        base_url, seeded['token'], seeded['context'], concurrency,
+                        args.duration, args.think_ms / 1000
+                    )
+                    print_level(workers, level, args.verbose)
+                    results.append({'workers': workers, **level})
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    finally:
+        proxmox.stop()
+        tmp.cleanup()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'pool_size': args.pool_size,
+                'max_overflow': args.max_overflow,
+                'levels': results,
+            }, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@
 Standalone Scheduler Daemon
 Runs scheduled tasks independently from the web API
 """
+import os
 import sys
 import signal
 import time
@@ -11,18 +12,21 @@ from datetime import datetime
 from app.config import settings
 from app.services.scheduler import get_scheduler_service
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/var/log/proxmox-cronjob-scheduler.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def setup_logging():
+    """Configure logging (at startup, so importing this module has no side effects)"""
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/proxmox-cronjob-scheduler.log'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+
 class SchedulerDaemon:
     """Standalone scheduler daemon"""
     
@@ -46,6 +50,25 @@ class SchedulerDaemon:
         signal.signal(signal.SIGTERM, self.signal_handler)
         signal.signal(signal.SIGINT, self.signal_handler)
         
+        # Expose Prometheus metrics of this process (and of its worker
+        # processes when PROMETHEUS_MULTIPROC_DIR is set)
+        if settings.SCHEDULER_METRICS_PORT:
+            from prometheus_client import start_http_server, CollectorRegistry, REGISTRY, multiprocess
+            from app.database import engine
+            from app.services.metrics import CALLBACK_GAUGES, register_pool_metrics
+            
+            register_pool_metrics(engine)
+            
+            registry = REGISTRY
+            if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+                registry = CollectorRegistry()
+                multiprocess.MultiProcessCollector(registry)
+                # Queue depths and pool usage are read from this process
+                registry.register(CALLBACK_GAUGES)
+            
+            start_http_server(settings.SCHEDULER_METRICS_PORT, registry=registry)
+            logger.info(f"Metrics available on port {settings.SCHEDULER_METRICS_PORT}")
+        
         # Start scheduler service
         self.scheduler_service = get_scheduler_service()
         self.scheduler_service.start()
@@ -80,6 +103,7 @@ class SchedulerDaemon:
 
 def main():
     """Main entry point"""
+    setup_logging()
     daemon = SchedulerDaemon()
     
     try:
@@ -0,0 +1,107 @@
+"""
+Compiled cron expressions must fire exactly like croniter
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from croniter import croniter
+
+from app.utils.cron_index import CronIndex, compile_cron
+
+EXPRESSIONS = [
+    # Steps in a day field
+    '0 2 */2 * *',
+    '0 2 * * */2',
+    '0 0 */7 * 1',
+    '30 4 1-31/3 * *',
+    '0 0 * * 1-5/2',
+    # Ranges
+    '0 0 1-10 * *',
+    '0 0 * * mon-fri',
+    '0 0 1-31 * 1',
+    '0 0 10-20 * 1-5',
+    '0 0 * * 0-7',
+    # Lists
+    '0 0 1,15 * *',
+    '0 0 * * 1,3,5',
+    '0 0 1,15 * sat,sun',
+    '15 6 5,10,20 * 0,6',
+    # Unrestricted steps
+    '0 0 */1 * 1',
+    '0 0 1-10 * */1',
+    # Steps from a single value
+    '5/1 * * * *',
+    '10/15 * * * *',
+    '0 0 5/1 * *',
+    '0 0 * * 2/1',
+    # Other fields
+    '*/15 9-17 * * 1-5',
+    '0 0 31 * *',
+    '@weekly',
+]
+
+START = datetime(2026, 1, 1, 0, 0)
+
+
+def _croniter_times(expression: str, count: int):
+    iterator = croniter(expression, START)
+    return [iterator.get_next(datetime) for _ in range(count)]
+
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_next_fire_matches_croniter(expression):
+    compiled = compile_cron(expression)
+    fire_times = []
+    moment = START
+    for _ in range(40):
+        moment = compiled.next_fire(moment)
+        fire_times.append(moment)
+
+    assert fire_times == _croniter_times(expression, 40)
+
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_iter_fire_times_matches_croniter(expression):
+    expected = _croniter_times(expression, 40)
+    end = expected[-1] + timedelta(seconds=1)
+
+    assert list(compile_cron(expression).iter_fire_times(START + timedelta(seconds=1), end)) == expected
+
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_previous_fire_matches_croniter(expression):
+    at = datetime(2026, 6, 15, 12, 0)
+    iterator = croniter(expression, at + timedelta(seconds=1))
+
+    assert compile_cron(expression).previous_fire(at) == iterator.get_prev(datetime)
+
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_trigger_matches_croniter(expression):
+    trigger = compile_cron(expression).to_trigger(timezone='UTC')
+    expected = _croniter_times(expression, 10)
+
+    fire_times = []
+    previous = None
+    now = START.replace(tzinfo=timezone.utc) + timedelta(seconds=1)
+    for _ in range(10):
+        previous = trigger.get_next_fire_time(previous, now)
+        now = previous
+        fire_times.append(previous.replace(tzinfo=None))
+
+    assert fire_times == expected
+
+
+def test_index_uses_day_steps():
+    index = CronIndex([(1, '0 2 */2 * *', 0), (2, '0 2 * * *', 0)])
+    fires = index.upcoming(START, START + timedelta(days=4))
+
+    assert [schedule_id for _, schedule_id in fires].count(1) == 2
+    assert [schedule_id for _, schedule_id in fires].count(2) == 4
+
+
+def test_single_value_with_step_runs_to_maximum():
+    compiled = compile_cron('5/1 * * * *')
+
+    assert compiled.next_fire(datetime(2026, 1, 1, 0, 5)) == datetime(2026, 1, 1, 0, 6)
+    assert compiled.next_fire(datetime(2026, 1, 1, 0, 59)) == datetime(2026, 1, 1, 1, 5)
@@ -0,0 +1,11 @@
+"""
+Entry points must not import the web stack or Proxmox client libraries
+"""
+import pytest
+
+from benchmarks.import_audit import ENTRY_POINTS, audit
+
+
+@pytest.mark.parametrize('module', sorted(ENTRY_POINTS))
+def test_entry_point_imports(module):
+    assert audit(module, ENTRY_POINTS[module], budget_ms=0, top=0) == []
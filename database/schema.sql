@@ -4,6 +4,9 @@
 -- Extension for UUID generation
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Extension for trigram indexes behind the search API
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Users table for web interface authentication
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
@@ -39,6 +42,7 @@ CREATE TABLE vms (
     maxmem BIGINT,
     maxdisk BIGINT,
     uptime INTEGER,
+    tags TEXT, -- Proxmox tags, ';'-separated
     last_synced TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(vmid)
 );
@@ -46,6 +50,42 @@ CREATE TABLE vms (
 CREATE INDEX idx_vms_type ON vms(type);
 CREATE INDEX idx_vms_node ON vms(node);
 CREATE INDEX idx_vms_status ON vms(status);
+CREATE INDEX idx_vms_name_trgm ON vms USING GIN (name gin_trgm_ops);
+
+-- VM state transitions seen by the sync (append-only, state after the change)
+CREATE TABLE vm_state_events (
+    id BIGSERIAL PRIMARY KEY,
+    vmid INTEGER NOT NULL, -- No foreign key, history outlives the VM
+    observed_at TIMESTAMP NOT NULL,
+    changes VARCHAR(50) NOT NULL, -- 'added', 'status', 'node', 'resources', 'restart'
+    status VARCHAR(20),
+    node VARCHAR(100) NOT NULL,
+    maxmem BIGINT,
+    maxdisk BIGINT,
+    uptime INTEGER
+);
+
+CREATE INDEX idx_vm_state_events_vmid_time ON vm_state_events(vmid, observed_at);
+CREATE INDEX idx_vm_state_events_observed ON vm_state_events USING BRIN (observed_at);
+
+-- Resource usage per VM: raw samples (resolution 0) and 5 min / 1 h rollups, pruned by age
+CREATE TABLE vm_metric_samples (
+    resolution INTEGER NOT NULL, -- Bucket length in seconds, 0 = raw sample
+    vmid INTEGER NOT NULL,
+    ts TIMESTAMP NOT NULL, -- Sample time or bucket start
+    samples INTEGER NOT NULL DEFAULT 1,
+    cpu REAL, -- Average CPU usage (1.0 = one core)
+    cpu_max REAL,
+    mem BIGINT,
+    maxmem BIGINT,
+    netin REAL, -- Bytes per second
+    netout REAL,
+    diskread REAL,
+    diskwrite REAL,
+    PRIMARY KEY (resolution, vmid, ts)
+);
+
+CREATE INDEX idx_vm_metric_samples_ts ON vm_metric_samples USING BRIN (resolution, ts);
 
 -- VM Groups for bulk operations
 CREATE TABLE groups (
@@ -55,11 +95,14 @@ CREATE TABLE groups (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX idx_groups_name_trgm ON groups USING GIN (name gin_trgm_ops);
+
 -- Group membership
 CREATE TABLE group_members (
     id SERIAL PRIMARY KEY,
     group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
     vm_id INTEGER NOT NULL REFERENCES vms(id) ON DELETE CASCADE,
+    start_order INTEGER NOT NULL DEFAULT 0, -- Lower orders start first and stop last
     added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(group_id, vm_id)
 );
@@ -67,6 +110,18 @@ CREATE TABLE group_members (
 CREATE INDEX idx_group_members_group ON group_members(group_id);
 CREATE INDEX idx_group_members_vm ON group_members(vm_id);
 
+-- Start dependencies between group members (vm_id needs depends_on_vm_id running first)
+CREATE TABLE group_dependencies (
+    id SERIAL PRIMARY KEY,
+    group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    vm_id INTEGER NOT NULL REFERENCES vms(id) ON DELETE CASCADE,
+    depends_on_vm_id INTEGER NOT NULL REFERENCES vms(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(group_id, vm_id, depends_on_vm_id)
+);
+
+CREATE INDEX idx_group_dependencies_group ON group_dependencies(group_id);
+
 -- Scheduled tasks
 CREATE TABLE schedules (
     id SERIAL PRIMARY KEY,
@@ -76,6 +131,12 @@ CREATE TABLE schedules (
     action VARCHAR(20) NOT NULL, -- 'start', 'stop', 'restart', 'shutdown', 'reset'
     cron_expression VARCHAR(100) NOT NULL,
     enabled BOOLEAN DEFAULT TRUE,
+    batch_size INTEGER NOT NULL DEFAULT 1, -- VMs acted on concurrently
+    batch_delay_seconds INTEGER NOT NULL DEFAULT 0, -- Pause between batches
+    max_in_flight_per_node INTEGER NOT NULL DEFAULT 0, -- 0 = unlimited
+    wait_for_completion BOOLEAN NOT NULL DEFAULT FALSE, -- Wait for Proxmox tasks before next batch
+    retry_budget INTEGER NOT NULL DEFAULT 3, -- Retries per run across all VMs
+    jitter_seconds INTEGER, -- Spread window, NULL = global default, 0 = off
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_run TIMESTAMP,
@@ -84,6 +145,7 @@ CREATE TABLE schedules (
 
 CREATE INDEX idx_schedules_enabled ON schedules(enabled);
 CREATE INDEX idx_schedules_target ON schedules(target_type, target_id);
+CREATE INDEX idx_schedules_name_trgm ON schedules USING GIN (name gin_trgm_ops);
 
 -- Blackout windows (maintenance windows where no actions should run)
 CREATE TABLE blackout_windows (
@@ -99,10 +161,26 @@ CREATE TABLE blackout_windows (
 
 CREATE INDEX idx_blackout_enabled ON blackout_windows(enabled);
 
+-- Schedule runs (one row per fire, planned versus actual timing)
+CREATE TABLE schedule_runs (
+    id SERIAL PRIMARY KEY,
+    schedule_id INTEGER REFERENCES schedules(id) ON DELETE SET NULL,
+    planned_at TIMESTAMP NOT NULL,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    lag_seconds DOUBLE PRECISION, -- started_at - planned_at
+    completion_seconds DOUBLE PRECISION, -- finished_at - planned_at
+    status VARCHAR(20) NOT NULL -- 'running', 'completed', 'skipped', 'failed', 'missed'
+);
+
+CREATE INDEX idx_schedule_runs_schedule ON schedule_runs(schedule_id);
+CREATE INDEX idx_schedule_runs_planned ON schedule_runs(planned_at DESC);
+
 -- Execution logs
 CREATE TABLE execution_logs (
     id SERIAL PRIMARY KEY,
     schedule_id INTEGER REFERENCES schedules(id) ON DELETE SET NULL,
+    run_id INTEGER REFERENCES schedule_runs(id) ON DELETE SET NULL,
     vm_id INTEGER REFERENCES vms(id) ON DELETE SET NULL,
     vmid INTEGER, -- Store vmid even if VM is deleted
     vm_name VARCHAR(255),
@@ -112,13 +190,27 @@ CREATE TABLE execution_logs (
     duration_seconds INTEGER,
     error_message TEXT,
     upid VARCHAR(255), -- Proxmox task UPID
-    skipped_reason VARCHAR(100) -- 'blackout', 'vm_not_found', etc.
+    skipped_reason VARCHAR(100), -- 'blackout', 'vm_not_found', etc.
+    attempts INTEGER NOT NULL DEFAULT 1 -- Number of tries including retries
 );
 
 CREATE INDEX idx_logs_schedule ON execution_logs(schedule_id);
+CREATE INDEX idx_logs_run ON execution_logs(run_id);
 CREATE INDEX idx_logs_vm ON execution_logs(vm_id);
 CREATE INDEX idx_logs_status ON execution_logs(status);
 CREATE INDEX idx_logs_executed ON execution_logs(executed_at DESC);
+CREATE INDEX idx_logs_error_trgm ON execution_logs USING GIN (error_message gin_trgm_ops);
+
+-- Change counters per table, bumped in the writing transaction (ETags of read endpoints)
+CREATE TABLE table_versions (
+    table_name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO table_versions (table_name) VALUES
+    ('vms'), ('groups'), ('group_members'), ('group_dependencies'),
+    ('schedules'), ('blackout_windows'), ('schedule_runs'), ('execution_logs');
 
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -0,0 +1,115 @@
+-- Proxmox Cronjob Web Interface - Schema Upgrade
+-- PostgreSQL 12+
+--
+-- Brings a database created from an older schema.sql up to date. Every
+-- statement is idempotent, so the script can be run after each update:
+--     sudo -u postgres psql -d proxmox_cronjob -f database/upgrade.sql
+-- Fresh installations only need schema.sql.
+
+BEGIN;
+
+-- Schedules: rolling execution policy
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS batch_size INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS batch_delay_seconds INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS max_in_flight_per_node INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS wait_for_completion BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Group members: start order
+ALTER TABLE group_members ADD COLUMN IF NOT EXISTS start_order INTEGER NOT NULL DEFAULT 0;
+
+-- Start dependencies between group members
+CREATE TABLE IF NOT EXISTS group_dependencies (
+    id SERIAL PRIMARY KEY,
+    group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    vm_id INTEGER NOT NULL REFERENCES vms(id) ON DELETE CASCADE,
+    depends_on_vm_id INTEGER NOT NULL REFERENCES vms(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(group_id, vm_id, depends_on_vm_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_group_dependencies_group ON group_dependencies(group_id);
+
+-- Retries: budget per run and attempts per log entry
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS retry_budget INTEGER NOT NULL DEFAULT 3;
+ALTER TABLE execution_logs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 1;
+
+-- Schedule runs (one row per fire, planned versus actual timing)
+CREATE TABLE IF NOT EXISTS schedule_runs (
+    id SERIAL PRIMARY KEY,
+    schedule_id INTEGER REFERENCES schedules(id) ON DELETE SET NULL,
+    planned_at TIMESTAMP NOT NULL,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    lag_seconds DOUBLE PRECISION,
+    completion_seconds DOUBLE PRECISION,
+    status VARCHAR(20) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_schedule_runs_schedule ON schedule_runs(schedule_id);
+CREATE INDEX IF NOT EXISTS idx_schedule_runs_planned ON schedule_runs(planned_at DESC);
+
+ALTER TABLE execution_logs ADD COLUMN IF NOT EXISTS run_id INTEGER REFERENCES schedule_runs(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS idx_logs_run ON execution_logs(run_id);
+
+-- Schedules: jitter window
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS jitter_seconds INTEGER;
+
+-- VMs: Proxmox tags
+ALTER TABLE vms ADD COLUMN IF NOT EXISTS tags TEXT;
+
+-- Trigram indexes of the search API
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_vms_name_trgm ON vms USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_groups_name_trgm ON groups USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_schedules_name_trgm ON schedules USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_logs_error_trgm ON execution_logs USING GIN (error_message gin_trgm_ops);
+
+-- Change counters per table (ETags of read endpoints)
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO table_versions (table_name) VALUES
+    ('vms'), ('groups'), ('group_members'), ('group_dependencies'),
+    ('schedules'), ('blackout_windows'), ('schedule_runs'), ('execution_logs')
+ON CONFLICT (table_name) DO NOTHING;
+
+-- VM state transitions seen by the sync
+CREATE TABLE IF NOT EXISTS vm_state_events (
+    id BIGSERIAL PRIMARY KEY,
+    vmid INTEGER NOT NULL,
+    observed_at TIMESTAMP NOT NULL,
+    changes VARCHAR(50) NOT NULL,
+    status VARCHAR(20),
+    node VARCHAR(100) NOT NULL,
+    maxmem BIGINT,
+    maxdisk BIGINT,
+    uptime INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_vm_state_events_vmid_time ON vm_state_events(vmid, observed_at);
+CREATE INDEX IF NOT EXISTS idx_vm_state_events_observed ON vm_state_events USING BRIN (observed_at);
+
+-- Resource usage per VM: raw samples and rollups
+CREATE TABLE IF NOT EXISTS vm_metric_samples (
+    resolution INTEGER NOT NULL,
+    vmid INTEGER NOT NULL,
+    ts TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 1,
+    cpu REAL,
+    cpu_max REAL,
+    mem BIGINT,
+    maxmem BIGINT,
+    netin REAL,
+    netout REAL,
+    diskread REAL,
+    diskwrite REAL,
+    PRIMARY KEY (resolution, vmid, ts)
+);
+
+CREATE INDEX IF NOT EXISTS idx_vm_metric_samples_ts ON vm_metric_samples USING BRIN (resolution, ts);
+
+COMMIT;